@@ -1,49 +1,190 @@
-from langchain_openai import ChatOpenAI
-from langchain_tavily import TavilySearch
-from langchain_google_community import GooglePlacesTool 
-from .google_route_tool import GoogleRoutesTool
-from langgraph.checkpoint.memory import MemorySaver
-from langgraph.prebuilt import create_react_agent
-from pydantic import SecretStr
+"""
+The travel agent: chat model, tools and the compiled ReAct agent.
+
+Importing this module is cheap. The model, tools and agent (and the langchain,
+langgraph and Google client libraries behind them) are built by build_agent() on
+first use, or ahead of time with warmup() at startup.
+"""
+from .metrics import LLMMetricsHandler, metrics
 from langchain_core.runnables import RunnableConfig
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from datetime import datetime, timedelta
+from typing import AsyncIterator, Iterator, Optional
+import asyncio
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
-tavily_api_key = os.getenv("TAVILY_API_KEY")
-together_api_key = os.getenv("TOGETHER_API_KEY")
-google_places_api_key = os.getenv("GPLACES_API_KEY")
-
-if not all([tavily_api_key, together_api_key, google_places_api_key]):
-    missing = []
-    if not tavily_api_key: missing.append("TAVILY_API_KEY")
-    if not together_api_key: missing.append("TOGETHER_API_KEY")
-    if not google_places_api_key: missing.append("GOOGLE_PLACES_API_KEY")
-    raise ValueError(f"Missing API keys: {', '.join(missing)}")
-
-memory = MemorySaver()
-model = ChatOpenAI(
-    api_key=SecretStr(together_api_key) if together_api_key else None,
-    base_url="https://api.together.xyz/v1",
-    model="meta-llama/Llama-3.3-70B-Instruct-Turbo-Free",
-    temperature=0.7,
-)
-search = TavilySearch(tavily_api_key=tavily_api_key, max_results=5)
-places = GooglePlacesTool()
-routes = GoogleRoutesTool()
-tools = [search, places, routes]
-
+# Static system prompt, sent byte-identical on every call so the provider can reuse its
+# prefix cache. Per-user context goes in a separate message after the history (build_prompt).
 template = """
 You're a serious most of the time, but sarcastic some of the time. Every now and again you throw a 'penis' into the conversation.
 When giving directions, don't give me the directions, just give me a summary of the route and a link to the destination/s on google maps.
-
-{context_info}
 """
 
-agent_executor = create_react_agent(model, tools, checkpointer=memory, prompt=template)
-config: RunnableConfig = {"configurable": {"thread_id": "abc123"}}
+DEFAULT_THREAD_ID = "default"
+# Answer unambiguous route requests with the routes tool directly, skipping the LLM
+FAST_PATH_ENABLED = os.getenv("AGENT_FAST_PATH", "1") == "1"
+
+
+class TravelAgent:
+    """The chat model, tools and compiled agent, built together by build_agent()"""
+
+    def __init__(self, model, search, places, routes, itinerary, closest, executor, memory,
+                 llm_cache=None, tool_policy=None, history_compactor=None):
+        self.model = model
+        self.search = search
+        self.places = places
+        self.routes = routes
+        self.itinerary = itinerary
+        self.closest = closest
+        self.tools = [search, places, routes, itinerary, closest]
+        self.executor = executor
+        self.memory = memory
+        self.llm_cache = llm_cache
+        self.tool_policy = tool_policy
+        self.history_compactor = history_compactor
+
+
+def _check_api_keys() -> None:
+    missing = [name for name in ("TAVILY_API_KEY", "TOGETHER_API_KEY", "GPLACES_API_KEY") if not os.getenv(name)]
+    if missing:
+        raise ValueError(f"Missing API keys: {', '.join(missing)}")
+
+
+def build_agent() -> TravelAgent:
+    """
+    Build the model, tools and compiled agent from the environment. This is where the
+    heavy libraries are imported, so it takes a few seconds on a cold start.
+    """
+    _check_api_keys()
+    from langchain_openai import ChatOpenAI
+    from langchain_tavily import TavilySearch
+    from langgraph.prebuilt import ToolNode, create_react_agent
+    from pydantic import SecretStr
+    from .places_tool import AsyncGooglePlacesTool
+    from .google_route_tool import GoogleRoutesTool
+    from .itinerary_tool import ItineraryTool
+    from .closest_tool import ClosestPlacesTool
+    from .checkpointer import BoundedMemorySaver
+    from .tool_runtime import ToolPolicy
+    from .tool_cache import CachedTool, create_tool_cache, tool_ttls_from_env
+    from .llm_cache import create_llm_cache, prompt_version
+    from .history import HistoryCompactor
+
+    # Per-thread history window and idle-thread eviction keep memory and prompt size flat
+    memory = BoundedMemorySaver(
+        max_threads=int(os.getenv("AGENT_MAX_THREADS", "1000")),
+        idle_ttl=float(os.getenv("AGENT_THREAD_IDLE_TTL", "3600")),
+        max_messages=int(os.getenv("AGENT_MAX_HISTORY_MESSAGES", "40")),
+    )
+
+    # With LLM_CACHE_ENABLED=1, repeated requests (and, with LLM_SEMANTIC_CACHE=1, paraphrased
+    # opening messages) are answered from llm_cache; None (the default) means no cache
+    llm_cache = create_llm_cache(prompt_version(template))
+    model = ChatOpenAI(
+        api_key=SecretStr(os.environ["TOGETHER_API_KEY"]),
+        # LLM_BASE_URL points at any OpenAI-compatible endpoint (e.g. a local stand-in for benchmarks)
+        base_url=os.getenv("LLM_BASE_URL", "https://api.together.xyz/v1"),
+        model="meta-llama/Llama-3.3-70B-Instruct-Turbo-Free",
+        temperature=0.7,
+        cache=llm_cache,
+        # Times every call as the "llm" stage with its token counts
+        callbacks=[LLMMetricsHandler(metrics)],
+    )
+    search = TavilySearch(tavily_api_key=os.environ["TAVILY_API_KEY"], max_results=5,
+                          api_base_url=os.getenv("TAVILY_BASE_URL"))
+    places = AsyncGooglePlacesTool()
+    # Search and place results don't depend on the user, so they're shared across users by
+    # normalized query (TOOL_CACHE_DB for a SQLite tier, TOOL_CACHE_TTLS per tool)
+    if os.getenv("TOOL_CACHE_ENABLED", "1") == "1":
+        tool_cache = create_tool_cache()
+        tool_ttls = tool_ttls_from_env()
+        search = CachedTool(search, cache=tool_cache, ttl=tool_ttls[search.name])
+        places = CachedTool(places, cache=tool_cache, ttl=tool_ttls[places.name])
+    routes = GoogleRoutesTool()
+    itinerary = ItineraryTool(routes)
+    closest = ClosestPlacesTool(routes)
+    tools = [search, places, routes, itinerary, closest]
+    # Tool calls from one step run concurrently (TOOL_MAX_CONCURRENCY per thread) with per-tool
+    # timeouts (TOOL_TIMEOUT, TOOL_TIMEOUTS="google_places=10,...") and latencies in tool_policy.stats()
+    tool_policy = ToolPolicy.from_env()
+    tool_node = ToolNode(tools, wrap_tool_call=tool_policy.wrap, awrap_tool_call=tool_policy.awrap)
+
+    # Hit/miss counts of every cache on /metrics
+    if llm_cache is not None:
+        metrics.register_cache("llm", lambda: llm_cache.exact.stats.as_dict())
+        if llm_cache.semantic is not None:
+            metrics.register_cache("llm_semantic", lambda: llm_cache.semantic.stats.as_dict())
+    for cached_tool in (search, places):
+        if isinstance(cached_tool, CachedTool):
+            metrics.register_cache(cached_tool.name, cached_tool.stats)
+    metrics.register_cache("geocode", lambda: routes.geocode_cache.stats()['overall'])
+    metrics.register_cache("route", lambda: routes.route_cache.cache.stats.as_dict())
+    metrics.register_cache("route_matrix", lambda: routes.route_matrix.cache.stats.as_dict())
+    metrics.register_cache("nearby_search", lambda: closest.search_cache.stats.as_dict())
+
+    # Digests old tool outputs and folds old turns into a summary to keep each call under
+    # HISTORY_TOKEN_BUDGET tokens of history
+    history_compactor = HistoryCompactor.from_env(model)
+
+    # Compiled once for the life of the process. Per-user data (location context for the
+    # prompt, current location for the routes tool) is passed in through the run config.
+    executor = create_react_agent(model, tool_node, checkpointer=memory, prompt=build_prompt,
+                                  pre_model_hook=history_compactor)
+    return TravelAgent(model, search, places, routes, itinerary, closest, executor, memory,
+                       llm_cache=llm_cache, tool_policy=tool_policy, history_compactor=history_compactor)
+
+
+_agent: Optional[TravelAgent] = None
+_agent_lock = threading.Lock()
+
+
+def get_agent() -> TravelAgent:
+    """The process-wide agent, built on first call; concurrent first callers wait for one build"""
+    global _agent
+    if _agent is None:
+        with _agent_lock:
+            if _agent is None:
+                started = time.perf_counter()
+                agent = build_agent()
+                metrics.observe("agent_build", time.perf_counter() - started)
+                _agent = agent
+    return _agent
+
+
+async def aget_agent() -> TravelAgent:
+    """get_agent for the event loop: a first call builds the agent on a worker thread"""
+    if _agent is not None:
+        return _agent
+    return await asyncio.to_thread(get_agent)
+
+
+def warmup() -> TravelAgent:
+    """
+    Build the agent now rather than on the first message. Call it at startup (from a
+    background thread to start serving sooner) so no user waits for the build.
+    """
+    return get_agent()
+
+
+# Names that used to be module globals, now built lazily: agent.agent.model still works
+_LAZY_ATTRIBUTES = {'model', 'search', 'places', 'routes', 'itinerary', 'closest', 'tools', 'memory',
+                    'llm_cache', 'tool_policy', 'history_compactor'}
+
+
+def __getattr__(name: str):
+    if name in _LAZY_ATTRIBUTES:
+        return getattr(get_agent(), name)
+    if name == 'agent_executor':
+        return get_agent().executor
+    if name == 'PROMPT_VERSION':
+        from .llm_cache import prompt_version
+        return prompt_version(template)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def get_location_context(user_context: dict) -> str:
     """Extract location context for the agent prompt"""
@@ -63,10 +204,11 @@ def get_location_context(user_context: dict) -> str:
     else:
         time_info = ""
     
-    context = f"""
-IMPORTANT CONTEXT: The user has shared their current location:
+    address_info = f"\n- Address: {location['address']}" if location.get('address') else ""
+    
+    context = f"""IMPORTANT CONTEXT: The user has shared their current location:
 - Latitude: {location['latitude']:.6f}
-- Longitude: {location['longitude']:.6f}
+- Longitude: {location['longitude']:.6f}{address_info}
 - Location shared: {time_info}
 
 When the user asks for directions, routes, or navigation:
@@ -76,53 +218,235 @@ When the user asks for directions, routes, or navigation:
 """
     return context
 
-def ask_agent(question: str, user_context: dict):
+def build_prompt(state: dict, config: RunnableConfig) -> list:
+    """
+    Messages for the model: the static system prompt, the conversation, then the location
+    context for the user attached to this run's config. Keeping the context after the
+    history leaves the system prompt and history as a stable, cacheable prefix.
+    """
+    user_context = config.get("configurable", {}).get("user_context") or {}
+    context_info = get_location_context(user_context) if user_context else ""
+    messages = [SystemMessage(content=template)] + state["messages"]
+    if context_info:
+        messages.append(SystemMessage(content=context_info))
+    return messages
+
+def get_run_config(thread_id: str | None, user_context: dict | None) -> RunnableConfig:
+    """Build the run config for one conversation thread"""
+    # The prompt and the routes tool read the user context from the run config
+    return {
+        "configurable": {
+            "thread_id": thread_id or DEFAULT_THREAD_ID,
+            "user_context": user_context or {},
+        }
+    }
+
+def _direct_route_request(question: str, run_config: RunnableConfig):
+    """The fast-path route request for a question, or None if the agent should handle it"""
+    if not FAST_PATH_ENABLED:
+        return None
+    
+    from .fast_path import parse_route_request
+    request = parse_route_request(question)
+    if request is None:
+        return None
+    
+    user_context = run_config["configurable"].get("user_context") or {}
+    if not request.origin and not get_agent().routes._get_current_location_coords(user_context):
+        return None
+    return request
+
+def _direct_exchange(question: str, result: str) -> dict:
+    # Recorded so follow-up questions have the exchange in the conversation history
+    return {"messages": [HumanMessage(content=question), AIMessage(content=result)]}
+
+def answer_route_directly(question: str, run_config: RunnableConfig) -> Optional[str]:
+    """
+    Answer a plain route request ("directions from X to Y", "walk to Z") without the LLM.
+    Returns None when the request is ambiguous or the route can't be resolved, so the
+    agent handles it instead.
+    """
+    request = _direct_route_request(question, run_config)
+    if request is None:
+        return None
+    
+    agent = get_agent()
+    result = agent.routes.invoke(request.model_dump(), config=run_config)
+    if not isinstance(result, str) or result.startswith("❌"):
+        return None
+    
+    agent.executor.update_state(run_config, _direct_exchange(question, result), as_node="agent")
+    return result
+
+async def aanswer_route_directly(question: str, run_config: RunnableConfig) -> Optional[str]:
+    """Async version of answer_route_directly"""
+    # Built off the loop before _direct_route_request reaches for the routes tool
+    agent = await aget_agent()
+    request = _direct_route_request(question, run_config)
+    if request is None:
+        return None
+    
+    result = await agent.routes.ainvoke(request.model_dump(), config=run_config)
+    if not isinstance(result, str) or result.startswith("❌"):
+        return None
+    
+    await agent.executor.aupdate_state(run_config, _direct_exchange(question, result), as_node="agent")
+    return result
+
+def ask_agent(question: str, user_context: dict, thread_id: str | None = None):
     """
     Ask the agent a question with optional user context (like current location)
     
     Args:
         question: The user's question
         user_context: Dictionary containing user data like current_location
+        thread_id: Conversation thread to continue (e.g. the Telegram chat ID)
     """
     
-    # Build context information for the prompt
-    context_info = get_location_context(user_context) if user_context else ""
+    run_config = get_run_config(thread_id, user_context)
     
-    # Update the prompt template with context
-    current_template = template.format(context_info=context_info)
+    input_message = {"role": "user", "content": question}
     
-    # Create context-aware tools
-    context_routes = GoogleRoutesTool(user_context=user_context) if user_context else routes
-    context_tools = [search, places, context_routes]
+    response_content = ""
     
-    # Create agent with context-aware tools and updated prompt
-    current_agent = create_react_agent(
-        model, 
-        context_tools, 
-        checkpointer=memory, 
-        prompt=current_template
-    )
+    with metrics.stage("agent_run") as span:
+        try:
+            direct_answer = answer_route_directly(question, run_config)
+            if direct_answer:
+                span['fast_path'] = True
+                return direct_answer
+            
+            for step in get_agent().executor.stream(
+                {"messages": [input_message]}, run_config, stream_mode="values"
+            ):
+                response_content = _step_content(step)
+                    
+        except Exception as e:
+            print(f"Error during agent execution: {e}")
+            span.update(status='error', error=type(e).__name__)
+            metrics.count("errors", component="agent", error=type(e).__name__)
+            return f"Error: {e}"
+    
+    return response_content if response_content else "Sorry, I couldn't generate a response."
+
+async def ask_agent_async(question: str, user_context: dict, thread_id: str | None = None):
+    """
+    Async version of ask_agent, for callers running on an event loop (e.g. the FastAPI app).
+    
+    The model and tool calls are awaited rather than run on the caller's thread, so one
+    loop can hold many conversations in flight.
+    """
+    run_config = get_run_config(thread_id, user_context)
     
     input_message = {"role": "user", "content": question}
     
     response_content = ""
     
-    try:
-        for step in current_agent.stream(
-            {"messages": [input_message]}, config, stream_mode="values"
-        ):
-            last_message = step["messages"][-1]
+    with metrics.stage("agent_run") as span:
+        try:
+            direct_answer = await aanswer_route_directly(question, run_config)
+            if direct_answer:
+                span['fast_path'] = True
+                return direct_answer
             
-            # Check if this is a tool call
-            if hasattr(last_message, 'content'):
-                response_content = last_message.content
-            elif isinstance(last_message, dict) and 'content' in last_message:
-                response_content = last_message['content']
-            else:
-                response_content = str(last_message)
-                
-    except Exception as e:
-        print(f"Error during agent execution: {e}")
-        return f"Error: {e}"
+            async for step in (await aget_agent()).executor.astream(
+                {"messages": [input_message]}, run_config, stream_mode="values"
+            ):
+                response_content = _step_content(step)
+                    
+        except Exception as e:
+            print(f"Error during agent execution: {e}")
+            span.update(status='error', error=type(e).__name__)
+            metrics.count("errors", component="agent", error=type(e).__name__)
+            return f"Error: {e}"
     
     return response_content if response_content else "Sorry, I couldn't generate a response."
+
+def _step_content(step: dict):
+    """Content of the last message in a stream_mode="values" step"""
+    last_message = step["messages"][-1]
+    
+    # Check if this is a tool call
+    if hasattr(last_message, 'content'):
+        return last_message.content
+    elif isinstance(last_message, dict) and 'content' in last_message:
+        return last_message['content']
+    return str(last_message)
+
+def _message_text(message) -> str:
+    """Text content of a message or message chunk"""
+    content = getattr(message, 'content', '')
+    if isinstance(content, str):
+        return content
+    return "".join(part.get('text', '') for part in content if isinstance(part, dict))
+
+def stream_agent(question: str, user_context: dict, thread_id: str | None = None) -> Iterator[dict]:
+    """
+    Ask the agent a question and yield its progress as it happens.
+    
+    Yields dicts with a "type" of:
+        token      - {"text"}: a piece of model output (tokens, or a whole message if the model doesn't stream)
+        tool_start - {"name", "args"}: the model asked for a tool call
+        tool_end   - {"name", "latency_ms"}: a tool call finished
+        final      - {"text"}: the final answer, once the run is complete
+    """
+    run_config = get_run_config(thread_id, user_context)
+    input_message = {"role": "user", "content": question}
+    answer = {"text": ""}
+    
+    with metrics.stage("agent_run", streamed=True) as span:
+        direct_answer = answer_route_directly(question, run_config)
+        if direct_answer:
+            span['fast_path'] = True
+            yield {"type": "final", "text": direct_answer}
+            return
+        
+        for mode, chunk in get_agent().executor.stream(
+            {"messages": [input_message]}, run_config, stream_mode=["messages", "updates"]
+        ):
+            yield from _stream_events(mode, chunk, answer)
+    
+    yield {"type": "final", "text": answer["text"] or "Sorry, I couldn't generate a response."}
+
+async def astream_agent(question: str, user_context: dict, thread_id: str | None = None) -> AsyncIterator[dict]:
+    """Async version of stream_agent, yielding the same events"""
+    run_config = get_run_config(thread_id, user_context)
+    input_message = {"role": "user", "content": question}
+    answer = {"text": ""}
+    
+    with metrics.stage("agent_run", streamed=True) as span:
+        direct_answer = await aanswer_route_directly(question, run_config)
+        if direct_answer:
+            span['fast_path'] = True
+            yield {"type": "final", "text": direct_answer}
+            return
+        
+        async for mode, chunk in (await aget_agent()).executor.astream(
+            {"messages": [input_message]}, run_config, stream_mode=["messages", "updates"]
+        ):
+            for event in _stream_events(mode, chunk, answer):
+                yield event
+    
+    yield {"type": "final", "text": answer["text"] or "Sorry, I couldn't generate a response."}
+
+def _stream_events(mode: str, chunk, answer: dict) -> Iterator[dict]:
+    """Translate one ("messages" | "updates") stream chunk into events, noting the answer text"""
+    if mode == "messages":
+        message, metadata = chunk
+        if metadata.get("langgraph_node") == "agent":
+            text = _message_text(message)
+            if text:
+                yield {"type": "token", "text": text}
+        return
+    
+    for node, update in chunk.items():
+        for message in (update or {}).get("messages", []):
+            if node == "agent":
+                if getattr(message, 'tool_calls', None):
+                    for tool_call in message.tool_calls:
+                        yield {"type": "tool_start", "name": tool_call["name"], "args": tool_call["args"]}
+                else:
+                    answer["text"] = _message_text(message)
+            elif node == "tools":
+                yield {"type": "tool_end", "name": getattr(message, 'name', None),
+                       "latency_ms": getattr(message, 'response_metadata', {}).get("latency_ms")}
@@ -0,0 +1,73 @@
+"""
+Micro-benchmark: keyword intent matching, the old per-list `any(keyword in text)`
+scan vs. the single-pass IntentClassifier, with the real keyword lists and with
+lists grown to hundreds of phrases across several languages.
+
+    python -m agent.benchmarks.bench_intents
+"""
+import itertools
+import timeit
+
+from agent.telegram_bot.intents import DIRECTION_KEYWORDS, PLAN_MODIFICATION_KEYWORDS, IntentClassifier
+
+MESSAGES = [
+    "How do I get from the airport to my hotel?",
+    "Give me directions to Kings Park please",
+    "What's the closest pharmacy open now?",
+    "Can you update my travel plan to include a winery tour on Saturday",
+    "Tell me something fun to do in Fremantle this weekend",
+    "I disclosed the booking details to the hotel already, is breakfast included?",
+    "¿Cómo llego a la playa de Cottesloe desde aquí?",
+    "Bitte zeig mir den Weg zum Bahnhof und füge ein Restaurant zum Plan hinzu",
+]
+
+EXTRA_DIRECTIONS = ['cómo llego', 'llévame a', 'ruta a', 'wie komme ich', 'zeig mir den weg', 'itinéraire vers',
+                    'comment aller', 'come arrivo', 'percorso per', 'caminho para', 'como chegar']
+EXTRA_PLAN = ['añadir al plan', 'quitar del plan', 'zum plan hinzu', 'plan ändern', 'ajouter au plan',
+              'modifier le plan', 'aggiungi al piano', 'adicionar ao plano']
+PLACES = ['airport', 'hotel', 'station', 'beach', 'museum', 'park', 'market', 'harbour', 'zoo', 'stadium',
+          'gallery', 'cathedral', 'winery', 'brewery', 'lookout', 'pier', 'lighthouse', 'island']
+
+
+def legacy_intents(text, keyword_lists):
+    message_lower = text.lower()
+    return {intent for intent, keywords in keyword_lists.items()
+            if any(keyword in message_lower for keyword in keywords)}
+
+
+def grown_lists():
+    directions = DIRECTION_KEYWORDS + EXTRA_DIRECTIONS
+    directions += [f"{verb} {place}" for verb, place in itertools.product(
+        ['directions to the', 'route to the', 'walk to the', 'drive to the', 'way to the', 'ruta al', 'weg zum'], PLACES)]
+    plan = PLAN_MODIFICATION_KEYWORDS + EXTRA_PLAN
+    plan += [f"{verb} {place}" for verb, place in itertools.product(
+        ['add', 'remove', 'swap', 'skip', 'book', 'cancel', 'añadir', 'entfernen'], PLACES)]
+    return {'directions': directions, 'plan_modification': plan}
+
+
+def bench(label, keyword_lists, number=2000):
+    classifier = IntentClassifier(keyword_lists)
+    total = sum(len(keywords) for keywords in keyword_lists.values())
+
+    legacy = timeit.timeit(lambda: [legacy_intents(m, keyword_lists) for m in MESSAGES], number=number)
+    compiled = timeit.timeit(lambda: [classifier.intents(m) for m in MESSAGES], number=number)
+    per_message = 1e6 / (number * len(MESSAGES))
+
+    print(f"{label} ({total} keywords)")
+    print(f"  any() scan per list      {legacy * per_message:7.2f} us/message")
+    print(f"  IntentClassifier         {compiled * per_message:7.2f} us/message")
+
+    differences = [m for m in MESSAGES if legacy_intents(m, keyword_lists) != classifier.intents(m)]
+    for message in differences:
+        print(f"  differs: {message!r}: {sorted(legacy_intents(message, keyword_lists))} -> "
+              f"{sorted(classifier.intents(message))}")
+
+
+def main():
+    bench("Current keyword lists", {'directions': DIRECTION_KEYWORDS, 'plan_modification': PLAN_MODIFICATION_KEYWORDS})
+    print()
+    bench("Grown multilingual lists", grown_lists())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Startup benchmark: import time, agent build time and time to first reply, each run
+in a fresh interpreter so nothing is already imported or cached.
+
+The first reply goes to the local stubs from agent/benchmarks/stubs.py, so it runs
+fully offline. For each entry point (the agent module, the Telegram bot, the FastAPI
+app) the report gives the median over --runs of:
+
+    import      importing the module, which should not pull in the heavy libraries
+    warmup      agent.agent.warmup(): building the model, tools and compiled agent
+    first reply the first ask_agent() after warmup
+    total       process start to first reply
+
+    python -m agent.benchmarks.bench_startup
+    python -m agent.benchmarks.bench_startup --runs 10 --json startup.json --baseline main.json
+
+Exits non-zero if importing an entry point loads any of HEAVY_MODULES, or with
+--baseline if import or total time regressed by more than --max-regression.
+"""
+from typing import Any, Dict, List, Optional
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from .bench_e2e import parse_args as e2e_parse_args, start_stubs
+
+TARGETS = {
+    'agent': "agent.agent",
+    'bot': "agent.telegram_bot.bot",
+    'api': "agent.main",
+}
+# Built only when the agent is: importing an entry point must not load these
+HEAVY_MODULES = ["langchain_openai", "langchain_tavily", "langchain_google_community", "langgraph.prebuilt",
+                 "openai", "numpy"]
+
+CHILD = """
+import importlib, json, sys, time, warnings
+warnings.filterwarnings("ignore")
+spawned = float(sys.argv[2])
+started = time.perf_counter()
+importlib.import_module(sys.argv[1])
+imported = time.perf_counter()
+heavy = [name for name in json.loads(sys.argv[3]) if name in sys.modules]
+from agent.agent import ask_agent, warmup
+warmup()
+warmed = time.perf_counter()
+reply = ask_agent("hi there", user_context={}, thread_id="startup")
+replied = time.perf_counter()
+print(json.dumps({
+    'import_s': imported - started,
+    'warmup_s': warmed - imported,
+    'first_reply_s': replied - warmed,
+    'total_s': time.time() - spawned,
+    'heavy_on_import': heavy,
+    'reply': str(reply)[:80],
+}))
+"""
+
+
+def run_once(module: str) -> Dict[str, Any]:
+    """Import `module`, warm up and ask one question in a new interpreter"""
+    spawned = time.time()
+    completed = subprocess.run([sys.executable, "-c", CHILD, module, repr(spawned), json.dumps(HEAVY_MODULES)],
+                               capture_output=True, text=True, env=os.environ.copy(), timeout=300)
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode != 0 or not lines:
+        raise RuntimeError(f"{module} failed to start:\n{completed.stderr[-2000:]}")
+    return json.loads(lines[-1])
+
+
+def measure(module: str, runs: int) -> Dict[str, Any]:
+    samples = [run_once(module) for _ in range(runs)]
+    result = {
+        'module': module,
+        'runs': runs,
+        'heavy_on_import': sorted({m for sample in samples for m in sample['heavy_on_import']}),
+        'reply': samples[-1]['reply'],
+    }
+    for key in ('import_s', 'warmup_s', 'first_reply_s', 'total_s'):
+        result[key.replace('_s', '_ms')] = round(statistics.median(s[key] for s in samples) * 1000, 1)
+    return result
+
+
+def print_report(results: Dict[str, Dict[str, Any]]) -> None:
+    print(f"\n{'entry point':<12} {'import ms':>10} {'warmup ms':>10} {'1st reply ms':>13} {'total ms':>10}  heavy on import")
+    for name, result in results.items():
+        heavy = ", ".join(result['heavy_on_import']) or "-"
+        print(f"{name:<12} {result['import_ms']:>10.1f} {result['warmup_ms']:>10.1f} "
+              f"{result['first_reply_ms']:>13.1f} {result['total_ms']:>10.1f}  {heavy}")
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+            max_regression: float) -> List[str]:
+    """Import or total time regressions beyond `max_regression` (a fraction)"""
+    problems = []
+    for name, result in results.items():
+        for key in ('import_ms', 'total_ms'):
+            base = baseline.get(name, {}).get(key)
+            if base and result[key] > base * (1 + max_regression):
+                problems.append(f"{name} {key[:-3]} {result[key]:.1f} ms vs {base:.1f} ms baseline")
+    return problems
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--target", choices=list(TARGETS), action="append",
+                        help="entry point to measure (repeatable; default all)")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per entry point")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="seconds per LLM response")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="results file from an earlier run to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="allowed slowdown against the baseline, as a fraction")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    # The stubs' URLs and dummy keys go into os.environ, which each child inherits
+    stubs = start_stubs(e2e_parse_args(["--llm-latency", str(args.llm_latency), "--jitter", "0"]))
+    try:
+        results = {name: measure(TARGETS[name], args.runs) for name in (args.target or TARGETS)}
+    finally:
+        for stub in stubs.values():
+            stub.stop()
+    print_report(results)
+
+    problems = [f"importing {result['module']} loads {', '.join(result['heavy_on_import'])}"
+                for result in results.values() if result['heavy_on_import']]
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems += compare(results, json.load(f), args.max_regression)
+    for problem in problems:
+        print(f"REGRESSION: {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
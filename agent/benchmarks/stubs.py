@@ -0,0 +1,389 @@
+"""
+Local stand-ins for the agent's external services, for offline benchmarks.
+
+Each stub is a small threaded HTTP server on 127.0.0.1 with a configurable response
+latency (plus jitter) and per-endpoint call counters:
+
+    ScriptedLLMServer  OpenAI-compatible /chat/completions (plain and streamed) that
+                       answers with tool calls picked from the user's message
+    GoogleServer       Geocoding, Places text/nearby search and details, Routes
+                       computeRoutes and computeRouteMatrix
+    TavilyServer       Tavily /search
+    TelegramServer     Bot API methods (getMe, sendMessage, editMessageText, ...)
+
+Responses are deterministic: coordinates come from a hash of the place name, and
+travel times from the straight-line distance, so runs are comparable.
+"""
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+import hashlib
+import itertools
+import json
+import math
+import random
+import re
+import threading
+import time
+
+# Generated places are spread over roughly 50 km around Perth
+CENTER = (-31.95, 115.86)
+
+
+def place_coords(name: str) -> tuple:
+    digest = hashlib.md5(name.strip().lower().encode()).digest()
+    return CENTER[0] - 0.25 + digest[0] / 255 * 0.5, CENTER[1] - 0.25 + digest[1] / 255 * 0.5
+
+
+def travel(a: Dict[str, float], b: Dict[str, float], speed_mps: float = 12.0) -> tuple:
+    """(seconds, meters) between two {latitude, longitude} points"""
+    meters = math.hypot(a['latitude'] - b['latitude'], a['longitude'] - b['longitude']) * 111000
+    return int(meters / speed_mps) + 1, int(meters)
+
+
+class StubServer:
+    """Threaded HTTP server on a free local port, counting calls per endpoint"""
+
+    handler_class: type = BaseHTTPRequestHandler
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.counts: Counter = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(self.handler_class):
+            server_stub = stub
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name=type(self).__name__, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_port}"
+
+    def start(self) -> "StubServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def record(self, endpoint: str) -> None:
+        with self._lock:
+            self.counts[endpoint] += 1
+
+    def delay(self) -> None:
+        if self.latency <= 0:
+            return
+        with self._lock:
+            factor = 1 + self._random.uniform(-self.jitter, self.jitter)
+        time.sleep(max(0.0, self.latency * factor))
+
+    def total_calls(self) -> int:
+        with self._lock:
+            return sum(self.counts.values())
+
+
+class JSONHandler(BaseHTTPRequestHandler):
+    """Keep-alive JSON handler: subclasses implement get(path, query) / post(path, body)"""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; without this, Nagle plus delayed ACKs add ~40 ms each
+    disable_nagle_algorithm = True
+    server_stub: StubServer = None
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def send_json(self, payload: Any, status: int = 200) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def endpoint(self, path: str) -> str:
+        return path
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        self.server_stub.record(self.endpoint(url.path))
+        self.server_stub.delay()
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        self.get(url.path, query)
+
+    def do_POST(self) -> None:
+        url = urlparse(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        content_type = self.headers.get("Content-Type", "")
+        if "json" in content_type and raw:
+            body = json.loads(raw)
+        else:
+            # Form fields, in the body or (as telebot sends them) the query string
+            body = {key: values[0] for key, values in parse_qs(url.query).items()}
+            body.update({key: values[0] for key, values in parse_qs(raw.decode()).items()})
+        self.server_stub.record(self.endpoint(url.path))
+        self.server_stub.delay()
+        self.post(url.path, body)
+
+    def get(self, path: str, query: Dict[str, str]) -> None:
+        self.send_json({"error": "not found"}, status=404)
+
+    def post(self, path: str, body: Any) -> None:
+        self.send_json({"error": "not found"}, status=404)
+
+
+class GoogleHandler(JSONHandler):
+    def get(self, path: str, query: Dict[str, str]) -> None:
+        if path.endswith("/geocode/json"):
+            if "address" in query:
+                lat, lng = place_coords(query["address"])
+                address = query["address"]
+            else:
+                lat, lng = map(float, query.get("latlng", "0,0").split(","))
+                address = f"{int(abs(lat * 1000)) % 200 + 1} Stub Street, Perth WA"
+            self.send_json({"status": "OK", "results": [{
+                "formatted_address": address,
+                "geometry": {"location": {"lat": lat, "lng": lng}},
+                "place_id": hashlib.md5(address.encode()).hexdigest()[:16],
+            }]})
+        elif path.endswith("/place/textsearch/json"):
+            text = query.get("query", "")
+            self.send_json({"status": "OK", "results": [self._place(f"{text} #{i}") for i in range(1, 6)]})
+        elif path.endswith("/place/nearbysearch/json"):
+            lat, lng = map(float, query.get("location", "0,0").split(","))
+            keyword = query.get("keyword", "place")
+            results = []
+            for i in range(1, 16):
+                place = self._place(f"{keyword} #{i}")
+                place["geometry"]["location"] = {"lat": lat + 0.002 * i * (-1) ** i, "lng": lng + 0.003 * (8 - i)}
+                results.append(place)
+            self.send_json({"status": "OK", "results": results})
+        elif path.endswith("/place/details/json"):
+            place_id = query.get("placeid") or query.get("place_id", "")
+            self.send_json({"status": "OK", "result": {
+                "name": f"Place {place_id[:6]}",
+                "formatted_address": f"{int(place_id[:4] or '1', 16) % 300 + 1} Hay Street, Perth WA",
+                "formatted_phone_number": "(08) 9000 0000",
+                "website": f"https://example.com/{place_id[:8]}",
+                "place_id": place_id,
+            }})
+        else:
+            super().get(path, query)
+
+    @staticmethod
+    def _place(name: str) -> Dict[str, Any]:
+        lat, lng = place_coords(name)
+        return {
+            "name": name.title(),
+            "place_id": hashlib.md5(name.encode()).hexdigest()[:16],
+            "formatted_address": f"{name.title()}, Perth WA",
+            "vicinity": "Perth",
+            "rating": 4.2,
+            "geometry": {"location": {"lat": lat, "lng": lng}},
+        }
+
+    def post(self, path: str, body: Any) -> None:
+        if path.endswith(":computeRouteMatrix"):
+            elements = []
+            for i, origin in enumerate(body["origins"]):
+                for j, destination in enumerate(body["destinations"]):
+                    seconds, meters = travel(self._point(origin["waypoint"]), self._point(destination["waypoint"]))
+                    elements.append({"originIndex": i, "destinationIndex": j, "duration": f"{seconds}s",
+                                     "distanceMeters": meters, "condition": "ROUTE_EXISTS"})
+            self.send_json(elements)
+        elif path.endswith(":computeRoutes"):
+            intermediates = body.get("intermediates", [])
+            if len(intermediates) > 25:
+                self.send_json({"error": {"code": 400, "status": "INVALID_ARGUMENT",
+                                          "message": "Too many intermediates"}}, status=400)
+                return
+            points = [body["origin"]] + intermediates + [body["destination"]]
+            legs = []
+            for a, b in zip(points, points[1:]):
+                seconds, meters = travel(self._point(a), self._point(b))
+                legs.append({"duration": f"{seconds}s", "distanceMeters": meters,
+                             "startLocation": {"latLng": a["location"]["latLng"]},
+                             "endLocation": {"latLng": b["location"]["latLng"]}})
+            route = {"duration": f"{sum(int(leg['duration'][:-1]) for leg in legs)}s",
+                     "distanceMeters": sum(leg["distanceMeters"] for leg in legs), "legs": legs}
+            if intermediates and body.get("optimizeWaypointOrder"):
+                route["optimizedIntermediateWaypointIndex"] = list(range(len(intermediates)))
+            self.send_json({"routes": [route]})
+        else:
+            super().post(path, body)
+
+    @staticmethod
+    def _point(waypoint: Dict[str, Any]) -> Dict[str, float]:
+        return waypoint["location"]["latLng"]
+
+
+class GoogleServer(StubServer):
+    handler_class = GoogleHandler
+
+
+class TavilyHandler(JSONHandler):
+    def post(self, path: str, body: Any) -> None:
+        if not path.endswith("/search"):
+            return super().post(path, body)
+        query = body.get("query", "")
+        results = [{
+            "title": f"{query.title()} - result {i}",
+            "url": f"https://example.com/{re.sub(r'[^a-z0-9]+', '-', query.lower())}/{i}",
+            "content": f"Everything about {query}: opening hours, tickets and tips from locals. " * 3,
+            "score": round(0.9 - i * 0.1, 2),
+            "raw_content": None,
+        } for i in range(body.get("max_results") or 5)]
+        self.send_json({"query": query, "follow_up_questions": None, "answer": None, "images": [],
+                        "results": results, "response_time": 0.5})
+
+
+class TavilyServer(StubServer):
+    handler_class = TavilyHandler
+
+
+class TelegramHandler(JSONHandler):
+    """Bot API methods at /bot<token>/<method>; replies are recorded per chat"""
+
+    def endpoint(self, path: str) -> str:
+        return path.rsplit("/", 1)[-1]
+
+    def get(self, path: str, query: Dict[str, str]) -> None:
+        self.post(path, query)
+
+    def post(self, path: str, body: Any) -> None:
+        stub: TelegramServer = self.server_stub
+        method = self.endpoint(path)
+        if method == "getMe":
+            return self.send_json({"ok": True, "result": {"id": 1, "is_bot": True, "first_name": "Stub",
+                                                          "username": "stub_bot"}})
+        chat_id = int(body.get("chat_id", 0) or 0)
+        if method in ("sendMessage", "editMessageText"):
+            stub.replied(chat_id, method, str(body.get("text", "")))
+        if method in ("sendMessage", "editMessageText", "sendLocation"):
+            message_id = int(body.get("message_id") or next(stub.message_ids))
+            return self.send_json({"ok": True, "result": {
+                "message_id": message_id, "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"}, "text": body.get("text", ""),
+            }})
+        self.send_json({"ok": True, "result": True})
+
+
+class TelegramServer(StubServer):
+    handler_class = TelegramHandler
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.message_ids = itertools.count(1000)
+        self.replies: Dict[int, List[tuple]] = {}
+
+    def replied(self, chat_id: int, method: str, text: str) -> None:
+        with self._lock:
+            self.replies.setdefault(chat_id, []).append((method, text))
+
+    def api_url(self) -> str:
+        return self.url + "/bot{0}/{1}"
+
+
+class ScriptedLLMHandler(JSONHandler):
+    """
+    OpenAI-compatible chat completions. After a tool result it writes a short final
+    answer from it; otherwise it calls the tools the user's message asks for (several
+    at once when it asks for several things), or just chats.
+    """
+
+    TOOL_RULES = [
+        (re.compile(r"\b(?:closest|nearest)\s+([\w ]+?)(?:\?|$| near| open)", re.I),
+         lambda m, text: ("find_closest", {"category": m.group(1).strip()})),
+        (re.compile(r"\b(?:itinerary|plan a (?:day|trip)).*?\bvisit(?:ing)?\s+(.+?)(?:\?|$)", re.I),
+         lambda m, text: ("plan_itinerary", {"stops": [s.strip() for s in re.split(r",|\band\b", m.group(1))
+                                                        if s.strip()]})),
+        (re.compile(r"\b(?:get to|directions to|route to|take me to)\s+(.+?)(?:\?|$| and )", re.I),
+         lambda m, text: ("google_routes", {"destination": m.group(1).strip()})),
+        (re.compile(r"\b(restaurants?|cafes?|bars?|hotels?|museums?)\s+(?:in|near|around)\s+([\w ]+)", re.I),
+         lambda m, text: ("google_places", {"query": f"{m.group(1)} in {m.group(2).strip()}"})),
+        (re.compile(r"\b(?:what's on|events|news|weather|tell me about)\s*(?:in|at|for)?\s*([\w ]+)", re.I),
+         lambda m, text: ("tavily_search", {"query": m.group(0).strip()})),
+    ]
+
+    def post(self, path: str, body: Any) -> None:
+        if not path.endswith("/chat/completions"):
+            return super().post(path, body)
+        message = self.reply(body.get("messages", []))
+        prompt_tokens = sum(len(str(m.get("content") or "")) for m in body.get("messages", [])) // 4
+        completion_tokens = max(1, len(message.get("content") or "") // 4 + 10 * len(message.get("tool_calls", [])))
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        finish_reason = "tool_calls" if message.get("tool_calls") else "stop"
+        if body.get("stream"):
+            self.stream(body, message, finish_reason, usage)
+        else:
+            self.send_json({"id": f"chatcmpl-{next(self.server_stub.ids)}", "object": "chat.completion",
+                            "created": int(time.time()), "model": body.get("model", "stub"),
+                            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                            "usage": usage})
+
+    def reply(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        # The agent may append a system message (location context) after the conversation
+        conversation = [m for m in messages if m.get("role") != "system"]
+        last = conversation[-1] if conversation else {}
+        if last.get("role") == "tool":
+            results = [str(m.get("content") or "") for m in reversed(messages) if m.get("role") == "tool"]
+            summary = " ".join(results[0].split())[:300]
+            return {"role": "assistant", "content": f"Here's what I found. {summary}"}
+
+        user_text = next((str(m.get("content") or "") for m in reversed(messages) if m.get("role") == "user"), "")
+        calls = []
+        for pattern, build in self.TOOL_RULES:
+            match = pattern.search(user_text)
+            if match:
+                name, args = build(match, user_text)
+                calls.append({"id": f"call_{next(self.server_stub.ids)}", "type": "function",
+                              "function": {"name": name, "arguments": json.dumps(args)}})
+        if calls:
+            return {"role": "assistant", "content": None, "tool_calls": calls}
+        return {"role": "assistant",
+                "content": "Happy to help with your trip! Ask me for directions, places to eat or what's on."}
+
+    def stream(self, body: Dict[str, Any], message: Dict[str, Any], finish_reason: str,
+               usage: Dict[str, int]) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        base = {"id": f"chatcmpl-{next(self.server_stub.ids)}", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": body.get("model", "stub")}
+
+        def send(delta: Dict[str, Any], finish: Optional[str] = None, **extra: Any) -> None:
+            chunk = {**base, "choices": [{"index": 0, "delta": delta, "finish_reason": finish}], **extra}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+
+        send({"role": "assistant", "content": ""})
+        content = message.get("content") or ""
+        for start in range(0, len(content), 24):
+            send({"content": content[start:start + 24]})
+        for index, call in enumerate(message.get("tool_calls", [])):
+            send({"tool_calls": [{"index": index, **call}]})
+        send({}, finish_reason)
+        if (body.get("stream_options") or {}).get("include_usage"):
+            self.wfile.write(f"data: {json.dumps({**base, 'choices': [], 'usage': usage})}\n\n".encode())
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+
+class ScriptedLLMServer(StubServer):
+    handler_class = ScriptedLLMHandler
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.ids = itertools.count(1)
@@ -0,0 +1,205 @@
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import json
+import os
+import sqlite3
+import threading
+import time
+
+_MISSING = object()
+
+
+class CacheStats:
+    """Hit/miss counters for a cache"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def record(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': round(self.hit_rate, 4)}
+
+
+class MemoryCache:
+    """Thread-safe in-memory LRU cache with per-entry TTL"""
+
+    def __init__(self, max_entries: int = 10000, default_ttl: float = 86400):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.time():
+                    self._entries.move_to_end(key)
+                    self.stats.record(True)
+                    return value
+                del self._entries[key]
+        self.stats.record(False)
+        return default
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.time() + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """
+    On-disk cache with per-entry TTL, stored as JSON in a SQLite table.
+    Safe to share between threads and between processes using the same file.
+    Expired rows are deleted when read, and all of them every `purge_interval`
+    seconds on write, so the file doesn't grow without bound.
+    """
+
+    def __init__(self, path: str, namespace: str = "default", default_ttl: float = 30 * 86400,
+                 purge_interval: float = 3600):
+        self.path = path
+        self.namespace = namespace
+        self.default_ttl = default_ttl
+        self.purge_interval = purge_interval
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._next_purge = time.time() + purge_interval
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires_at REAL NOT NULL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+
+    def get_entry(self, key: str) -> Optional[tuple]:
+        """(value, expires_at) of a live entry, or None; an expired entry is deleted"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+            if row is not None and row[1] <= now:
+                with self._conn:
+                    self._conn.execute(
+                        "DELETE FROM cache WHERE namespace = ? AND key = ? AND expires_at <= ?",
+                        (self.namespace, key, now),
+                    )
+        if row is not None and row[1] > now:
+            self.stats.record(True)
+            return json.loads(row[0]), row[1]
+        self.stats.record(False)
+        return None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        entry = self.get_entry(key)
+        return default if entry is None else entry[0]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        now = time.time()
+        expires_at = now + (self.default_ttl if ttl is None else ttl)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value), expires_at),
+            )
+        if now >= self._next_purge:
+            self._next_purge = now + self.purge_interval
+            self.purge_expired()
+
+    def delete(self, key: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+
+    def purge_expired(self) -> int:
+        """Delete expired entries, returning how many were removed"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND expires_at <= ?", (self.namespace, time.time())
+            )
+        return cursor.rowcount
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class TieredCache:
+    """
+    In-memory LRU in front of an optional SQLite tier. Disk hits are promoted
+    to memory for the time they have left; writes go to both tiers.
+    """
+
+    def __init__(self, memory: Optional[MemoryCache] = None, disk: Optional[SQLiteCache] = None):
+        self.memory = memory if memory is not None else MemoryCache()
+        self.disk = disk
+        self.stats = CacheStats()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self.memory.get(key, _MISSING)
+        if value is _MISSING and self.disk is not None:
+            entry = self.disk.get_entry(key)
+            if entry is not None:
+                value, expires_at = entry
+                self.memory.set(key, value, ttl=expires_at - time.time())
+        self.stats.record(value is not _MISSING)
+        return default if value is _MISSING else value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.memory.set(key, value, ttl)
+        if self.disk is not None:
+            self.disk.set(key, value, ttl)
+
+    def delete(self, key: str) -> None:
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats_summary(self) -> Dict[str, Any]:
+        summary = {'overall': self.stats.as_dict(), 'memory': self.memory.stats.as_dict()}
+        if self.disk is not None:
+            summary['disk'] = self.disk.stats.as_dict()
+        return summary
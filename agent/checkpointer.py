@@ -0,0 +1,125 @@
+from langgraph.checkpoint.memory import MemorySaver
+from langchain_core.runnables import RunnableConfig
+from .history import is_summary
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+import threading
+import time
+
+
+class BoundedMemorySaver(MemorySaver):
+    """
+    In-process checkpointer that keeps memory and prompt size flat.
+
+    - Each thread's message history is trimmed to the last `max_messages` messages,
+      always starting on a user message so tool calls are never split from their results.
+      A leading history summary message (see history.py) is kept ahead of the window.
+    - Only the newest `max_checkpoints_per_thread` checkpoints of a thread are kept.
+    - Threads idle for longer than `idle_ttl` seconds are dropped, and once more than
+      `max_threads` threads are held the least recently used ones are dropped.
+    """
+
+    def __init__(self, max_threads: int = 1000, idle_ttl: float = 3600, max_messages: int = 40,
+                 max_checkpoints_per_thread: int = 2, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.max_threads = max_threads
+        self.idle_ttl = idle_ttl
+        self.max_messages = max_messages
+        self.max_checkpoints_per_thread = max(1, max_checkpoints_per_thread)
+        self._last_access: "OrderedDict[str, float]" = OrderedDict()
+        self._channel_versions: Dict[tuple, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+
+    def trim_messages(self, messages: List[Any]) -> List[Any]:
+        """Keep the most recent messages, starting the window on a user message"""
+        if self.max_messages <= 0 or len(messages) <= self.max_messages:
+            return messages
+        if is_summary(messages[0]):
+            return messages[:1] + self.trim_messages(messages[1:])
+
+        human_indices = [i for i, m in enumerate(messages) if getattr(m, 'type', None) == 'human']
+        if not human_indices:
+            return messages
+
+        start = next((i for i in human_indices if len(messages) - i <= self.max_messages), None)
+        if start is None:
+            # The current turn alone is over the window; keep it whole
+            start = human_indices[-1]
+        return messages[start:]
+
+    def _touch(self, thread_id: str) -> None:
+        """Mark a thread as used and evict idle or least recently used threads"""
+        now = time.monotonic()
+        with self._lock:
+            self._last_access[thread_id] = now
+            self._last_access.move_to_end(thread_id)
+
+            expired = [t for t, seen in self._last_access.items() if now - seen > self.idle_ttl]
+            for t in expired:
+                self._evict(t)
+
+            while len(self._last_access) > self.max_threads:
+                oldest = next(iter(self._last_access))
+                self._evict(oldest)
+
+    def _evict(self, thread_id: str) -> None:
+        self._last_access.pop(thread_id, None)
+        for key in [k for k in self._channel_versions if k[0] == thread_id]:
+            del self._channel_versions[key]
+        super().delete_thread(thread_id)
+
+    def _prune_checkpoints(self, thread_id: str, checkpoint_ns: str) -> None:
+        """Drop all but the newest checkpoints of a thread, with their writes and blobs"""
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        if len(checkpoints) <= self.max_checkpoints_per_thread:
+            return
+
+        # Checkpoint ids are time-ordered, so sorting puts the oldest first
+        ordered = sorted(checkpoints)
+        stale = ordered[:-self.max_checkpoints_per_thread]
+        for checkpoint_id in stale:
+            del checkpoints[checkpoint_id]
+            self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+            self._channel_versions.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+
+        referenced = set()
+        for checkpoint_id in checkpoints:
+            versions = self._channel_versions.get((thread_id, checkpoint_ns, checkpoint_id), {})
+            referenced.update(versions.items())
+        for key in list(self.blobs.keys()):
+            if key[0] == thread_id and key[1] == checkpoint_ns and (key[2], key[3]) not in referenced:
+                del self.blobs[key]
+
+    def get_tuple(self, config: RunnableConfig):
+        self._touch(config["configurable"]["thread_id"])
+        return super().get_tuple(config)
+
+    def put(self, config: RunnableConfig, checkpoint, metadata, new_versions) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+
+        if "messages" in new_versions and "messages" in checkpoint["channel_values"]:
+            checkpoint = checkpoint.copy()
+            checkpoint["channel_values"] = {
+                **checkpoint["channel_values"],
+                "messages": self.trim_messages(checkpoint["channel_values"]["messages"]),
+            }
+
+        with self._lock:
+            saved_config = super().put(config, checkpoint, metadata, new_versions)
+            self._channel_versions[(thread_id, checkpoint_ns, checkpoint["id"])] = dict(checkpoint["channel_versions"])
+            self._prune_checkpoints(thread_id, checkpoint_ns)
+        self._touch(thread_id)
+        return saved_config
+
+    def put_writes(self, config: RunnableConfig, writes, task_id: str, task_path: str = "") -> None:
+        with self._lock:
+            super().put_writes(config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._evict(thread_id)
+
+    def thread_count(self) -> int:
+        """Number of conversation threads currently held in memory"""
+        return len(self._last_access)
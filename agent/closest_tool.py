@@ -0,0 +1,123 @@
+from langchain_core.tools import BaseTool
+from langchain_core.runnables import RunnableConfig
+from pydantic import BaseModel, Field
+from .cache import MemoryCache
+from .metrics import metrics
+from .google_route_tool import GoogleRoutesTool, ResolvedLocation
+from .tool_cache import normalize_query
+from typing import Any, Dict, List
+import asyncio
+import numpy as np
+import os
+import requests
+
+def haversine_many_m(latitude: float, longitude: float, latitudes: Any, longitudes: Any) -> np.ndarray:
+    """Great-circle distances in meters from one point to arrays of points, vectorized"""
+    phi1 = np.radians(latitude)
+    phi2 = np.radians(np.asarray(latitudes, dtype=float))
+    d_phi = phi2 - phi1
+    d_lambda = np.radians(np.asarray(longitudes, dtype=float) - longitude)
+    a = np.sin(d_phi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(d_lambda / 2) ** 2
+    return 2 * 6371000 * np.arcsin(np.sqrt(a))
+
+
+class ClosestPlacesInput(BaseModel):
+    category: str = Field(description="Kind of place to look for, e.g. 'pharmacy', 'coffee', 'petrol station'")
+    top_k: int = Field(default=3, description="How many places to return")
+    mode: str = Field(default="driving", description="Travel mode (driving/walking/bicycling/transit)")
+    open_now: bool = Field(default=False, description="Only places open right now")
+
+class ClosestPlacesTool(BaseTool):
+    """
+    Finds the places of a category closest to the user by travel time. One nearby
+    search gives the candidates, a vectorized straight-line distance filter keeps the
+    nearest `max_candidates`, and a single route matrix request times them all, so
+    the cost is one Places call and one matrix batch rather than a route per candidate.
+    """
+    name: str = "find_closest"
+    description: str = (
+        "Find the closest places of a kind (pharmacy, cafe, ATM, petrol station...) to the user's current "
+        "location, ranked by actual travel time, with a Google Maps link for each. Needs the user's shared "
+        "location. Input: category, optional top_k, travel mode, and open_now."
+    )
+    args_schema: Any = ClosestPlacesInput
+    routes: Any = Field(default=None, exclude=True)
+    max_candidates: int = Field(default=10, exclude=True)
+    search_cache: Any = Field(default=None, exclude=True)
+
+    def __init__(self, routes: GoogleRoutesTool, max_candidates: int = None, **kwargs: Any):
+        super().__init__(routes=routes, **kwargs)
+        self.max_candidates = max_candidates or int(os.getenv("CLOSEST_MAX_CANDIDATES", "10"))
+        # Nearby results for a category barely change within ~100 m and an hour
+        self.search_cache = MemoryCache(max_entries=2000, default_ttl=3600)
+
+    def _candidates(self, latitude: float, longitude: float, category: str, open_now: bool) -> List[Dict]:
+        """Places of the category near a point, nearest first (cached by rounded position)"""
+        key = f"nearby:{latitude:.3f},{longitude:.3f}:{normalize_query(category)}:{int(open_now)}"
+        cached = self.search_cache.get(key)
+        if cached is not None:
+            return cached
+        with metrics.stage("places_api", method="nearbySearch"):
+            response = self.routes.gmaps.places_nearby(location=(latitude, longitude), keyword=category,
+                                                       rank_by="distance", open_now=open_now)
+        results = response.get('results', [])
+        self.search_cache.set(key, results)
+        return results
+
+    def _find(self, category: str, top_k: int, mode: str, open_now: bool, user_context: Dict) -> str:
+        routes = self.routes
+        coords = routes._get_current_location_coords(user_context)
+        if not coords:
+            return "❌ I need your current location to find the closest places. Please share your location."
+
+        candidates = [place for place in self._candidates(coords['latitude'], coords['longitude'], category, open_now)
+                      if 'geometry' in place]
+        if not candidates:
+            return f"❌ No {category} found near you"
+
+        latitudes = [place['geometry']['location']['lat'] for place in candidates]
+        longitudes = [place['geometry']['location']['lng'] for place in candidates]
+        straight_line = haversine_many_m(coords['latitude'], coords['longitude'], latitudes, longitudes)
+        nearest = np.argsort(straight_line)[:self.max_candidates]
+
+        origin = ResolvedLocation(name="Current Location", **coords)
+        destinations = [ResolvedLocation(name=candidates[i].get('name', category), latitude=latitudes[i],
+                                         longitude=longitudes[i]) for i in nearest]
+        durations, distances = routes.route_matrix.matrix([origin], destinations, mode)
+        # Unreachable candidates go before the top_k cut, so they can't crowd out reachable ones
+        durations_from_origin = np.asarray(durations[0], dtype=float)
+        reachable = np.flatnonzero(np.isfinite(durations_from_origin))
+        if not len(reachable):
+            return f"❌ No reachable {category} found near you by {mode}"
+        ranked = reachable[np.argsort(durations_from_origin[reachable], kind="stable")][:max(1, top_k)]
+
+        result = f"📍 **Closest {category}** from your location ({mode.title()}):\n\n"
+        for shown, rank in enumerate(ranked, 1):
+            duration, distance = durations[0][rank], distances[0][rank]
+            place = candidates[nearest[rank]]
+            destination = destinations[rank]
+            result += f"{shown}. **{destination.name}**"
+            if place.get('vicinity'):
+                result += f" — {place['vicinity']}"
+            result += f"\n   ⏱️ {routes._format_duration(int(duration))}, 📏 {routes._format_distance(int(distance))}"
+            if place.get('rating'):
+                result += f", ⭐ {place['rating']}"
+            result += f"\n   🔗 [Directions](https://www.google.com/maps/dir/{origin.url_part()}/{destination.url_part()})\n"
+        return result
+
+    def _run(self, category: str, top_k: int = 3, mode: str = "driving", open_now: bool = False,
+             config: RunnableConfig = None) -> str:
+        try:
+            user_context = self.routes._get_user_context(config)
+            return self._find(category, top_k, mode.lower(), open_now, user_context)
+        except requests.exceptions.RequestException as e:
+            metrics.count("errors", component="find_closest", error=type(e).__name__)
+            return f"❌ Network error calling Google Maps: {str(e)}"
+        except Exception as e:
+            print(f"Closest places error: {e}")
+            metrics.count("errors", component="find_closest", error=type(e).__name__)
+            return f"❌ Unexpected error: {str(e)}"
+
+    async def _arun(self, category: str, top_k: int = 3, mode: str = "driving", open_now: bool = False,
+                    config: RunnableConfig = None) -> str:
+        return await asyncio.to_thread(self._run, category, top_k, mode, open_now, config)
@@ -0,0 +1,127 @@
+"""
+Deterministic parsing of unambiguous route requests ("directions from X to Y",
+"walk to Z"), so they can go straight to GoogleRoutesTool without the LLM.
+Anything this module isn't sure about returns None and goes to the agent.
+"""
+from .google_route_tool import GoogleRoutesInput
+from typing import List, Optional
+import re
+
+MODE_WORDS = {
+    'walk': 'walking', 'walking': 'walking', 'on foot': 'walking',
+    'drive': 'driving', 'driving': 'driving', 'by car': 'driving',
+    'cycle': 'bicycling', 'cycling': 'bicycling', 'bike': 'bicycling', 'biking': 'bicycling',
+    'by bike': 'bicycling', 'bicycling': 'bicycling',
+    'transit': 'transit', 'public transport': 'transit', 'by bus': 'transit', 'by train': 'transit',
+}
+
+_MODE = r"(?P<mode>walking|driving|cycling|biking|bicycling|transit)"
+_TRAILING_MODE = r"(?:\s+(?P<trailing_mode>on foot|by car|by bike|by bus|by train|by public transport|by transit))?"
+_VIA = r"(?:\s+(?:via|through|stopping at)\s+(?P<via>.+?))?"
+_END = _TRAILING_MODE + r"(?:\s*,?\s+(?:please|thanks|thank you))?\s*[?.!]*\s*$"
+
+ROUTE_PATTERNS = [
+    # "directions from X to Y", "walking route from X to Y via Z", "how do I get from X to Y"
+    re.compile(
+        r"^(?:(?:please|can you|could you)\s+)?(?:(?:get|give|show)\s+(?:me\s+)?)?(?:the\s+)?"
+        rf"(?:{_MODE}\s+)?(?:directions|route|way|how\s+(?:do|can)\s+i\s+get|how\s+to\s+get)\s+"
+        r"from\s+(?P<origin>.+?)\s+to\s+(?P<destination>.+?)" + _VIA + _END,
+        re.IGNORECASE,
+    ),
+    # "directions to Y", "route to Y from X", "take me to Y", "navigate to Y"
+    re.compile(
+        r"^(?:(?:please|can you|could you)\s+)?(?:(?:get|give|show)\s+(?:me\s+)?)?(?:the\s+)?"
+        rf"(?:{_MODE}\s+)?(?:directions|route|navigate|take\s+me|get\s+me)\s+to\s+(?P<destination>.+?)"
+        r"(?:\s+from\s+(?P<origin>.+?))?" + _VIA + _END,
+        re.IGNORECASE,
+    ),
+    # "walk to Y", "drive from X to Y", "cycle to Y via Z"
+    re.compile(
+        r"^(?:(?:how\s+(?:do|can)\s+i|i\s+want\s+to|i\s+need\s+to)\s+)?"
+        r"(?P<verb>walk|drive|cycle|bike)\s+(?:from\s+(?P<origin>.+?)\s+)?to\s+(?P<destination>.+?)" + _VIA + _END,
+        re.IGNORECASE,
+    ),
+]
+
+# Destinations that need a search, the conversation history or an opinion to resolve
+AMBIGUOUS_WORDS = re.compile(
+    r"\b(?:closest|nearest|nearby|near|best|good|cheap|cheapest|some|any|a|an|somewhere|anywhere|"
+    r"there|here|it|that|this|those|these|my|our|next|first|last|then|and then|or)\b",
+    re.IGNORECASE,
+)
+# Constraints trailing the destination ("avoiding tolls", "tomorrow at 9am", "instead",
+# "cheaply") that the routes tool can't take: the agent handles these
+QUALIFIER_WORDS = re.compile(
+    r"\b(?:avoid|avoiding|without|instead|rather|except|no\s+tolls|tolls?|highways?|motorways?|ferries|traffic|"
+    r"today|tonight|tomorrow|yesterday|now|later|soon|asap|morning|afternoon|evening|night|weekend|"
+    r"monday|tuesday|wednesday|thursday|friday|saturday|sunday|"
+    r"leaving|leave|departing|depart|arriving|arrive|before|after|until|"
+    r"cheaply|quickly|fast|fastest|quickest|shortest|scenic|scenically|safely|directly|slowly|easily)\b"
+    r"|\b\d{1,2}(?::\d{2})?\s*(?:am|pm)\b|\bat\s+\d{1,2}(?::\d{2})?\b|\bo'clock\b"
+    r"|\bin\s+(?:\d+|an?|half\s+an)\s+(?:minutes?|mins?|hours?|hrs?)\b",
+    re.IGNORECASE,
+)
+# Places that mean something different for every user ("home", "work", "my hotel", "back")
+PERSONAL_PLACES = re.compile(
+    r"\b(?:home|work|office|hotel|hostel|motel|accommodation|airbnb|school|uni|base|back|again)\b",
+    re.IGNORECASE,
+)
+# A place name is a noun phrase: connecting words mean a second place ("Perth and Fremantle"),
+# a purpose ("for dinner", "with the kids") or a mode the patterns don't know ("by ferry").
+# "of" and "the" are allowed ("Art Gallery of WA").
+CLAUSE_WORDS = re.compile(
+    r"\b(?:and|or|but|to|from|for|with|by|at|in|on|via|through|so|because|if|when|while|also|too|"
+    r"ferry|boat|taxi|uber|plane|flight|fly|scooter|tram)\b",
+    re.IGNORECASE,
+)
+# Anything else (quotes, brackets, emoji, "?" mid-sentence) is more than a place name
+PLACE_CHARACTERS = re.compile(r"^[\w\s'’.,&/#-]+$")
+MAX_PLACE_WORDS = 8
+
+
+def _clean_place(place: Optional[str]) -> str:
+    return (place or "").strip().strip(",").strip()
+
+
+def _is_ambiguous(place: str) -> bool:
+    words = place.split()
+    if not words or len(words) > MAX_PLACE_WORDS or AMBIGUOUS_WORDS.search(place):
+        return True
+    if QUALIFIER_WORDS.search(place) or PERSONAL_PLACES.search(place) or CLAUSE_WORDS.search(place):
+        return True
+    if not PLACE_CHARACTERS.match(place):
+        return True
+    # "the beach", "the airport": which one depends on where the user is
+    return len(words) == 2 and words[0].lower() == 'the'
+
+
+def _split_waypoints(via: Optional[str]) -> List[str]:
+    if not via:
+        return []
+    return [_clean_place(stop) for stop in re.split(r",|\s+and\s+", via) if _clean_place(stop)]
+
+
+def parse_route_request(message: str) -> Optional[GoogleRoutesInput]:
+    """Parse an unambiguous route request, or return None if the agent should handle it"""
+    text = " ".join(message.split())
+    for pattern in ROUTE_PATTERNS:
+        match = pattern.match(text)
+        if not match:
+            continue
+
+        groups = match.groupdict()
+        origin = _clean_place(groups.get('origin'))
+        destination = _clean_place(groups.get('destination'))
+        waypoints = _split_waypoints(groups.get('via'))
+
+        if _is_ambiguous(destination) or (origin and _is_ambiguous(origin)):
+            return None
+        if any(_is_ambiguous(stop) for stop in waypoints):
+            return None
+
+        mode_word = groups.get('trailing_mode') or groups.get('mode') or groups.get('verb') or 'driving'
+        mode_word = mode_word.lower().replace('by public transport', 'public transport').replace('by transit', 'transit')
+        mode = MODE_WORDS.get(mode_word, 'driving')
+
+        return GoogleRoutesInput(origin=origin, destination=destination, waypoints=waypoints or None, mode=mode)
+    return None
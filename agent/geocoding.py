@@ -0,0 +1,118 @@
+from .cache import MemoryCache, SQLiteCache, TieredCache
+from typing import Any, Callable, Dict, Optional
+import math
+import os
+import re
+
+DEFAULT_GEOCODE_CACHE_DB = os.path.join(os.path.expanduser("~"), ".cache", "travel-agent", "geocode.sqlite3")
+
+
+def normalize_address(address: str) -> str:
+    """Normalize an address string for use as a cache key"""
+    address = address.strip().lower()
+    address = re.sub(r"[^\w\s,]", " ", address)
+    address = re.sub(r"\s*,\s*", ", ", address)
+    address = re.sub(r"\s+", " ", address)
+    return address.strip(" ,")
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance between two points in meters"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * 6371000 * math.asin(math.sqrt(a))
+
+
+def reusable_address(previous_location: Optional[Dict[str, Any]], latitude: float, longitude: float,
+                     max_distance_m: float) -> Optional[str]:
+    """The address resolved for the previous location, if the new position is close enough to reuse it"""
+    if not previous_location or not previous_location.get('address'):
+        return None
+    # Measure from where the address was resolved, so small moves can't add up unnoticed
+    distance = haversine_m(previous_location.get('address_latitude', previous_location['latitude']),
+                           previous_location.get('address_longitude', previous_location['longitude']),
+                           latitude, longitude)
+    return previous_location['address'] if distance <= max_distance_m else None
+
+
+class GeocodeCache:
+    """
+    Cache for forward and reverse geocoding results.
+
+    Forward lookups are keyed on the normalized address string, reverse lookups on
+    the coordinates rounded to `precision` decimal places (4 places is roughly 11 m).
+    Only successful lookups are cached.
+    """
+
+    def __init__(self, cache: Optional[TieredCache] = None, precision: int = 4,
+                 ttl: float = 30 * 86400, reverse_ttl: float = 7 * 86400):
+        self.cache = cache or TieredCache()
+        self.precision = precision
+        self.ttl = ttl
+        self.reverse_ttl = reverse_ttl
+
+    @classmethod
+    def from_env(cls) -> "GeocodeCache":
+        """
+        Build a cache from GEOCODE_CACHE_DB (SQLite path, empty to keep it in memory only),
+        GEOCODE_CACHE_SIZE, GEOCODE_CACHE_PRECISION and GEOCODE_CACHE_TTL
+        """
+        path = os.getenv("GEOCODE_CACHE_DB", DEFAULT_GEOCODE_CACHE_DB)
+        ttl = float(os.getenv("GEOCODE_CACHE_TTL", str(30 * 86400)))
+        memory = MemoryCache(max_entries=int(os.getenv("GEOCODE_CACHE_SIZE", "10000")), default_ttl=ttl)
+
+        disk = None
+        if path:
+            try:
+                disk = SQLiteCache(path, namespace="geocode", default_ttl=ttl)
+            except Exception as e:
+                print(f"Geocode disk cache unavailable ({path}): {e}")
+
+        return cls(TieredCache(memory, disk), precision=int(os.getenv("GEOCODE_CACHE_PRECISION", "4")), ttl=ttl)
+
+    def forward_key(self, address: str) -> str:
+        return f"fwd:{normalize_address(address)}"
+
+    def reverse_key(self, latitude: float, longitude: float) -> str:
+        return f"rev:{latitude:.{self.precision}f},{longitude:.{self.precision}f}"
+
+    def geocode(self, address: str, fetch: Callable[[str], Optional[Dict[str, float]]]) -> Optional[Dict[str, float]]:
+        """Return cached coordinates for an address, calling `fetch` on a miss"""
+        key = self.forward_key(address)
+        coords = self.cache.get(key)
+        if coords is not None:
+            return coords
+
+        coords = fetch(address)
+        if coords is not None:
+            self.cache.set(key, coords, self.ttl)
+        return coords
+
+    def reverse_geocode(self, latitude: float, longitude: float,
+                        fetch: Callable[[float, float], Optional[str]]) -> Optional[str]:
+        """Return the cached address for a coordinate pair, calling `fetch` on a miss"""
+        key = self.reverse_key(latitude, longitude)
+        address = self.cache.get(key)
+        if address is not None:
+            return address
+
+        address = fetch(latitude, longitude)
+        if address is not None:
+            self.cache.set(key, address, self.reverse_ttl)
+        return address
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats_summary()
+
+
+_default_cache: Optional[GeocodeCache] = None
+
+
+def get_default_geocode_cache() -> GeocodeCache:
+    """Process-wide geocode cache shared by every GoogleRoutesTool"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = GeocodeCache.from_env()
+    return _default_cache
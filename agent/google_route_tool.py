@@ -1,18 +1,63 @@
 from langchain_core.tools import BaseTool
+from langchain_core.runnables import RunnableConfig
 from pydantic import BaseModel, Field
-from typing import Any, List, Optional, Dict
+from .geocoding import GeocodeCache, get_default_geocode_cache
+from .http_client import HttpClient, get_default_http_client
+from .route_cache import RouteCache, get_default_route_cache
+from .route_matrix import RouteMatrixClient
+from .itinerary import solve_path
+from .metrics import metrics
+from typing import Any, Callable, List, Optional, Dict, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import asyncio
+import contextvars
 import googlemaps
 import requests
 import os
 import re
 from datetime import datetime, timedelta
 
+# computeRoutes takes at most 25 intermediate waypoints; larger routes are ordered locally
+MAX_INTERMEDIATES = 25
+
 class GoogleRoutesInput(BaseModel):
     origin: str = Field(default="", description="Starting location (leave empty to use current location)")
     destination: str = Field(description="Destination location")
     waypoints: Optional[List[str]] = Field(default=None, description="List of stops along the route")
     mode: str = Field(default="driving", description="Travel mode (driving/walking/bicycling/transit)")
 
+class ResolvedLocation(BaseModel):
+    name: str
+    latitude: float
+    longitude: float
+    
+    def lat_lng(self) -> Dict[str, Dict[str, float]]:
+        """Location in Routes API waypoint format"""
+        return {"location": {"latLng": {"latitude": self.latitude, "longitude": self.longitude}}}
+    
+    def url_part(self) -> str:
+        return f"{self.latitude},{self.longitude}"
+
+class ResolvedRoute(BaseModel):
+    """Every location of a route, resolved once and shared by the API call, Maps URL and leg breakdown"""
+    origin: ResolvedLocation
+    destination: ResolvedLocation
+    waypoints: List[ResolvedLocation] = Field(default_factory=list)
+    failed_waypoints: List[str] = Field(default_factory=list)
+    using_current_location: bool = False
+    optimized_order: Optional[List[int]] = None
+    
+    def ordered_waypoints(self) -> List[ResolvedLocation]:
+        """Waypoints in the order the Routes API chose, or as given if it didn't reorder them"""
+        if self.optimized_order is None:
+            return list(self.waypoints)
+        ordered = [self.waypoints[i] for i in self.optimized_order if 0 <= i < len(self.waypoints)]
+        return ordered if len(ordered) == len(self.waypoints) else list(self.waypoints)
+
+class RouteResolutionError(ValueError):
+    """Raised when the origin or destination of a route can't be resolved"""
+
 class GoogleRoutesTool(BaseTool):
     name: str = "google_routes"
     description: str = (
@@ -24,30 +69,64 @@ class GoogleRoutesTool(BaseTool):
     gmaps: Any = Field(default=None, exclude=True)
     api_key: str = Field(default="", exclude=True)
     user_context: Dict = Field(default_factory=dict, exclude=True)
+    geocode_cache: Any = Field(default=None, exclude=True)
+    geocode_concurrency: int = Field(default=8, exclude=True)
+    geocode_executor: Any = Field(default=None, exclude=True)
+    http: Any = Field(default=None, exclude=True)
+    routes_base_url: str = Field(default="https://routes.googleapis.com", exclude=True)
+    route_cache: Any = Field(default=None, exclude=True)
+    route_matrix: Any = Field(default=None, exclude=True)
     
-    def __init__(self, user_context: Dict = None):
+    def __init__(self, user_context: Dict = None, geocode_cache: Optional[GeocodeCache] = None,
+                 geocode_concurrency: Optional[int] = None, http_client: Optional[HttpClient] = None,
+                 route_cache: Optional[RouteCache] = None):
         super().__init__()
         self.api_key = os.getenv("GPLACES_API_KEY")
         if not self.api_key:
             raise ValueError("Google Maps API key not found in GPLACES_API_KEY environment variable")
-        self.gmaps = googlemaps.Client(key=self.api_key)
+        # Pooled session with timeouts, retries and a circuit breaker, shared with the geocoding client
+        self.http = http_client or get_default_http_client()
+        self.routes_base_url = os.getenv("GOOGLE_ROUTES_BASE_URL", "https://routes.googleapis.com").rstrip("/")
+        self.gmaps = googlemaps.Client(
+            key=self.api_key,
+            requests_session=self.http.session,
+            connect_timeout=self.http.connect_timeout,
+            read_timeout=self.http.read_timeout,
+            retry_timeout=int(os.getenv("GEOCODE_RETRY_TIMEOUT", "10")),
+            base_url=os.getenv("GOOGLE_MAPS_BASE_URL", "https://maps.googleapis.com"),
+        )
         self.args_schema = GoogleRoutesInput
         self.user_context = user_context or {}
+        self.geocode_cache = geocode_cache or get_default_geocode_cache()
+        self.route_cache = route_cache or get_default_route_cache()
+        self.route_matrix = RouteMatrixClient(self.http, self.api_key, self.routes_base_url)
+        # Max geocoding lookups in flight for one route
+        self.geocode_concurrency = geocode_concurrency or int(os.getenv("GEOCODE_CONCURRENCY", "8"))
+        # Created up front: the tool is shared by concurrent requests
+        self.geocode_executor = ThreadPoolExecutor(max_workers=self.geocode_concurrency,
+                                                   thread_name_prefix="geocode")
     
     def _geocode_location(self, location: str) -> Optional[Dict[str, float]]:
+        """Convert address to lat/lng, using the geocode cache before the Geocoding API"""
+        return self.geocode_cache.geocode(location, self._fetch_geocode)
+    
+    def _fetch_geocode(self, location: str) -> Optional[Dict[str, float]]:
         """Convert address to lat/lng using Google Geocoding API"""
-        try:
-            geocode_result = self.gmaps.geocode(location)
-            if geocode_result:
-                location_data = geocode_result[0]['geometry']['location']
-                return {
-                    'latitude': location_data['lat'], 
-                    'longitude': location_data['lng']
-                }
-            return None
-        except Exception as e:
-            print(f"Geocoding error for {location}: {e}")
-            return None
+        with metrics.stage("geocode", kind="forward") as span:
+            try:
+                geocode_result = self.gmaps.geocode(location)
+                if geocode_result:
+                    location_data = geocode_result[0]['geometry']['location']
+                    return {
+                        'latitude': location_data['lat'], 
+                        'longitude': location_data['lng']
+                    }
+                span['status'] = 'not_found'
+                return None
+            except Exception as e:
+                print(f"Geocoding error for {location}: {e}")
+                span.update(status='error', error=type(e).__name__)
+                return None
     
     def _format_duration(self, duration_seconds: int) -> str:
         """Format duration from seconds to human readable format"""
@@ -65,12 +144,21 @@ class GoogleRoutesTool(BaseTool):
         else:
             return f"{distance_meters} m"
     
-    def _get_current_location_coords(self) -> Optional[Dict[str, float]]:
+    def _get_user_context(self, config: Optional[RunnableConfig] = None) -> Dict:
+        """Get user context from the run config, falling back to the one given at construction"""
+        if config:
+            user_context = config.get("configurable", {}).get("user_context")
+            if user_context:
+                return user_context
+        return self.user_context
+    
+    def _get_current_location_coords(self, user_context: Optional[Dict] = None) -> Optional[Dict[str, float]]:
         """Get current location coordinates from user context"""
-        if not self.user_context or 'current_location' not in self.user_context:
+        user_context = user_context if user_context is not None else self.user_context
+        if not user_context or 'current_location' not in user_context:
             return None
         
-        location = self.user_context['current_location']
+        location = user_context['current_location']
         
         # Check if location is still valid (within 30 minutes)
         if 'timestamp' in location:
@@ -83,24 +171,119 @@ class GoogleRoutesTool(BaseTool):
             'longitude': location['longitude']
         }
     
-    def _get_current_location_address(self) -> str:
+    def _get_current_location_address(self, user_context: Optional[Dict] = None) -> str:
         """Get readable address for current location"""
-        coords = self._get_current_location_coords()
+        coords = self._get_current_location_coords(user_context)
         if not coords:
             return "Current Location"
         
+        # The bot stores the address it resolved when the location was shared
+        user_context = user_context if user_context is not None else self.user_context
+        stored_address = user_context['current_location'].get('address')
+        if stored_address:
+            return stored_address
+        
+        address = self.geocode_cache.reverse_geocode(coords['latitude'], coords['longitude'],
+                                                     self._fetch_reverse_geocode)
+        if address:
+            return address
+        return f"Current Location ({coords['latitude']:.4f}, {coords['longitude']:.4f})"
+    
+    def _fetch_reverse_geocode(self, latitude: float, longitude: float) -> Optional[str]:
+        """Convert lat/lng to a readable address using Google Geocoding API"""
+        with metrics.stage("geocode", kind="reverse") as span:
+            try:
+                result = self.gmaps.reverse_geocode((latitude, longitude))
+                if result:
+                    return result[0]['formatted_address']
+                span['status'] = 'not_found'
+                return None
+            except Exception as e:
+                print(f"Reverse geocoding error for ({latitude}, {longitude}): {e}")
+                span.update(status='error', error=type(e).__name__)
+                return None
+    
+    def _resolution_tasks(self, origin: str, destination: str, waypoints: Optional[List[str]],
+                          user_context: Dict) -> List[Callable[[], Any]]:
+        """Lookups needed to resolve a route: origin, destination, then each waypoint"""
+        if not origin:
+            # Try to use current location
+            if not self._get_current_location_coords(user_context):
+                raise RouteResolutionError("❌ No origin specified and no current location available. Please share your location or specify a starting point.")
+            origin_task = partial(self._get_current_location_address, user_context)
+        else:
+            origin_task = partial(self._geocode_location, origin)
+        
+        return [origin_task, partial(self._geocode_location, destination)] + [
+            partial(self._geocode_location, waypoint) for waypoint in waypoints or []
+        ]
+    
+    def _safe_lookup(self, task: Callable[[], Any]) -> Any:
+        """Run one lookup so that a failure only affects its own item"""
         try:
-            result = self.gmaps.reverse_geocode((coords['latitude'], coords['longitude']))
-            if result:
-                return result[0]['formatted_address']
-            return f"Current Location ({coords['latitude']:.4f}, {coords['longitude']:.4f})"
-        except:
-            return f"Current Location ({coords['latitude']:.4f}, {coords['longitude']:.4f})"
+            return task()
+        except Exception as e:
+            print(f"Location lookup error: {e}")
+            return None
+    
+    def _resolve_route(self, origin: str, destination: str, waypoints: Optional[List[str]],
+                       user_context: Dict) -> ResolvedRoute:
+        """Resolve origin, destination and waypoints to coordinates, each exactly once, concurrently"""
+        tasks = self._resolution_tasks(origin, destination, waypoints, user_context)
+        # Each lookup runs in its own copy of this context, so its timings join the request's trace
+        tasks = [partial(contextvars.copy_context().run, task) for task in tasks]
+        results = list(self.geocode_executor.map(self._safe_lookup, tasks))
+        return self._build_resolved_route(origin, destination, waypoints, user_context, results)
+    
+    async def _aresolve_route(self, origin: str, destination: str, waypoints: Optional[List[str]],
+                              user_context: Dict) -> ResolvedRoute:
+        """Async version of _resolve_route, with at most geocode_concurrency lookups in flight"""
+        tasks = self._resolution_tasks(origin, destination, waypoints, user_context)
+        semaphore = asyncio.Semaphore(self.geocode_concurrency)
+        
+        async def lookup(task: Callable[[], Any]) -> Any:
+            async with semaphore:
+                return await asyncio.to_thread(self._safe_lookup, task)
+        
+        results = await asyncio.gather(*(lookup(task) for task in tasks))
+        return self._build_resolved_route(origin, destination, waypoints, user_context, list(results))
+    
+    def _build_resolved_route(self, origin: str, destination: str, waypoints: Optional[List[str]],
+                              user_context: Dict, results: List[Any]) -> ResolvedRoute:
+        """Assemble a ResolvedRoute from lookup results, in the order of _resolution_tasks"""
+        origin_result, dest_coords, waypoint_results = results[0], results[1], results[2:]
+        
+        if not origin:
+            origin_coords = self._get_current_location_coords(user_context)
+            origin_name = origin_result or "Current Location"
+        else:
+            origin_coords = origin_result
+            origin_name = origin
+            if not origin_coords:
+                raise RouteResolutionError(f"❌ Could not find coordinates for origin '{origin}'")
+        
+        if not dest_coords:
+            raise RouteResolutionError(f"❌ Could not find coordinates for destination '{destination}'")
+        
+        resolved_waypoints = []
+        failed_waypoints = []
+        for waypoint, coords in zip(waypoints or [], waypoint_results):
+            if coords:
+                resolved_waypoints.append(ResolvedLocation(name=waypoint, **coords))
+            else:
+                failed_waypoints.append(waypoint)
+        
+        return ResolvedRoute(
+            origin=ResolvedLocation(name=origin_name, **origin_coords),
+            destination=ResolvedLocation(name=destination, **dest_coords),
+            waypoints=resolved_waypoints,
+            failed_waypoints=failed_waypoints,
+            using_current_location=not origin,
+        )
     
-    def _call_routes_api(self, origin_coords: Dict[str, float], dest_coords: Dict[str, float], 
-                        intermediate_coords: List[Dict[str, float]], mode: str) -> Dict:
-        """Call Google Routes API v2"""
-        url = "https://routes.googleapis.com/directions/v2:computeRoutes"
+    def _call_routes_api(self, route: ResolvedRoute, mode: str, optimize: bool = True) -> Dict:
+        """Call Google Routes API v2, letting it reorder the waypoints when `optimize` is set"""
+        url = f"{self.routes_base_url}/directions/v2:computeRoutes"
         
         headers = {
             'Content-Type': 'application/json',
@@ -108,18 +291,6 @@ class GoogleRoutesTool(BaseTool):
             'X-Goog-FieldMask': 'routes.duration,routes.distanceMeters,routes.legs.duration,routes.legs.distanceMeters,routes.legs.startLocation,routes.legs.endLocation,routes.optimizedIntermediateWaypointIndex'
         }
         
-        # Build intermediates array
-        intermediates = []
-        for coords in intermediate_coords:
-            intermediates.append({
-                "location": {
-                    "latLng": {
-                        "latitude": coords['latitude'],
-                        "longitude": coords['longitude']
-                    }
-                }
-            })
-        
         # Map mode to API format
         travel_mode_map = {
             'driving': 'DRIVE',
@@ -129,166 +300,204 @@ class GoogleRoutesTool(BaseTool):
         }
         
         data = {
-            "origin": {
-                "location": {
-                    "latLng": {
-                        "latitude": origin_coords['latitude'],
-                        "longitude": origin_coords['longitude']
-                    }
-                }
-            },
-            "destination": {
-                "location": {
-                    "latLng": {
-                        "latitude": dest_coords['latitude'],
-                        "longitude": dest_coords['longitude']
-                    }
-                }
-            },
+            "origin": route.origin.lat_lng(),
+            "destination": route.destination.lat_lng(),
             "travelMode": travel_mode_map.get(mode.lower(), 'DRIVE')
         }
         
         # Add intermediates and optimization if waypoints exist
-        if intermediates:
-            data["intermediates"] = intermediates
-            data["optimizeWaypointOrder"] = True
+        if route.waypoints:
+            data["intermediates"] = [waypoint.lat_lng() for waypoint in route.waypoints]
+            data["optimizeWaypointOrder"] = optimize
         
-        response = requests.post(url, headers=headers, json=data)
-        return response.json()
+        with metrics.stage("routes_api", method="computeRoutes") as span:
+            body = self.http.post(url, headers=headers, json=data).json()
+            if 'error' in body:
+                span.update(status='error', error=body['error'].get('status', 'api_error'))
+        return body
     
-    def _create_google_maps_url(self, origin_coords: Dict[str, float], dest_coords: Dict[str, float], 
-                               waypoints: Optional[List[str]] = None) -> str:
-        """Create Google Maps URL for the route"""
-        origin_str = f"{origin_coords['latitude']},{origin_coords['longitude']}"
-        dest_str = f"{dest_coords['latitude']},{dest_coords['longitude']}"
-        
-        if waypoints:
-            # Add waypoints to the URL
-            waypoint_coords = []
-            for waypoint in waypoints:
-                coords = self._geocode_location(waypoint)
-                if coords:
-                    waypoint_coords.append(f"{coords['latitude']},{coords['longitude']}")
-            
-            if waypoint_coords:
-                waypoints_str = "|".join(waypoint_coords)
-                return f"https://www.google.com/maps/dir/{origin_str}/{waypoints_str}/{dest_str}"
+    def _get_route(self, route: ResolvedRoute, mode: str, optimize: bool = True) -> Tuple[Dict, Optional[float]]:
+        """Get a route from the route cache or the Routes API, returning (response, cache age or None)"""
+        cached = self.route_cache.get(route, mode, optimize)
+        if cached is not None:
+            return cached
+        
+        api_response = self._call_routes_api(route, mode, optimize)
+        self.route_cache.set(route, mode, api_response, optimize)
+        return api_response, None
+    
+    def _order_waypoints_locally(self, route: ResolvedRoute, mode: str) -> List[int]:
+        """Waypoint order from a travel-time matrix and the local solver, for routes over MAX_INTERMEDIATES"""
+        points = [route.origin] + list(route.waypoints) + [route.destination]
+        durations, _ = self.route_matrix.matrix(points, points, mode)
+        order = solve_path(durations, start=0, end=len(points) - 1)
+        return [index - 1 for index in order[1:-1]]
+    
+    def _get_route_in_order(self, route: ResolvedRoute, mode: str) -> Tuple[Dict, Optional[float]]:
+        """
+        Route through the waypoints in their (optimized) order, in as many computeRoutes
+        calls as MAX_INTERMEDIATES requires, merged into one response with every leg
+        """
+        stops = [route.origin] + route.ordered_waypoints() + [route.destination]
+        step = MAX_INTERMEDIATES + 1
+        legs, duration, distance, ages = [], 0, 0, []
+        for start in range(0, len(stops) - 1, step):
+            chunk = stops[start:start + step + 1]
+            part = ResolvedRoute(origin=chunk[0], destination=chunk[-1], waypoints=chunk[1:-1])
+            api_response, cache_age = self._get_route(part, mode, optimize=False)
+            if 'error' in api_response or not api_response.get('routes'):
+                return api_response, None
+            part_route = api_response['routes'][0]
+            legs += part_route.get('legs', [])
+            duration += int(part_route.get('duration', '0s').rstrip('s'))
+            distance += part_route.get('distanceMeters', 0)
+            ages.append(cache_age)
         
-        return f"https://www.google.com/maps/dir/{origin_str}/{dest_str}"
+        merged = {'duration': f"{duration}s", 'distanceMeters': distance, 'legs': legs}
+        age = max(ages) if all(a is not None for a in ages) else None
+        return {'routes': [merged]}, age
+    
+    def _create_google_maps_url(self, route: ResolvedRoute) -> str:
+        """Create Google Maps URL for the route, following the optimized stop order"""
+        parts = [route.origin.url_part()]
+        parts += [waypoint.url_part() for waypoint in route.ordered_waypoints()]
+        parts.append(route.destination.url_part())
+        return "https://www.google.com/maps/dir/" + "/".join(parts)
     
     def _run(self, origin: str = "", destination: str = "", waypoints: Optional[List[str]] = None, 
-             mode: str = "driving") -> str:
+             mode: str = "driving", config: RunnableConfig = None) -> str:
         try:
-            # Determine origin coordinates
-            origin_coords = None
-            origin_address = origin
-            using_current_location = False
-            
-            if not origin:
-                # Try to use current location
-                origin_coords = self._get_current_location_coords()
-                if origin_coords:
-                    origin_address = self._get_current_location_address()
-                    using_current_location = True
-                else:
-                    return "❌ No origin specified and no current location available. Please share your location or specify a starting point."
-            else:
-                # Geocode the provided origin
-                origin_coords = self._geocode_location(origin)
-                if not origin_coords:
-                    return f"❌ Could not find coordinates for origin '{origin}'"
-            
-            # Geocode destination
-            dest_coords = self._geocode_location(destination)
-            if not dest_coords:
-                return f"❌ Could not find coordinates for destination '{destination}'"
-            
-            # Geocode waypoints if provided
-            intermediate_coords = []
-            failed_waypoints = []
-            
-            if waypoints:
-                for waypoint in waypoints:
-                    coords = self._geocode_location(waypoint)
-                    if coords:
-                        intermediate_coords.append(coords)
-                    else:
-                        failed_waypoints.append(waypoint)
-            
-            # Warn about failed waypoints but continue
-            result = ""
-            if failed_waypoints:
-                result = f"⚠️ Could not find: {', '.join(failed_waypoints)}\n\n"
-            
-            # Call Routes API
-            api_response = self._call_routes_api(origin_coords, dest_coords, intermediate_coords, mode)
-            
-            if 'error' in api_response:
-                return f"❌ Routes API Error: {api_response['error'].get('message', 'Unknown error')}"
-            
-            if 'routes' not in api_response or not api_response['routes']:
-                return "❌ No route found between the specified locations"
+            user_context = self._get_user_context(config)
             
-            route = api_response['routes'][0]
+            try:
+                resolved = self._resolve_route(origin, destination, waypoints, user_context)
+            except RouteResolutionError as e:
+                return str(e)
             
-            # Build result string
-            location_indicator = "📍 Your Location" if using_current_location else "📍 Starting Point"
-            result += f"🗺️ **Route Summary**\n"
-            result += f"{location_indicator}: {origin_address}\n"
-            result += f"🎯 **Destination**: {destination}\n"
-            result += f"🚗 **Travel Mode**: {mode.title()}\n\n"
+            return self._route_summary(resolved, mode)
             
-            # Show optimization info if waypoints were provided
-            if waypoints and 'optimizedIntermediateWaypointIndex' in route:
-                optimized_indices = route['optimizedIntermediateWaypointIndex']
-                optimized_waypoints = [waypoints[i] for i in optimized_indices if i < len(waypoints)]
-                result += f"🔄 **Optimized stops**: {' → '.join(optimized_waypoints)}\n\n"
-            
-            # Total route info
-            if 'duration' in route:
-                total_duration = int(route['duration'].rstrip('s'))
-                result += f"⏱️ **Total Time**: {self._format_duration(total_duration)}\n"
-            
-            if 'distanceMeters' in route:
-                result += f"📏 **Total Distance**: {self._format_distance(route['distanceMeters'])}\n\n"
-            
-            # Create Google Maps link
-            maps_url = self._create_google_maps_url(origin_coords, dest_coords, waypoints)
-            result += f"🔗 **[Open in Google Maps]({maps_url})**\n\n"
-            
-            # Show route summary (not detailed turn-by-turn)
-            if 'legs' in route and len(route['legs']) > 1:
-                result += "📋 **Route Breakdown**:\n"
-                for i, leg in enumerate(route['legs']):
-                    if i == 0 and using_current_location:
-                        leg_start = "📍 Your Location"
-                    else:
-                        leg_start = origin_address if i == 0 else f"Stop {i}"
-                    
-                    if i == len(route['legs']) - 1:
-                        leg_end = f"🎯 {destination}"
-                    else:
-                        leg_end = f"Stop {i+1}"
-                    
-                    result += f"• **Leg {i+1}**: {leg_start} → {leg_end}"
-                    
-                    if 'duration' in leg:
-                        leg_duration = int(leg['duration'].rstrip('s'))
-                        result += f" ({self._format_duration(leg_duration)})"
-                    
-                    if 'distanceMeters' in leg:
-                        result += f" - {self._format_distance(leg['distanceMeters'])}"
-                    
-                    result += "\n"
+        except requests.exceptions.RequestException as e:
+            metrics.count("errors", component="google_routes", error=type(e).__name__)
+            return f"❌ Network error calling Routes API: {str(e)}"
+        except Exception as e:
+            print(f"Routes tool error: {e}")
+            metrics.count("errors", component="google_routes", error=type(e).__name__)
+            return f"❌ Unexpected error: {str(e)}"
+    
+    async def _arun(self, origin: str = "", destination: str = "", waypoints: Optional[List[str]] = None,
+                    mode: str = "driving", config: RunnableConfig = None) -> str:
+        try:
+            user_context = self._get_user_context(config)
             
-            result += f"\n✅ **Route ready!** Click the Google Maps link above for turn-by-turn navigation."
+            try:
+                resolved = await self._aresolve_route(origin, destination, waypoints, user_context)
+            except RouteResolutionError as e:
+                return str(e)
             
-            return result
+            return await asyncio.to_thread(self._route_summary, resolved, mode)
             
         except requests.exceptions.RequestException as e:
+            metrics.count("errors", component="google_routes", error=type(e).__name__)
             return f"❌ Network error calling Routes API: {str(e)}"
         except Exception as e:
+            print(f"Routes tool error: {e}")
+            metrics.count("errors", component="google_routes", error=type(e).__name__)
             return f"❌ Unexpected error: {str(e)}"
+    
+    def _route_summary(self, resolved: ResolvedRoute, mode: str) -> str:
+        """Call the Routes API for a resolved route and format the result"""
+        # Warn about failed waypoints but continue
+        result = ""
+        if resolved.failed_waypoints:
+            result = f"⚠️ Could not find: {', '.join(resolved.failed_waypoints)}\n\n"
+        
+        # Call Routes API, unless the same route was computed recently. Past the API's
+        # waypoint limit, order the stops locally and fetch the route in parts.
+        if len(resolved.waypoints) > MAX_INTERMEDIATES:
+            resolved.optimized_order = self._order_waypoints_locally(resolved, mode)
+            api_response, cache_age = self._get_route_in_order(resolved, mode)
+        else:
+            api_response, cache_age = self._get_route(resolved, mode)
+        
+        if 'error' in api_response:
+            metrics.count("errors", component="google_routes", error="api_error")
+            return f"❌ Routes API Error: {api_response['error'].get('message', 'Unknown error')}"
+        
+        if 'routes' not in api_response or not api_response['routes']:
+            return "❌ No route found between the specified locations"
+        
+        route = api_response['routes'][0]
+        if resolved.waypoints and 'optimizedIntermediateWaypointIndex' in route:
+            resolved.optimized_order = route['optimizedIntermediateWaypointIndex']
+        
+        result += self._format_route(resolved, route, mode)
+        if cache_age is not None:
+            result += f"\n♻️ _Served from cache (computed {int(cache_age // 60)}m ago)_"
+        
+        return result
+    
+    def _format_route(self, resolved: ResolvedRoute, route: Dict, mode: str) -> str:
+        """Format a Routes API route as a summary with a Google Maps link"""
+        ordered_stops = resolved.ordered_waypoints()
+        
+        # Build result string
+        location_indicator = "📍 Your Location" if resolved.using_current_location else "📍 Starting Point"
+        result = f"🗺️ **Route Summary**\n"
+        result += f"{location_indicator}: {resolved.origin.name}\n"
+        result += f"🎯 **Destination**: {resolved.destination.name}\n"
+        result += f"🚗 **Travel Mode**: {mode.title()}\n\n"
+        
+        # Show optimization info if waypoints were provided
+        if resolved.optimized_order is not None and ordered_stops:
+            result += f"🔄 **Optimized stops**: {' → '.join(stop.name for stop in ordered_stops)}\n\n"
+        
+        # Total route info
+        if 'duration' in route:
+            total_duration = int(route['duration'].rstrip('s'))
+            result += f"⏱️ **Total Time**: {self._format_duration(total_duration)}\n"
+        
+        if 'distanceMeters' in route:
+            result += f"📏 **Total Distance**: {self._format_distance(route['distanceMeters'])}\n\n"
+        
+        # Create Google Maps link
+        maps_url = self._create_google_maps_url(resolved)
+        result += f"🔗 **[Open in Google Maps]({maps_url})**\n\n"
+        
+        # Show route summary (not detailed turn-by-turn)
+        if 'legs' in route and len(route['legs']) > 1:
+            result += "📋 **Route Breakdown**:\n"
+            for i, leg in enumerate(route['legs']):
+                if i == 0 and resolved.using_current_location:
+                    leg_start = "📍 Your Location"
+                elif i == 0:
+                    leg_start = resolved.origin.name
+                else:
+                    leg_start = self._stop_label(ordered_stops, i - 1)
+                
+                if i == len(route['legs']) - 1:
+                    leg_end = f"🎯 {resolved.destination.name}"
+                else:
+                    leg_end = self._stop_label(ordered_stops, i)
+                
+                result += f"• **Leg {i+1}**: {leg_start} → {leg_end}"
+                
+                if 'duration' in leg:
+                    leg_duration = int(leg['duration'].rstrip('s'))
+                    result += f" ({self._format_duration(leg_duration)})"
+                
+                if 'distanceMeters' in leg:
+                    result += f" - {self._format_distance(leg['distanceMeters'])}"
+                
+                result += "\n"
+        
+        result += f"\n✅ **Route ready!** Click the Google Maps link above for turn-by-turn navigation."
+        
+        return result
+    
+    def _stop_label(self, ordered_stops: List[ResolvedLocation], index: int) -> str:
+        if index < len(ordered_stops):
+            return ordered_stops[index].name
+        return f"Stop {index + 1}"
 
 # For backward compatibility, also support the old method signature
 def create_routes_tool_with_context(user_context: Dict = None):
@@ -0,0 +1,187 @@
+"""
+Keeps the conversation history sent to the model under a token budget.
+
+Runs as the agent's pre_model_hook. Tool outputs from earlier turns are cut down to
+short digests, and once the history is still over budget the oldest turns are folded
+into a rolling summary message that stays at the start of the thread. Both changes
+are written back to the thread, so the work is done once rather than on every call.
+"""
+from langchain_core.messages import HumanMessage, RemoveMessage, SystemMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+from typing import Any, Callable, Dict, List, Optional
+import os
+
+SUMMARY_MESSAGE_ID = "history-summary"
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+DIGEST_MARKER = "\n[digest of "
+
+SUMMARY_INSTRUCTIONS = (
+    "Update the running summary of a travel-planning conversation with the new turns below. "
+    "Keep places, dates, bookings, preferences and decisions; drop chit-chat. "
+    "Reply with the updated summary only, in under {max_words} words."
+)
+
+
+def is_summary(message: Any) -> bool:
+    return getattr(message, 'id', None) == SUMMARY_MESSAGE_ID
+
+
+def _text(message: Any) -> str:
+    content = getattr(message, 'content', '')
+    if isinstance(content, str):
+        return content
+    return " ".join(part.get('text', '') for part in content if isinstance(part, dict))
+
+
+def _shorten(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+
+
+def tool_digest(text: str, max_chars: int = 300) -> str:
+    """
+    Short digest of a tool output: its first lines up to `max_chars`, keeping any
+    link (a route's Google Maps URL) so the model can still refer back to it
+    """
+    if len(text) <= max_chars or DIGEST_MARKER in text:
+        return text
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    digest, used = [], 0
+    for line in lines:
+        if used + len(line) > max_chars:
+            break
+        digest.append(line)
+        used += len(line)
+    links = [line for line in lines if "http" in line and line not in digest][:1]
+    digest += [_shorten(line, max_chars) for line in links]
+    if not digest:
+        digest = [_shorten(text, max_chars)]
+    return "\n".join(digest) + f"{DIGEST_MARKER}{len(text)} characters]"
+
+
+def digest_summary(previous: str, messages: List[Any], max_chars: int) -> str:
+    """Extractive summary: one line per user message and final answer, appended to the previous summary"""
+    lines = [previous] if previous else []
+    for message in messages:
+        kind = getattr(message, 'type', None)
+        if kind == 'human':
+            lines.append(f"- User: {_shorten(_text(message), 160)}")
+        elif kind == 'ai' and not getattr(message, 'tool_calls', None) and _text(message):
+            lines.append(f"- Assistant: {_shorten(_text(message), 240)}")
+        elif kind == 'ai':
+            names = ", ".join(call['name'] for call in message.tool_calls)
+            lines.append(f"- (looked up with {names})")
+    lines = "\n".join(lines).splitlines()
+    # Oldest lines go first when the summary itself outgrows its budget
+    while len(lines) > 1 and sum(len(line) + 1 for line in lines) > max_chars:
+        lines.pop(0)
+    return _shorten(lines[0], max_chars) if len(lines) == 1 else "\n".join(lines)
+
+
+def llm_summary(model: Any) -> Callable[[str, List[Any], int], str]:
+    """Summarizer that asks `model` to fold new turns into the previous summary"""
+    def summarize(previous: str, messages: List[Any], max_chars: int) -> str:
+        transcript = digest_summary("", messages, max_chars * 4)
+        prompt = [
+            SystemMessage(content=SUMMARY_INSTRUCTIONS.format(max_words=max(50, max_chars // 6))),
+            HumanMessage(content=f"Current summary:\n{previous or '(none)'}\n\nNew turns:\n{transcript}"),
+        ]
+        try:
+            summary = _text(model.invoke(prompt)).strip()
+        except Exception as e:
+            print(f"History summary failed, using digest: {e}")
+            return digest_summary(previous, messages, max_chars)
+        return _shorten(summary, max_chars) if summary else digest_summary(previous, messages, max_chars)
+    return summarize
+
+
+class HistoryCompactor:
+    """
+    pre_model_hook that keeps the history under `token_budget` (approximate) tokens.
+
+    - Tool outputs from before the current user message longer than `tool_digest_chars`
+      are replaced by digests.
+    - If the history is still over budget, whole turns are moved, oldest first, into the
+      summary message until the rest fits in `recent_ratio` of the budget. The current
+      turn is never summarized.
+    """
+
+    def __init__(self, token_budget: int = 3000, recent_ratio: float = 0.6, tool_digest_chars: int = 300,
+                 summary_max_chars: int = 2000,
+                 summarize: Optional[Callable[[str, List[Any], int], str]] = None,
+                 count_tokens: Callable[[List[Any]], int] = count_tokens_approximately):
+        self.token_budget = token_budget
+        self.recent_ratio = recent_ratio
+        self.tool_digest_chars = tool_digest_chars
+        self.summary_max_chars = summary_max_chars
+        self.summarize = summarize or digest_summary
+        self.count_tokens = count_tokens
+
+    @classmethod
+    def from_env(cls, model: Any = None) -> "HistoryCompactor":
+        """
+        Build from HISTORY_TOKEN_BUDGET, HISTORY_TOOL_DIGEST_CHARS and HISTORY_SUMMARY_CHARS.
+        HISTORY_SUMMARIZER=llm summarizes with `model` instead of the extractive digest.
+        """
+        summarize = None
+        if os.getenv("HISTORY_SUMMARIZER", "digest") == "llm" and model is not None:
+            summarize = llm_summary(model)
+        return cls(
+            token_budget=int(os.getenv("HISTORY_TOKEN_BUDGET", "3000")),
+            tool_digest_chars=int(os.getenv("HISTORY_TOOL_DIGEST_CHARS", "300")),
+            summary_max_chars=int(os.getenv("HISTORY_SUMMARY_CHARS", "2000")),
+            summarize=summarize,
+        )
+
+    def _digest_old_tool_outputs(self, messages: List[Any], current_turn: int) -> List[Any]:
+        compacted = []
+        for index, message in enumerate(messages):
+            if index < current_turn and isinstance(message, ToolMessage):
+                text = _text(message)
+                digest = tool_digest(text, self.tool_digest_chars)
+                if digest != text:
+                    message = message.model_copy(update={'content': digest})
+            compacted.append(message)
+        return compacted
+
+    def compact(self, messages: List[Any]) -> Optional[List[Any]]:
+        """The compacted history, or None if it's already within budget"""
+        human_indices = [i for i, m in enumerate(messages) if getattr(m, 'type', None) == 'human']
+        current_turn = human_indices[-1] if human_indices else len(messages)
+
+        compacted = self._digest_old_tool_outputs(messages, current_turn)
+        changed = any(a is not b for a, b in zip(compacted, messages))
+        if self.token_budget <= 0 or self.count_tokens(compacted) <= self.token_budget:
+            return compacted if changed else None
+
+        summary = compacted[0] if compacted and is_summary(compacted[0]) else None
+        body = compacted[1:] if summary else compacted
+        turn_starts = [i for i, m in enumerate(body) if getattr(m, 'type', None) == 'human']
+        if len(turn_starts) < 2:
+            return compacted if changed else None
+
+        # Keep the newest turns that fit in the recent budget, and always the current one
+        recent_budget = self.token_budget * self.recent_ratio
+        cut = turn_starts[-1]
+        for start in reversed(turn_starts[:-1]):
+            if self.count_tokens(body[start:]) > recent_budget:
+                break
+            cut = start
+        if cut == 0:
+            return compacted if changed else None
+
+        previous = _text(summary)[len(SUMMARY_PREFIX):] if summary else ""
+        new_summary = self.summarize(previous, body[:cut], self.summary_max_chars)
+        summary_message = SystemMessage(content=SUMMARY_PREFIX + new_summary, id=SUMMARY_MESSAGE_ID)
+        return [summary_message] + body[cut:]
+
+    def __call__(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        messages = state["messages"]
+        compacted = self.compact(messages)
+        if compacted is None:
+            return {"llm_input_messages": messages}
+        return {
+            "messages": [RemoveMessage(id=REMOVE_ALL_MESSAGES)] + compacted,
+            "llm_input_messages": compacted,
+        }
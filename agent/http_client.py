@@ -0,0 +1,174 @@
+from requests.adapters import HTTPAdapter
+from typing import Callable, Optional
+import math
+import os
+import random
+import threading
+import time
+import requests
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of making a request while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Fails fast after repeated upstream failures.
+
+    After `failure_threshold` consecutive failures the circuit opens and calls are
+    rejected for `reset_timeout` seconds. Then a single trial call is let through:
+    success closes the circuit again, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+
+    def release_trial(self) -> None:
+        """End a call that says nothing about the upstream, letting the next one be the trial"""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+class HttpClient:
+    """
+    Connection-pooled HTTP client with connect/read timeouts, retries with jittered
+    exponential backoff on 429 and 5xx responses, and a circuit breaker. The breaker
+    sees one outcome per request, after its retries.
+    """
+
+    def __init__(self, connect_timeout: float = 3.05, read_timeout: float = 15, max_retries: int = 3,
+                 backoff_base: float = 0.25, backoff_max: float = 8, pool_connections: int = 10,
+                 pool_maxsize: int = 20, breaker: Optional[CircuitBreaker] = None,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.sleep = sleep
+
+        self.session = requests.Session()
+        # Retries are handled here rather than by urllib3 so they go through the breaker
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    @classmethod
+    def from_env(cls) -> "HttpClient":
+        """Build a client from HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_MAX_RETRIES,
+        HTTP_BREAKER_THRESHOLD and HTTP_BREAKER_RESET"""
+        return cls(
+            connect_timeout=float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05")),
+            read_timeout=float(os.getenv("HTTP_READ_TIMEOUT", "15")),
+            max_retries=int(os.getenv("HTTP_MAX_RETRIES", "3")),
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.getenv("HTTP_BREAKER_THRESHOLD", "5")),
+                reset_timeout=float(os.getenv("HTTP_BREAKER_RESET", "30")),
+            ),
+        )
+
+    def backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Seconds to wait before retry number `attempt` (0-based), with full jitter"""
+        if retry_after:
+            try:
+                seconds = float(retry_after)
+            except ValueError:
+                seconds = math.nan
+            if math.isfinite(seconds):
+                return max(0.0, min(seconds, self.backoff_max))
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", (self.connect_timeout, self.read_timeout))
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"Circuit open for upstream, not calling {url}")
+
+        settled = False
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    response = self.session.request(method, url, **kwargs)
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                    if attempt >= self.max_retries:
+                        settled = True
+                        self.breaker.record_failure()
+                        raise
+                    self.sleep(self.backoff(attempt))
+                    continue
+
+                if response.status_code not in RETRY_STATUSES:
+                    settled = True
+                    self.breaker.record_success()
+                    return response
+                if attempt >= self.max_retries:
+                    settled = True
+                    self.breaker.record_failure()
+                    return response
+                self.sleep(self.backoff(attempt, response.headers.get("Retry-After")))
+        finally:
+            # Anything else (a bad request such as InvalidURL, KeyboardInterrupt) says nothing
+            # about the upstream, but must still end a half-open trial
+            if not settled:
+                self.breaker.release_trial()
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_default_client: Optional[HttpClient] = None
+
+
+def get_default_http_client() -> HttpClient:
+    """Process-wide pooled client shared by the Google API tools"""
+    global _default_client
+    if _default_client is None:
+        _default_client = HttpClient.from_env()
+    return _default_client
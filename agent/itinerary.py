@@ -0,0 +1,180 @@
+"""
+Local stop ordering for itineraries too large for computeRoutes' waypoint optimizer.
+
+Works on a travel-time matrix (seconds, possibly asymmetric, inf where there is no
+route): nearest-neighbour for a first path, then best-improvement 2-opt and Or-opt
+moves, each evaluated for all positions at once with NumPy. The path's first and last
+entries stay fixed; an open start or end is modelled with a dummy node.
+"""
+from typing import List, Optional
+import numpy as np
+import time
+
+# Stand-in for "no route", large enough never to be chosen but safe to add up
+UNREACHABLE = 1e9
+
+
+def _finite(cost: np.ndarray) -> np.ndarray:
+    cost = np.array(cost, dtype=float)
+    cost[~np.isfinite(cost)] = UNREACHABLE
+    return cost
+
+
+def path_cost(cost: np.ndarray, order: List[int]) -> float:
+    """Total cost of visiting `order` in sequence"""
+    order = np.asarray(order)
+    return float(cost[order[:-1], order[1:]].sum())
+
+
+def nearest_neighbour(cost: np.ndarray, start: int, end: int) -> List[int]:
+    """Path from `start` to `end` through every node, always moving to the nearest unvisited one"""
+    n = len(cost)
+    visited = np.zeros(n, dtype=bool)
+    visited[[start, end]] = True
+    order = [start]
+    for _ in range(n - 2):
+        candidates = np.where(visited, np.inf, cost[order[-1]])
+        nearest = int(np.argmin(candidates))
+        visited[nearest] = True
+        order.append(nearest)
+    if end != start:
+        order.append(end)
+    return order
+
+
+def two_opt(cost: np.ndarray, order: List[int]) -> bool:
+    """
+    Apply the best segment reversal that shortens the path, in place. The cost of the
+    reversed segment is counted in its new direction, so this is exact for asymmetric
+    matrices. Returns whether the path changed.
+    """
+    n = len(order)
+    if n < 4:
+        return False
+    o = np.asarray(order)
+    forward = np.concatenate(([0.0], np.cumsum(cost[o[:-1], o[1:]])))
+    backward = np.concatenate(([0.0], np.cumsum(cost[o[1:], o[:-1]])))
+
+    # Reverse order[i..j] for 1 <= i < j <= n - 2
+    i = np.arange(1, n - 1)[:, None]
+    j = np.arange(1, n - 1)[None, :]
+    a, b, c, d = o[i - 1], o[i], o[j], o[np.minimum(j + 1, n - 1)]
+    delta = (cost[a, c] + cost[b, d] - cost[a, b] - cost[c, d]
+             + (backward[j] - backward[i]) - (forward[j] - forward[i]))
+    delta = np.where(j > i, delta, np.inf)
+
+    best = np.unravel_index(np.argmin(delta), delta.shape)
+    if delta[best] >= -1e-9:
+        return False
+    start, stop = best[0] + 1, best[1] + 1
+    order[start:stop + 1] = order[start:stop + 1][::-1]
+    return True
+
+
+def or_opt(cost: np.ndarray, order: List[int], max_segment: int = 3) -> bool:
+    """
+    Apply the best move of a run of 1..max_segment stops to another place in the path,
+    in place. Returns whether the path changed.
+    """
+    n = len(order)
+    o = np.asarray(order)
+    best_delta, best_move = -1e-9, None
+    for length in range(1, max_segment + 1):
+        if n - 2 < length + 1:
+            break
+        # Segment order[i..i+length-1], 1 <= i and i + length <= n - 1
+        i = np.arange(1, n - length)[:, None]
+        first, last = o[i], o[i + length - 1]
+        before, after = o[i - 1], o[i + length]
+        removal = cost[before, first] + cost[last, after] - cost[before, after]
+
+        # Insert between order[p] and order[p + 1], outside the segment and its neighbours
+        p = np.arange(0, n - 1)[None, :]
+        insertion = cost[o[p], first] + cost[last, o[p + 1]] - cost[o[p], o[p + 1]]
+        delta = insertion - removal
+        delta = np.where((p >= i - 1) & (p <= i + length - 1), np.inf, delta)
+
+        index = np.unravel_index(np.argmin(delta), delta.shape)
+        if delta[index] < best_delta:
+            best_delta, best_move = delta[index], (index[0] + 1, length, index[1])
+
+    if best_move is None:
+        return False
+    start, length, position = best_move
+    segment = order[start:start + length]
+    rest = order[:start] + order[start + length:]
+    insert_at = position + 1 if position < start else position + 1 - length
+    order[:] = rest[:insert_at] + segment + rest[insert_at:]
+    return True
+
+
+def solve_path(cost: np.ndarray, start: Optional[int] = None, end: Optional[int] = None,
+               time_limit: float = 1.0) -> List[int]:
+    """
+    Order every node of `cost` into a short path. `start` / `end` fix the first / last
+    node; left as None, the path may start / end anywhere. Improvement stops at a local
+    optimum or after `time_limit` seconds.
+    """
+    cost = _finite(cost)
+    n = len(cost)
+    if n <= 1:
+        return list(range(n))
+
+    # Dummy nodes: free to leave from (open start) or to arrive at (open end)
+    size = n + (start is None) + (end is None)
+    full = np.full((size, size), UNREACHABLE)
+    full[:n, :n] = cost
+    first, last = start, end
+    if start is None:
+        first = n
+        full[first, :n] = 0
+    if end is None:
+        last = size - 1
+        full[:n, last] = 0
+
+    order = nearest_neighbour(full, first, last)
+    deadline = time.monotonic() + time_limit
+    while time.monotonic() < deadline:
+        if not (two_opt(full, order) or or_opt(full, order)):
+            break
+    return [node for node in order if node < n]
+
+
+def split_days(cost: np.ndarray, order: List[int], days: Optional[int] = None,
+               max_day_seconds: Optional[float] = None, dwell_seconds: float = 0) -> List[List[int]]:
+    """
+    Split a path into consecutive days; each day starts where the previous one ended.
+    With `days`, the travel and dwell time is shared out evenly; with `max_day_seconds`,
+    a new day starts whenever the next leg would go over the limit. Every day has at
+    least one leg.
+    """
+    cost = _finite(cost)
+    legs = [cost[a, b] + dwell_seconds for a, b in zip(order, order[1:])]
+    if len(legs) <= 1 or (not days and not max_day_seconds):
+        return [list(order)]
+
+    cuts = []
+    if days:
+        days = min(days, len(legs))
+        total = sum(legs)
+        elapsed = 0.0
+        for index, leg in enumerate(legs[:-1]):
+            elapsed += leg
+            # Cut once this day's share is used up, keeping a leg for every remaining day
+            if len(cuts) < days - 1 and elapsed >= total * (len(cuts) + 1) / days:
+                cuts.append(index + 1)
+            elif len(legs) - (index + 1) == days - 1 - len(cuts):
+                cuts.append(index + 1)
+    else:
+        day = 0.0
+        for index, leg in enumerate(legs):
+            if day > 0 and day + leg > max_day_seconds:
+                cuts.append(index)
+                day = 0.0
+            day += leg
+
+    plans, previous = [], 0
+    for cut in cuts + [len(order) - 1]:
+        plans.append(list(order[previous:cut + 1]))
+        previous = cut
+    return plans
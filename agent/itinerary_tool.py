@@ -0,0 +1,125 @@
+from langchain_core.tools import BaseTool
+from langchain_core.runnables import RunnableConfig
+from pydantic import BaseModel, Field
+from .google_route_tool import GoogleRoutesTool, ResolvedLocation, ResolvedRoute
+from .itinerary import solve_path, split_days
+from functools import partial
+from typing import Any, Dict, List, Optional
+import asyncio
+import contextvars
+import requests
+
+class ItineraryInput(BaseModel):
+    stops: List[str] = Field(description="Places to visit, in any order")
+    start: str = Field(default="", description="Where the trip starts (leave empty for the current location, if shared)")
+    end: str = Field(default="", description="Where the trip ends (leave empty to end at the last stop)")
+    days: Optional[int] = Field(default=None, description="Number of days to spread the stops over")
+    max_hours_per_day: Optional[float] = Field(default=None, description="Maximum hours per day, including time at stops")
+    minutes_per_stop: float = Field(default=0, description="Time spent at each stop, in minutes")
+    mode: str = Field(default="driving", description="Travel mode (driving/walking/bicycling/transit)")
+
+class ItineraryTool(BaseTool):
+    """
+    Orders many stops (more than computeRoutes can optimize) into an efficient trip:
+    one batched route matrix for travel times, the local solver for the order and day
+    splits, then computeRoutes only for each day's final legs.
+    """
+    name: str = "plan_itinerary"
+    description: str = (
+        "Plan an efficient visiting order for many stops (up to around 80), optionally split over several days, "
+        "with travel times and a Google Maps link per day. Use this for trip itineraries; use google_routes for "
+        "directions between a few places. Input: stops list, optional start and end, optional days or "
+        "max_hours_per_day, optional minutes_per_stop, and travel mode."
+    )
+    args_schema: Any = ItineraryInput
+    routes: Any = Field(default=None, exclude=True)
+
+    def __init__(self, routes: GoogleRoutesTool, **kwargs: Any):
+        super().__init__(routes=routes, **kwargs)
+
+    def _resolve(self, start: str, end: str, stops: List[str], user_context: Dict):
+        """Resolve start, end and stops concurrently, returning (start, end, stops, failed stop names)"""
+        routes = self.routes
+        if start:
+            start_task = partial(routes._geocode_location, start)
+        elif routes._get_current_location_coords(user_context):
+            start_task = partial(routes._get_current_location_coords, user_context)
+        else:
+            start_task = lambda: None
+        end_task = partial(routes._geocode_location, end) if end else (lambda: None)
+        tasks = [start_task, end_task] + [partial(routes._geocode_location, stop) for stop in stops]
+        tasks = [partial(contextvars.copy_context().run, task) for task in tasks]
+        results = list(routes.geocode_executor.map(routes._safe_lookup, tasks))
+
+        start_location = None
+        if results[0]:
+            start_name = start or routes._get_current_location_address(user_context)
+            start_location = ResolvedLocation(name=start_name, **results[0])
+        end_location = ResolvedLocation(name=end, **results[1]) if results[1] else None
+
+        resolved, failed = [], []
+        for stop, coords in zip(stops, results[2:]):
+            if coords:
+                resolved.append(ResolvedLocation(name=stop, **coords))
+            else:
+                failed.append(stop)
+        if start and start_location is None:
+            failed.insert(0, start)
+        if end and end_location is None:
+            failed.append(end)
+        return start_location, end_location, resolved, failed
+
+    def _plan(self, stops: List[str], start: str, end: str, days: Optional[int], max_hours_per_day: Optional[float],
+              minutes_per_stop: float, mode: str, user_context: Dict) -> str:
+        routes = self.routes
+        start_location, end_location, resolved, failed = self._resolve(start, end, stops, user_context)
+        points = ([start_location] if start_location else []) + resolved + ([end_location] if end_location else [])
+        if len(points) < 2:
+            return "❌ Need at least two places I can find to plan an itinerary"
+
+        durations, distances = routes.route_matrix.matrix(points, points, mode)
+        order = solve_path(durations, start=0 if start_location else None,
+                           end=len(points) - 1 if end_location else None)
+        max_day_seconds = max_hours_per_day * 3600 if max_hours_per_day else None
+        day_paths = split_days(durations, order, days=days, max_day_seconds=max_day_seconds,
+                               dwell_seconds=minutes_per_stop * 60)
+
+        result = f"⚠️ Could not find: {', '.join(failed)}\n\n" if failed else ""
+        result += f"🗺️ **Itinerary**: {len(resolved)} stops over {len(day_paths)} day(s), {mode.title()}\n\n"
+        for day, path in enumerate(day_paths, start=1):
+            stops_in_order = [points[i] for i in path]
+            route = ResolvedRoute(origin=stops_in_order[0], destination=stops_in_order[-1],
+                                  waypoints=stops_in_order[1:-1],
+                                  using_current_location=day == 1 and start_location is not None and not start)
+            api_response, _ = routes._get_route_in_order(route, mode)
+            if 'error' in api_response or not api_response.get('routes'):
+                message = api_response.get('error', {}).get('message', 'No route found')
+                result += f"**Day {day}**: ❌ {message}\n\n"
+                continue
+
+            summary = api_response['routes'][0]
+            travel = int(summary['duration'].rstrip('s'))
+            result += f"**Day {day}** — ⏱️ {routes._format_duration(travel)} travel"
+            if minutes_per_stop:
+                result += f" + {routes._format_duration(int(minutes_per_stop * 60 * (len(path) - 1)))} at stops"
+            result += f", 📏 {routes._format_distance(summary['distanceMeters'])}\n"
+            result += " → ".join(stop.name for stop in stops_in_order) + "\n"
+            result += f"🔗 [Open in Google Maps]({routes._create_google_maps_url(route)})\n\n"
+        return result.rstrip() + "\n"
+
+    def _run(self, stops: List[str], start: str = "", end: str = "", days: Optional[int] = None,
+             max_hours_per_day: Optional[float] = None, minutes_per_stop: float = 0, mode: str = "driving",
+             config: RunnableConfig = None) -> str:
+        try:
+            user_context = self.routes._get_user_context(config)
+            return self._plan(stops, start, end, days, max_hours_per_day, minutes_per_stop, mode, user_context)
+        except requests.exceptions.RequestException as e:
+            return f"❌ Network error calling Routes API: {str(e)}"
+        except Exception as e:
+            return f"❌ Unexpected error: {str(e)}"
+
+    async def _arun(self, stops: List[str], start: str = "", end: str = "", days: Optional[int] = None,
+                    max_hours_per_day: Optional[float] = None, minutes_per_stop: float = 0, mode: str = "driving",
+                    config: RunnableConfig = None) -> str:
+        return await asyncio.to_thread(self._run, stops, start, end, days, max_hours_per_day, minutes_per_stop,
+                                       mode, config)
@@ -0,0 +1,221 @@
+"""
+LLM response caches for the chat model, scoped to one version of the system prompt.
+
+The exact tier answers a request whose serialized messages and model settings match
+an earlier one byte for byte (a new conversation opening with "hi" again). The
+semantic tier is opt-in: for a conversation's first message it also answers
+paraphrases ("what can you do?" / "what are you able to do"), found by cosine
+similarity over local hashed bag-of-words embeddings, so nothing leaves the process.
+"""
+from .cache import CacheStats, MemoryCache
+from collections import OrderedDict
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import zlib
+
+try:
+    import numpy as np
+except ImportError:  # the semantic cache is optional
+    np = None
+
+_WORD = re.compile(r"\w+")
+
+
+def prompt_version(*parts: str) -> str:
+    """Short hash identifying a version of the static prompt"""
+    return hashlib.sha256("\x00".join(parts).encode()).hexdigest()[:12]
+
+
+def hashed_embedding(text: str, dim: int = 512) -> "np.ndarray":
+    """L2-normalized hashed bag of words and word bigrams"""
+    words = _WORD.findall(text.lower())
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    vector = np.zeros(dim, dtype=np.float32)
+    for feature in features:
+        h = zlib.crc32(feature.encode())
+        vector[h % dim] += 1.0 if (h >> 16) & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def _message_roles(prompt: str) -> Optional[List[Tuple[str, str]]]:
+    """(type, text) of each message in a serialized chat prompt, or None if it isn't one"""
+    try:
+        messages = json.loads(prompt)
+    except ValueError:
+        return None
+    if not isinstance(messages, list):
+        return None
+    roles = []
+    for message in messages:
+        kwargs = message.get('kwargs', {}) if isinstance(message, dict) else {}
+        content = kwargs.get('content')
+        if not isinstance(content, str):
+            return None
+        roles.append((kwargs.get('type', ''), content))
+    return roles
+
+
+def _copy_generations(generations: RETURN_VAL_TYPE) -> RETURN_VAL_TYPE:
+    # Fresh copies without message IDs, so each hit gets its own run's ID, marked as cache hits
+    copies = []
+    for generation in generations:
+        update = {'generation_info': {**(generation.generation_info or {}), 'cache_hit': True}}
+        message = getattr(generation, 'message', None)
+        if message is not None:
+            update['message'] = message.model_copy(update={'id': None})
+        copies.append(generation.model_copy(update=update))
+    return copies
+
+
+class SemanticIndex:
+    """
+    Bounded nearest-neighbour index of first-message answers. Entries expire after
+    `ttl` seconds; past `max_entries` the least recently used are dropped.
+    """
+
+    def __init__(self, threshold: float = 0.9, max_entries: int = 1000, ttl: float = 3600, dim: int = 512):
+        if np is None:
+            raise ImportError("The semantic LLM cache needs numpy")
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.dim = dim
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Any, RETURN_VAL_TYPE, float]]" = OrderedDict()
+        self._matrix = None
+        self._keys: List[Tuple[str, str]] = []
+        self._lock = threading.Lock()
+
+    def _rebuild(self) -> None:
+        self._keys = list(self._entries)
+        self._matrix = np.stack([self._entries[key][0] for key in self._keys]) if self._keys else None
+
+    def search(self, scope: str, text: str) -> Optional[RETURN_VAL_TYPE]:
+        query = hashed_embedding(text, self.dim)
+        with self._lock:
+            if self._matrix is None:
+                self._rebuild()
+            if self._matrix is not None:
+                similarities = self._matrix @ query
+                now = time.time()
+                for index in np.argsort(-similarities):
+                    if similarities[index] < self.threshold:
+                        break
+                    key = self._keys[index]
+                    entry = self._entries.get(key)
+                    if key[0] == scope and entry is not None and entry[2] > now:
+                        self._entries.move_to_end(key)
+                        self.stats.record(True)
+                        return entry[1]
+        self.stats.record(False)
+        return None
+
+    def add(self, scope: str, text: str, generations: RETURN_VAL_TYPE) -> None:
+        with self._lock:
+            self._entries[(scope, text)] = (hashed_embedding(text, self.dim), generations, time.time() + self.ttl)
+            self._entries.move_to_end((scope, text))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+
+class LLMResponseCache(BaseCache):
+    """
+    langchain BaseCache for the chat model. Every key includes `version`, the hash of
+    the static system prompt, so editing the prompt starts from an empty cache. The
+    semantic tier only answers a conversation's opening message (system prompt plus one
+    human message, no location context) and only with plain text answers, never tool
+    calls, since those depend on what the user is asking about right now.
+    """
+
+    def __init__(self, version: str, max_entries: int = 1000, ttl: float = 3600,
+                 semantic: Optional[SemanticIndex] = None):
+        self.version = version
+        self.ttl = ttl
+        self.exact = MemoryCache(max_entries=max_entries, default_ttl=ttl)
+        self.semantic = semantic
+
+    def _key(self, prompt: str, llm_string: str) -> str:
+        digest = hashlib.sha256(f"{llm_string}\x00{prompt}".encode()).hexdigest()
+        return f"{self.version}:{digest}"
+
+    def _semantic_text(self, prompt: str) -> Optional[str]:
+        roles = _message_roles(prompt)
+        if roles and [role for role, _ in roles] == ['system', 'human']:
+            return roles[1][1]
+        return None
+
+    def _scope(self, llm_string: str) -> str:
+        return f"{self.version}:{hashlib.sha256(llm_string.encode()).hexdigest()[:16]}"
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        generations = self.exact.get(self._key(prompt, llm_string))
+        if generations is None and self.semantic is not None:
+            text = self._semantic_text(prompt)
+            if text is not None:
+                generations = self.semantic.search(self._scope(llm_string), text)
+        return _copy_generations(generations) if generations is not None else None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        self.exact.set(self._key(prompt, llm_string), _copy_generations(return_val))
+        if self.semantic is None:
+            return
+        text = self._semantic_text(prompt)
+        plain_text = all(not getattr(getattr(g, 'message', None), 'tool_calls', None) for g in return_val)
+        if text is not None and plain_text:
+            self.semantic.add(self._scope(llm_string), text, _copy_generations(return_val))
+
+    async def alookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        # In-memory only, so no need for the default thread hop
+        return self.lookup(prompt, llm_string)
+
+    async def aupdate(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        self.update(prompt, llm_string, return_val)
+
+    def clear(self, **kwargs: Any) -> None:
+        self.exact.clear()
+        if self.semantic is not None:
+            self.semantic.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        summary = {'exact': self.exact.stats.as_dict()}
+        if self.semantic is not None:
+            summary['semantic'] = self.semantic.stats.as_dict()
+        return summary
+
+
+def create_llm_cache(version: str) -> Optional[LLMResponseCache]:
+    """
+    Build the LLM cache from LLM_CACHE_ENABLED, LLM_CACHE_SIZE and LLM_CACHE_TTL, with
+    the semantic tier when LLM_SEMANTIC_CACHE=1 (LLM_SEMANTIC_CACHE_THRESHOLD sets the
+    cosine similarity needed for a hit). Returns None when caching is disabled.
+
+    Off unless LLM_CACHE_ENABLED=1: the model samples at a non-zero temperature, and a
+    cache replays one of its answers to everyone who asks the same thing for the TTL.
+    """
+    if os.getenv("LLM_CACHE_ENABLED", "0") != "1":
+        return None
+    ttl = float(os.getenv("LLM_CACHE_TTL", "3600"))
+    max_entries = int(os.getenv("LLM_CACHE_SIZE", "1000"))
+
+    semantic = None
+    if os.getenv("LLM_SEMANTIC_CACHE", "0") == "1":
+        try:
+            semantic = SemanticIndex(threshold=float(os.getenv("LLM_SEMANTIC_CACHE_THRESHOLD", "0.9")),
+                                     max_entries=max_entries, ttl=ttl)
+        except ImportError as e:
+            print(f"Semantic LLM cache unavailable: {e}")
+
+    return LLMResponseCache(version, max_entries=max_entries, ttl=ttl, semantic=semantic)
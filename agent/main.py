@@ -1,8 +1,185 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import AsyncIterator, Optional
 from enum import Enum
+import asyncio
+import json
+import math
+import os
+import weakref
+
+from .agent import ask_agent_async, astream_agent, warmup
+from .metrics import metrics
+from .rate_limit import RateLimiter
+
+# Agent runs in flight across all users; more wait up to CHAT_QUEUE_TIMEOUT s for a slot, then get a 503
+CHAT_MAX_CONCURRENCY = int(os.getenv("CHAT_MAX_CONCURRENCY", "100"))
+CHAT_QUEUE_TIMEOUT = float(os.getenv("CHAT_QUEUE_TIMEOUT", "10"))
+# Per-user token bucket. Limits are per process, so route each user to the same instance
+# behind the load balancer (e.g. hash on user_id) for them to hold across replicas.
+# CHAT_RATE_LIMIT_PER_MINUTE=0 turns the limit off.
+CHAT_RATE_LIMIT_PER_MINUTE = float(os.getenv("CHAT_RATE_LIMIT_PER_MINUTE", "20"))
+CHAT_RATE_BURST = int(os.getenv("CHAT_RATE_BURST", "5"))
+MAX_RETRY_AFTER = 3600
+# Build the agent before accepting requests (the server only reports ready once it's built);
+# AGENT_WARMUP=0 defers it to the first chat
+AGENT_WARMUP = os.getenv("AGENT_WARMUP", "1") == "1"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if AGENT_WARMUP:
+        await asyncio.to_thread(warmup)
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
+
+chat_slots = asyncio.Semaphore(CHAT_MAX_CONCURRENCY)
+rate_limiter = RateLimiter(CHAT_RATE_LIMIT_PER_MINUTE, CHAT_RATE_BURST)
+# One run at a time per user, so their turns land in the conversation thread in order.
+# Weak values: a user's lock goes away once no request holds or waits on it.
+user_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+class Location(BaseModel):
+    latitude: float = Field(ge=-90, le=90)
+    longitude: float = Field(ge=-180, le=180)
+    address: Optional[str] = None
+
+
+class ChatRequest(BaseModel):
+    message: str = Field(min_length=1, max_length=4000)
+    user_id: str = Field(min_length=1, max_length=128)
+    location: Optional[Location] = None
+    stream: bool = True
+
+
+def get_user_context(request: ChatRequest) -> dict:
+    """User context for the agent, in the same shape the Telegram bot stores"""
+    if request.location is None:
+        return {}
+    location = {
+        'latitude': request.location.latitude,
+        'longitude': request.location.longitude,
+        'timestamp': datetime.now(),
+    }
+    if request.location.address:
+        location['address'] = request.location.address
+    return {'current_location': location}
+
+
+def get_thread_id(user_id: str) -> str:
+    # Namespaced so API users never share a thread with a Telegram chat ID
+    return f"api:{user_id}"
+
+
+class ChatSlot:
+    """A held place in the per-user queue and the global concurrency limit"""
+
+    def __init__(self, user_lock: asyncio.Lock):
+        self.user_lock = user_lock
+        self.released = False
+
+    def release(self) -> None:
+        if self.released:
+            return
+        self.released = True
+        chat_slots.release()
+        self.user_lock.release()
+
+
+async def acquire_slot(user_id: str) -> ChatSlot:
+    """Wait for the user's previous run and a global slot, or raise 503 after CHAT_QUEUE_TIMEOUT"""
+    user_lock = user_locks.get(user_id)
+    if user_lock is None:
+        user_lock = user_locks[user_id] = asyncio.Lock()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + CHAT_QUEUE_TIMEOUT
+    try:
+        await asyncio.wait_for(user_lock.acquire(), timeout=CHAT_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Previous message still in progress",
+                            headers={"Retry-After": str(math.ceil(CHAT_QUEUE_TIMEOUT))})
+    try:
+        await asyncio.wait_for(chat_slots.acquire(), timeout=max(0.0, deadline - loop.time()))
+    except asyncio.TimeoutError:
+        user_lock.release()
+        raise HTTPException(status_code=503, detail="Server busy",
+                            headers={"Retry-After": str(math.ceil(CHAT_QUEUE_TIMEOUT))})
+    return ChatSlot(user_lock)
+
+
+def retry_after_header(seconds: float) -> str:
+    # Whole seconds, clamped so a very slow refill can't produce an absurd (or infinite) header
+    return str(math.ceil(min(max(seconds, 1.0), MAX_RETRY_AFTER)))
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def sse_stream(request: ChatRequest, slot: ChatSlot) -> AsyncIterator[str]:
+    """Agent events as Server-Sent Events; the event name is the agent event type"""
+    try:
+        async for event in astream_agent(request.message, user_context=get_user_context(request),
+                                         thread_id=get_thread_id(request.user_id)):
+            data = {key: value for key, value in event.items() if key != 'type'}
+            yield sse_event(event['type'], data)
+    except Exception as e:
+        print(f"Error during agent execution: {e}")
+        yield sse_event("error", {"message": str(e)})
+    finally:
+        slot.release()
 
-app = FastAPI()
 
 @app.get("/ping")
 async def ping():
-    return {"message": "pong"}
\ No newline at end of file
+    return {"message": "pong"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Stage latencies (histograms and p50/p95/p99), counters and cache hits in the Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.post("/chat")
+async def chat(request: ChatRequest):
+    """
+    Send a message to the agent as `user_id`, continuing that user's conversation.
+
+    Streams `token`, `tool_start`, `tool_end` and finally `final` (or `error`) events over
+    SSE; with `"stream": false` the reply is returned as JSON once it's complete.
+    """
+    allowed, retry_after = rate_limiter.acquire(request.user_id)
+    if not allowed:
+        metrics.count("rejected", reason="rate_limited")
+        raise HTTPException(status_code=429, detail="Too many messages, slow down",
+                            headers={"Retry-After": retry_after_header(retry_after)})
+
+    with metrics.stage("chat_queue"):
+        try:
+            slot = await acquire_slot(request.user_id)
+        except HTTPException:
+            metrics.count("rejected", reason="busy")
+            raise
+    if not request.stream:
+        try:
+            reply = await ask_agent_async(request.message, user_context=get_user_context(request),
+                                          thread_id=get_thread_id(request.user_id))
+        finally:
+            slot.release()
+        return {"reply": reply}
+
+    # The slot is released when the stream ends, or by the background task if the client goes away first
+    return StreamingResponse(
+        sse_stream(request, slot),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(slot.release),
+    )
@@ -0,0 +1,292 @@
+"""
+Per-stage latency tracing and counters for the agent pipeline.
+
+Each stage of a request (Telegram receive, intent check, LLM calls, tool calls,
+geocoding, Routes API calls...) is timed with `metrics.stage(name, **labels)`. Timings
+go into a Prometheus histogram plus a window of recent samples for p50/p95/p99, and,
+with METRICS_LOG=1, into one JSON log line per stage carrying the request's trace id,
+so a slow reply can be broken down stage by stage.
+
+`metrics.render()` produces the Prometheus text format served on /metrics.
+"""
+from collections import deque
+from contextlib import contextmanager
+from langchain_core.callbacks import BaseCallbackHandler
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers a cached lookup through to a slow multi-step agent run
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+_trace_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("trace_id", default=None)
+
+
+def _percentile(samples, fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items() if value is not None))
+
+
+def _format_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def current_trace_id() -> Optional[str]:
+    return _trace_id.get()
+
+
+class StageHistogram:
+    """Bucket counts, sum and recent samples (seconds) for one stage and label set"""
+
+    def __init__(self, buckets: Tuple[float, ...], max_samples: int):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+        self.samples: Deque[float] = deque(maxlen=max_samples)
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.samples.append(seconds)
+        for index, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.bucket_counts[index] += 1
+
+    def quantiles(self) -> Dict[float, float]:
+        samples = list(self.samples)
+        return {q: _percentile(samples, q) for q in QUANTILES}
+
+
+class Metrics:
+    """
+    Registry of stage latencies, counters and cache statistics.
+
+    Thread-safe; stages nest, and the outermost stage of a request starts the trace id
+    that every stage inside it (including ones in worker threads that copy the context)
+    is logged with.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, max_samples: int = 1000, log: bool = False):
+        self.buckets = tuple(sorted(buckets))
+        self.max_samples = max_samples
+        self.log = log
+        self._histograms: Dict[str, Dict[LabelKey, StageHistogram]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._caches: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "Metrics":
+        """Build from METRICS_LOG (1 to log every stage as JSON) and METRICS_SAMPLES (quantile window)"""
+        log = os.getenv("METRICS_LOG", "0") == "1"
+        if log and not logger.handlers:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+        return cls(max_samples=int(os.getenv("METRICS_SAMPLES", "1000")), log=log)
+
+    def observe(self, stage: str, seconds: float, status: str = "ok", **labels: Any) -> None:
+        """Record one timing of `stage`"""
+        key = _label_key({**labels, 'status': status})
+        with self._lock:
+            histograms = self._histograms.setdefault(stage, {})
+            histogram = histograms.get(key)
+            if histogram is None:
+                histogram = histograms[key] = StageHistogram(self.buckets, self.max_samples)
+            histogram.observe(seconds)
+
+    def count(self, name: str, value: float = 1, **labels: Any) -> None:
+        """Add `value` to the counter `name`"""
+        key = _label_key(labels)
+        with self._lock:
+            counters = self._counters.setdefault(name, {})
+            counters[key] = counters.get(key, 0) + value
+
+    def register_cache(self, name: str, stats: Callable[[], Dict[str, Any]]) -> None:
+        """Export a cache's hit/miss counts; `stats` returns a dict with 'hits' and 'misses'"""
+        with self._lock:
+            self._caches[name] = stats
+
+    @contextmanager
+    def stage(self, name: str, **labels: Any) -> Iterator[Dict[str, Any]]:
+        """
+        Time the enclosed block as `name`. Yields a dict the block can add log fields to
+        (e.g. token counts); setting its 'status' marks the stage as failed without an
+        exception. An exception marks the stage "error" and is re-raised.
+        """
+        token = _trace_id.set(uuid.uuid4().hex[:16]) if _trace_id.get() is None else None
+        span: Dict[str, Any] = {'status': 'ok'}
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span['status'] = 'error'
+            span.setdefault('error', type(e).__name__)
+            raise
+        finally:
+            self.record(name, time.perf_counter() - started, span, **labels)
+            if token is not None:
+                try:
+                    _trace_id.reset(token)
+                except ValueError:
+                    # Ended in a different context than it started (e.g. a generator closed elsewhere)
+                    pass
+
+    def record(self, name: str, seconds: float, span: Dict[str, Any], **labels: Any) -> None:
+        """Record a stage timed elsewhere: observe it and log it with `span`'s fields"""
+        self.observe(name, seconds, status=span.get('status', 'ok'), **labels)
+        if not self.log:
+            return
+        record = {'trace_id': _trace_id.get(), 'stage': name, 'ms': round(seconds * 1000, 2), **labels, **span}
+        logger.info(json.dumps(record, default=str, ensure_ascii=False))
+
+    def snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Count and p50/p95/p99 (ms) per stage and label set"""
+        with self._lock:
+            summary = {}
+            for stage, histograms in self._histograms.items():
+                summary[stage] = []
+                for key, histogram in histograms.items():
+                    quantiles = histogram.quantiles()
+                    summary[stage].append({
+                        **dict(key),
+                        'count': histogram.count,
+                        **{f"p{int(q * 100)}_ms": round(value * 1000, 2) for q, value in quantiles.items()},
+                    })
+            return summary
+
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            caches = dict(self._caches)
+        stats = {}
+        for name, read in caches.items():
+            try:
+                stats[name] = read()
+            except Exception as e:
+                print(f"Could not read stats for cache {name}: {e}")
+        return stats
+
+    def render(self) -> str:
+        """Everything in the Prometheus text exposition format"""
+        lines = [
+            "# HELP agent_stage_duration_seconds Time spent in each stage of the agent pipeline",
+            "# TYPE agent_stage_duration_seconds histogram",
+        ]
+        quantile_lines = [
+            "# HELP agent_stage_latency_seconds Recent p50/p95/p99 of each stage",
+            "# TYPE agent_stage_latency_seconds summary",
+        ]
+        with self._lock:
+            for stage, histograms in sorted(self._histograms.items()):
+                for key, histogram in sorted(histograms.items()):
+                    key = (('stage', stage),) + key
+                    for bound, count in zip(histogram.buckets, histogram.bucket_counts):
+                        lines.append(f"agent_stage_duration_seconds_bucket{_format_labels(key, (('le', f'{bound:g}'),))} {count}")
+                    lines.append(f"agent_stage_duration_seconds_bucket{_format_labels(key, (('le', '+Inf'),))} {histogram.count}")
+                    lines.append(f"agent_stage_duration_seconds_sum{_format_labels(key)} {histogram.total:.6f}")
+                    lines.append(f"agent_stage_duration_seconds_count{_format_labels(key)} {histogram.count}")
+                    for q, value in histogram.quantiles().items():
+                        quantile_lines.append(f"agent_stage_latency_seconds{_format_labels(key, (('quantile', f'{q:g}'),))} {value:.6f}")
+                    quantile_lines.append(f"agent_stage_latency_seconds_sum{_format_labels(key)} {histogram.total:.6f}")
+                    quantile_lines.append(f"agent_stage_latency_seconds_count{_format_labels(key)} {histogram.count}")
+            counters = {name: dict(values) for name, values in self._counters.items()}
+        lines += quantile_lines
+
+        for name, values in sorted(counters.items()):
+            lines.append(f"# TYPE agent_{name}_total counter")
+            for key, value in sorted(values.items()):
+                lines.append(f"agent_{name}_total{_format_labels(key)} {value:g}")
+
+        cache_stats = self.cache_stats()
+        for field in ('hits', 'misses'):
+            lines.append(f"# TYPE agent_cache_{field}_total counter")
+            for name, stats in sorted(cache_stats.items()):
+                lines.append(f"agent_cache_{field}_total{_format_labels((('cache', name),))} {stats.get(field, 0)}")
+        return "\n".join(lines) + "\n"
+
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """Callback handler timing every chat model call as the "llm" stage, with its token counts"""
+
+    run_inline = True
+
+    def __init__(self, registry: Metrics):
+        self.registry = registry
+        self._started: Dict[uuid.UUID, Tuple[float, Optional[str], Optional[str]]] = {}
+
+    def _start(self, run_id: uuid.UUID, metadata: Optional[Dict[str, Any]]) -> None:
+        model = (metadata or {}).get('ls_model_name')
+        self._started[run_id] = (time.perf_counter(), current_trace_id(), model)
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *, run_id: uuid.UUID,
+                            metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        self._start(run_id, metadata)
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: uuid.UUID,
+                     metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        self._start(run_id, metadata)
+
+    def _finish(self, run_id: uuid.UUID, span: Dict[str, Any], cache_hit: bool = False,
+                input_tokens: int = 0, output_tokens: int = 0) -> None:
+        started, trace_id, model = self._started.pop(run_id, (None, None, None))
+        if started is None:
+            return
+        seconds = time.perf_counter() - started
+        labels = {'model': model, 'cache_hit': str(cache_hit).lower()}
+        if input_tokens or output_tokens:
+            self.registry.count("llm_tokens", input_tokens, model=model, kind="input")
+            self.registry.count("llm_tokens", output_tokens, model=model, kind="output")
+        # Callbacks may run outside the request's context; log under the trace the call started in
+        token = _trace_id.set(trace_id) if trace_id and current_trace_id() is None else None
+        try:
+            self.registry.record("llm", seconds, span, **labels)
+        finally:
+            if token is not None:
+                _trace_id.reset(token)
+
+    def on_llm_end(self, response: Any, *, run_id: uuid.UUID, **kwargs: Any) -> None:
+        generations = [generation for batch in response.generations for generation in batch]
+        # Answers from the LLM cache (marked by llm_cache) cost no tokens
+        if generations and all((g.generation_info or {}).get('cache_hit') for g in generations):
+            self._finish(run_id, {'status': 'ok'}, cache_hit=True)
+            return
+        input_tokens = output_tokens = 0
+        for generation in generations:
+            usage = getattr(getattr(generation, 'message', None), 'usage_metadata', None) or {}
+            input_tokens += usage.get('input_tokens', 0)
+            output_tokens += usage.get('output_tokens', 0)
+        if not input_tokens and not output_tokens:
+            usage = (response.llm_output or {}).get('token_usage') or {}
+            input_tokens = usage.get('prompt_tokens', 0)
+            output_tokens = usage.get('completion_tokens', 0)
+        self._finish(run_id, {'status': 'ok', 'input_tokens': input_tokens, 'output_tokens': output_tokens},
+                     input_tokens=input_tokens, output_tokens=output_tokens)
+
+    def on_llm_error(self, error: BaseException, *, run_id: uuid.UUID, **kwargs: Any) -> None:
+        self._finish(run_id, {'status': 'error', 'error': type(error).__name__})
+
+
+# Shared by the agent, its tools, the Telegram bot and the API
+metrics = Metrics.from_env()
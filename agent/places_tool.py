@@ -0,0 +1,52 @@
+from langchain_core.callbacks import AsyncCallbackManagerForToolRun
+from langchain_google_community import GooglePlacesTool
+from .http_client import get_default_http_client
+from pydantic import Field
+from typing import List, Optional
+import asyncio
+import googlemaps
+import os
+
+
+class AsyncGooglePlacesTool(GooglePlacesTool):
+    """
+    GooglePlacesTool with an async path for the event loop.
+
+    The stock tool runs a text search and then fetches details for every result one
+    after another, all blocking. Here the googlemaps calls run in worker threads and
+    the detail lookups run concurrently (up to `detail_concurrency` at a time), so an
+    async caller waits for roughly one search plus one details call and never blocks
+    the loop. Output is identical to the sync tool.
+    """
+    detail_concurrency: int = Field(default_factory=lambda: int(os.getenv("PLACES_DETAIL_CONCURRENCY", "5")))
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # Same pooled session and endpoint (GOOGLE_MAPS_BASE_URL) as the routes tool's client
+        http = get_default_http_client()
+        self.api_wrapper.google_map_client = googlemaps.Client(
+            key=self.api_wrapper.gplaces_api_key,
+            requests_session=http.session,
+            connect_timeout=http.connect_timeout,
+            read_timeout=http.read_timeout,
+            base_url=os.getenv("GOOGLE_MAPS_BASE_URL", "https://maps.googleapis.com"),
+        )
+
+    async def _arun(self, query: str, run_manager: Optional[AsyncCallbackManagerForToolRun] = None) -> str:
+        wrapper = self.api_wrapper
+        search = await asyncio.to_thread(wrapper.google_map_client.places, query)
+        results = search["results"]
+        if not results:
+            return "Google Places did not find any places that match the description"
+        if wrapper.top_k_results is not None:
+            results = results[:wrapper.top_k_results]
+
+        semaphore = asyncio.Semaphore(max(1, self.detail_concurrency))
+
+        async def details(place_id: str) -> Optional[str]:
+            async with semaphore:
+                return await asyncio.to_thread(wrapper.fetch_place_details, place_id)
+
+        fetched = await asyncio.gather(*(details(result["place_id"]) for result in results))
+        places: List[str] = [item for item in fetched if item is not None]
+        return "\n".join(f"{i + 1}. {item}" for i, item in enumerate(places))
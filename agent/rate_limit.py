@@ -0,0 +1,43 @@
+from collections import OrderedDict
+from typing import Callable, Hashable, Tuple
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Per-key token buckets: each key may make `burst` requests at once and then
+    `rate_per_minute` requests per minute. Buckets for the least recently seen keys
+    are dropped past `max_keys`, so memory stays bounded however many users show up.
+    A `rate_per_minute` of 0 or less turns limiting off.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int, max_keys: int = 10000,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets: "OrderedDict[Hashable, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key: Hashable) -> Tuple[bool, float]:
+        """Take a token for `key`, returning (allowed, seconds until the next token if not)"""
+        if self.rate <= 0:
+            return True, 0.0
+        with self._lock:
+            now = self.clock()
+            tokens, updated = self._buckets.get(key, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - updated) * self.rate)
+
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+
+            if allowed:
+                return True, 0.0
+            return False, (1 - tokens) / self.rate
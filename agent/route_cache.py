@@ -0,0 +1,94 @@
+from .cache import MemoryCache
+from typing import Any, Dict, List, Optional, Tuple
+import os
+import time
+
+# Traffic and timetables move faster than walking or cycling times do
+DEFAULT_MODE_TTLS = {
+    'driving': 300,
+    'transit': 300,
+    'bicycling': 1800,
+    'walking': 3600,
+}
+
+
+class RouteCache:
+    """
+    Short-lived cache of Routes API responses, keyed on the coordinates of origin and
+    destination, the set of waypoints (all rounded to `precision` decimal places) and
+    the travel mode.
+
+    Because waypoint order is optimized by the API, the key uses the waypoint set.
+    Cached optimizedIntermediateWaypointIndex values are remapped to the order of the
+    waypoints in the route being looked up.
+    """
+
+    def __init__(self, cache: Optional[MemoryCache] = None, precision: int = 4,
+                 mode_ttls: Optional[Dict[str, float]] = None):
+        self.cache = cache if cache is not None else MemoryCache(max_entries=int(os.getenv("ROUTE_CACHE_SIZE", "2000")))
+        self.precision = precision
+        self.mode_ttls = {**DEFAULT_MODE_TTLS, **(mode_ttls or {})}
+
+    def _point(self, location: Any) -> str:
+        return f"{location.latitude:.{self.precision}f},{location.longitude:.{self.precision}f}"
+
+    def key(self, route: Any, mode: str, optimize: bool = True) -> str:
+        waypoints = [self._point(waypoint) for waypoint in route.waypoints]
+        if optimize:
+            waypoints.sort()
+        else:
+            # Routes requested in a fixed stop order only match that exact order
+            mode = f"{mode}|fixed"
+        return f"{mode.lower()}|{self._point(route.origin)}|{self._point(route.destination)}|{';'.join(waypoints)}"
+
+    def ttl(self, mode: str) -> float:
+        return self.mode_ttls.get(mode.lower(), self.mode_ttls['driving'])
+
+    def get(self, route: Any, mode: str, optimize: bool = True) -> Optional[Tuple[Dict, float]]:
+        """Return (response, age in seconds) for a cached route, or None"""
+        entry = self.cache.get(self.key(route, mode, optimize))
+        if entry is None:
+            return None
+
+        response = entry['response']
+        current_points = [self._point(waypoint) for waypoint in route.waypoints]
+        if current_points != entry['waypoints']:
+            response = self._remap_waypoint_order(response, entry['waypoints'], current_points)
+        return response, time.time() - entry['cached_at']
+
+    def set(self, route: Any, mode: str, response: Dict, optimize: bool = True) -> None:
+        """Cache a successful Routes API response"""
+        if 'error' in response or not response.get('routes'):
+            return
+        entry = {
+            'response': response,
+            'waypoints': [self._point(waypoint) for waypoint in route.waypoints],
+            'cached_at': time.time(),
+        }
+        self.cache.set(self.key(route, mode, optimize), entry, self.ttl(mode))
+
+    def _remap_waypoint_order(self, response: Dict, cached_points: List[str], current_points: List[str]) -> Dict:
+        """Translate optimized waypoint indices from the cached request's order to the current one"""
+        positions: Dict[str, List[int]] = {}
+        for i, point in enumerate(current_points):
+            positions.setdefault(point, []).append(i)
+
+        routes = []
+        for route in response['routes']:
+            if 'optimizedIntermediateWaypointIndex' in route:
+                remaining = {point: list(indices) for point, indices in positions.items()}
+                order = [remaining[cached_points[i]].pop(0) for i in route['optimizedIntermediateWaypointIndex']]
+                route = {**route, 'optimizedIntermediateWaypointIndex': order}
+            routes.append(route)
+        return {**response, 'routes': routes}
+
+
+_default_cache: Optional[RouteCache] = None
+
+
+def get_default_route_cache() -> RouteCache:
+    """Process-wide route cache shared by every GoogleRoutesTool"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = RouteCache()
+    return _default_cache
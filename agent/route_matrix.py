@@ -0,0 +1,147 @@
+from .cache import MemoryCache
+from .http_client import HttpClient
+from .metrics import metrics
+from .route_cache import DEFAULT_MODE_TTLS
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import contextvars
+import numpy as np
+import os
+
+TRAVEL_MODES = {
+    'driving': 'DRIVE',
+    'walking': 'WALK',
+    'bicycling': 'BICYCLE',
+    'transit': 'TRANSIT',
+}
+
+# computeRouteMatrix accepts at most 625 elements per request (100 for transit) and
+# 50 origins plus destinations, so requests are split into square blocks
+MAX_BLOCK_SIDE = 25
+MAX_TRANSIT_BLOCK_SIDE = 10
+
+
+class RouteMatrixError(ValueError):
+    """Raised when the Routes API rejects a route matrix request"""
+
+
+class RouteMatrixClient:
+    """
+    Travel times and distances between sets of points from the Routes API
+    computeRouteMatrix method.
+
+    Every origin/destination pair is cached on its coordinates rounded to `precision`
+    decimal places for the travel mode's TTL, so growing or reordering an itinerary only
+    fetches the pairs it hasn't seen. Missing pairs are fetched in blocks that fit the
+    API's per-request limits, up to `max_workers` blocks at a time.
+    """
+
+    def __init__(self, http: HttpClient, api_key: str, base_url: str = "https://routes.googleapis.com",
+                 cache: Optional[MemoryCache] = None, precision: int = 4,
+                 mode_ttls: Optional[Dict[str, float]] = None, max_workers: int = 4):
+        self.http = http
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.cache = cache if cache is not None else MemoryCache(max_entries=int(os.getenv("ROUTE_MATRIX_CACHE_SIZE", "50000")))
+        self.precision = precision
+        self.mode_ttls = {**DEFAULT_MODE_TTLS, **(mode_ttls or {})}
+        self.requests_made = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="route-matrix")
+
+    def _point(self, location: Any) -> str:
+        return f"{location.latitude:.{self.precision}f},{location.longitude:.{self.precision}f}"
+
+    def _key(self, mode: str, origin: str, destination: str) -> str:
+        return f"matrix|{mode}|{origin}|{destination}"
+
+    @staticmethod
+    def _waypoint(location: Any) -> Dict:
+        return {"waypoint": {"location": {"latLng": {"latitude": location.latitude,
+                                                      "longitude": location.longitude}}}}
+
+    def _request_block(self, origins: Sequence[Any], destinations: Sequence[Any], mode: str) -> List[Dict]:
+        self.requests_made += 1
+        with metrics.stage("routes_api", method="computeRouteMatrix") as span:
+            response = self.http.post(
+                f"{self.base_url}/distanceMatrix/v2:computeRouteMatrix",
+                headers={
+                    'Content-Type': 'application/json',
+                    'X-Goog-Api-Key': self.api_key,
+                    'X-Goog-FieldMask': 'originIndex,destinationIndex,duration,distanceMeters,condition',
+                },
+                json={
+                    "origins": [self._waypoint(origin) for origin in origins],
+                    "destinations": [self._waypoint(destination) for destination in destinations],
+                    "travelMode": TRAVEL_MODES.get(mode, 'DRIVE'),
+                },
+            )
+            body = response.json()
+            if isinstance(body, dict):
+                span.update(status='error', error=body.get('error', {}).get('status', 'api_error'))
+        if isinstance(body, dict):
+            message = body.get('error', {}).get('message', 'Unknown error')
+            raise RouteMatrixError(f"Route matrix request failed: {message}")
+        return body
+
+    def _fetch(self, origins: List[Any], destinations: List[Any], mode: str,
+               origin_points: List[str], destination_points: List[str]) -> None:
+        elements = self._request_block(origins, destinations, mode)
+        ttl = self.mode_ttls.get(mode, self.mode_ttls['driving'])
+        for element in elements:
+            i, j = element.get('originIndex', 0), element.get('destinationIndex', 0)
+            if element.get('condition') == 'ROUTE_EXISTS' and 'duration' in element:
+                value = [float(element['duration'].rstrip('s')), float(element.get('distanceMeters', 0))]
+            else:
+                value = [float('inf'), float('inf')]
+            self.cache.set(self._key(mode, origin_points[i], destination_points[j]), value, ttl)
+
+    def matrix(self, origins: Sequence[Any], destinations: Sequence[Any],
+               mode: str = "driving") -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (durations in seconds, distances in meters) arrays of shape (origins, destinations).
+        Locations need `latitude` and `longitude`; unreachable pairs are inf.
+        """
+        mode = mode.lower()
+        origin_points = [self._point(o) for o in origins]
+        destination_points = [self._point(d) for d in destinations]
+        durations = np.zeros((len(origins), len(destinations)))
+        distances = np.zeros((len(origins), len(destinations)))
+
+        missing = np.zeros((len(origins), len(destinations)), dtype=bool)
+        for i, origin in enumerate(origin_points):
+            for j, destination in enumerate(destination_points):
+                if origin == destination:
+                    continue
+                cached = self.cache.get(self._key(mode, origin, destination))
+                if cached is None:
+                    missing[i, j] = True
+                else:
+                    durations[i, j], distances[i, j] = cached
+
+        side = MAX_TRANSIT_BLOCK_SIDE if mode == 'transit' else MAX_BLOCK_SIDE
+        blocks = []
+        for row in range(0, len(origins), side):
+            for col in range(0, len(destinations), side):
+                block = missing[row:row + side, col:col + side]
+                if not block.any():
+                    continue
+                # Only the origins and destinations with a missing pair in this block
+                rows = [row + i for i in np.flatnonzero(block.any(axis=1))]
+                cols = [col + j for j in np.flatnonzero(block.any(axis=0))]
+                blocks.append((rows, cols))
+
+        futures = [
+            self._executor.submit(contextvars.copy_context().run, self._fetch, [origins[i] for i in rows], [destinations[j] for j in cols], mode,
+                                  [origin_points[i] for i in rows], [destination_points[j] for j in cols])
+            for rows, cols in blocks
+        ]
+        for future in futures:
+            future.result()
+
+        for rows, cols in blocks:
+            for i in rows:
+                for j in cols:
+                    if missing[i, j]:
+                        value = self.cache.get(self._key(mode, origin_points[i], destination_points[j]))
+                        durations[i, j], distances[i, j] = value if value is not None else (float('inf'),) * 2
+        return durations, distances
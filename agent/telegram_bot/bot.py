@@ -2,13 +2,23 @@ import telebot
 from telebot import types
 import pytz
 from . import config
+from .dispatcher import ChatDispatcher, ConcurrentTeleBot
 import sys
 import os
 import googlemaps
-from datetime import datetime, timedelta
+import functools
+import threading
+import time
+from datetime import datetime
 
 # sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from agent.agent import ask_agent
+from agent.agent import ask_agent, stream_agent, warmup
+from .streaming import stream_reply
+from .session_store import create_session_store
+from .intents import DIRECTION_KEYWORDS, PLAN_MODIFICATION_KEYWORDS, intent_classifier
+from .live_location import LocationUpdater
+from agent.geocoding import get_default_geocode_cache
+from agent.metrics import metrics
 
 P_TIMEZONE = pytz.timezone(config.TIMEZONE)
 TIMEZONE_COMMON_NAME = config.TIMEZONE_COMMON_NAME
@@ -17,35 +27,42 @@ if not config.TOKEN:
     print("Error: TOKEN is not set in config.py")
     sys.exit(1)
 
-bot = telebot.TeleBot(config.TOKEN)
+if config.API_URL:
+    telebot.apihelper.API_URL = config.API_URL
+
+if config.DISPATCH_MODE == "concurrent":
+    dispatcher = ChatDispatcher(workers=config.WORKERS, max_queue=config.MAX_QUEUE)
+    bot = ConcurrentTeleBot(config.TOKEN, dispatcher=dispatcher)
+else:
+    dispatcher = None
+    bot = telebot.TeleBot(config.TOKEN)
 
 # Initialize Google Maps client for reverse geocoding
 try:
-    gmaps = googlemaps.Client(key=os.getenv("GPLACES_API_KEY"))
+    gmaps = googlemaps.Client(key=os.getenv("GPLACES_API_KEY"),
+                              base_url=os.getenv("GOOGLE_MAPS_BASE_URL", "https://maps.googleapis.com"))
 except:
     gmaps = None
     print("Warning: Google Maps client not initialized - location features may not work")
+geocode_cache = get_default_geocode_cache()
+
+# Per-user state (locations, pending queries, pinned messages), bounded and optionally shared via SQLite
+sessions = create_session_store(config.SESSION_BACKEND, config.SESSION_DB)
 
-# Store user data (in production, use a proper database)
-user_data = {}
+def traced(handler):
+    """Time a message handler as the "telegram_receive" stage, noting how late the update arrived"""
+    @functools.wraps(handler)
+    def wrapper(message):
+        with metrics.stage("telegram_receive", handler=handler.__name__) as span:
+            sent = getattr(message, 'edit_date', None) or message.date
+            span['delivery_delay_s'] = max(0, int(time.time()) - sent)
+            return handler(message)
+    return wrapper
 
-# Keywords that indicate user wants directions
-DIRECTION_KEYWORDS = [
-    'directions', 'route', 'how to get', 'navigate', 'drive to', 'walk to',
-    'go to', 'travel to', 'trip to', 'way to', 'path to', 'find route',
-    'take me to', 'get me to', 'show me the way', 'best route', 'closest'
-]
-PLAN_MODIFICATION_KEYWORDS = [
-    'update', 'update my', 'update my plan', 'update my travel plan', 'update travel plan',
-    'add to plan', 'remove from plan', 'delete from plan', 'change plan',
-    'modify plan', 'edit plan', 'add restaurant', 'add hotel', 'add activity',
-    'remove restaurant', 'remove hotel', 'cancel booking', 'replace with',
-    'insert', 'include', 'exclude', 'swap', 'substitute'
-]
 def needs_plan_modification(message_text):
     """Check if message is asking to modify the travel plan"""
-    message_lower = message_text.lower()
-    return any(keyword in message_lower for keyword in PLAN_MODIFICATION_KEYWORDS)
+    with metrics.stage("intent_check", intent="plan_modification"):
+        return 'plan_modification' in intent_classifier.intents(message_text)
 def extract_travel_plan_from_response(agent_response):
     """Extract and format travel plan from agent response with existing Google Maps links"""
     
@@ -59,34 +76,59 @@ def extract_travel_plan_from_response(agent_response):
 
 def needs_directions(message_text):
     """Check if message is asking for directions"""
-    message_lower = message_text.lower()
-    return any(keyword in message_lower for keyword in DIRECTION_KEYWORDS)
+    with metrics.stage("intent_check", intent="directions"):
+        return 'directions' in intent_classifier.intents(message_text)
 
 def has_valid_location(user_id):
     """Check if user has shared location recently (within 30 minutes)"""
-    if user_id not in user_data or 'current_location' not in user_data[user_id]:
-        return False
+    return sessions.has_valid_location(user_id)
+
+def lookup_address(lat, lng):
+    """Reverse geocode coordinates through the geocode cache shared with the routes tool"""
+    if not gmaps:
+        return None
     
-    location_data = user_data[user_id]['current_location']
-    if 'timestamp' in location_data:
-        time_diff = datetime.now() - location_data['timestamp']
-        return time_diff < timedelta(minutes=30)
+    def fetch(latitude, longitude):
+        with metrics.stage("geocode", kind="reverse") as span:
+            try:
+                result = gmaps.reverse_geocode((latitude, longitude)) # type: ignore
+                if result:
+                    return result[0]['formatted_address']
+                span['status'] = 'not_found'
+                return None
+            except Exception as e:
+                print(f"Reverse geocoding error: {e}")
+                span.update(status='error', error=type(e).__name__)
+                return None
     
-    return False
+    return geocode_cache.reverse_geocode(lat, lng, fetch)
 
 def get_address_from_coords(lat, lng):
     """Convert coordinates to readable address"""
-    if not gmaps:
-        return f"({lat:.4f}, {lng:.4f})"
+    return lookup_address(lat, lng) or f"({lat:.4f}, {lng:.4f})"
+
+location_updater = LocationUpdater(
+    lookup_address,
+    reuse_distance_m=config.ADDRESS_REUSE_DISTANCE_M,
+    min_interval=config.LIVE_LOCATION_MIN_INTERVAL,
+    min_distance_m=config.LIVE_LOCATION_MIN_DISTANCE_M,
+    refresh_interval=config.LIVE_LOCATION_REFRESH_INTERVAL,
+    geocode_interval=config.LIVE_LOCATION_GEOCODE_INTERVAL,
+)
+
+def reply_with_agent(message, query, context, reply=True):
+    """Answer a query with the agent, streaming partial output into the chat when enabled"""
+    thread_id = str(message.chat.id)
+    if config.STREAM_RESPONSES:
+        events = stream_agent(query, user_context=context, thread_id=thread_id)
+        stream_reply(bot, message, events, reply=reply, edit_interval=config.STREAM_EDIT_INTERVAL)
+        return
     
-    try:
-        result = gmaps.reverse_geocode((lat, lng)) # type: ignore
-        if result:
-            return result[0]['formatted_address']
-        return f"({lat:.4f}, {lng:.4f})"
-    except Exception as e:
-        print(f"Reverse geocoding error: {e}")
-        return f"({lat:.4f}, {lng:.4f})"
+    response = ask_agent(query, user_context=context, thread_id=thread_id)
+    if reply:
+        bot.reply_to(message, response)
+    else:
+        bot.send_message(message.chat.id, response)
 
 def request_location(message):
     """Request user's location with custom keyboard"""
@@ -107,9 +149,7 @@ def request_location(message):
     )
     
     # Store the original message to process after location is received
-    if message.from_user.id not in user_data:
-        user_data[message.from_user.id] = {}
-    user_data[message.from_user.id]['pending_direction_query'] = message.text
+    sessions.set_field(message.from_user.id, 'pending_direction_query', message.text)
 
 @bot.message_handler(commands=['start', 'hello'])
 def send_welcome(message):
@@ -119,41 +159,32 @@ def manual_location_request(message):
     """Manual location request command"""
     user_id = message.from_user.id
     
-    # Initialize user_data if needed
-    if user_id not in user_data:
-        user_data[user_id] = {}
-    
     # Store a placeholder query so the location handler knows this was a manual request
-    user_data[user_id]['pending_direction_query'] = "manual_location_request"
+    sessions.set_field(user_id, 'pending_direction_query', "manual_location_request")
     
     request_location(message)
 @bot.message_handler(content_types=['location'])
+@traced
 def handle_location(message):
    """Handle when user shares their location"""
    user_id = message.from_user.id
    
-   # Store the location data
-   if user_id not in user_data:
-       user_data[user_id] = {}
-   
-   location_data = {
-       'latitude': message.location.latitude,
-       'longitude': message.location.longitude,
-       'timestamp': datetime.now()
-   }
+   lat, lng = message.location.latitude, message.location.longitude
    
-   user_data[user_id]['current_location'] = location_data
-   
-   # Get readable address
-   address = get_address_from_coords(message.location.latitude, message.location.longitude)
+   # Store the location data with its address (reused if the user hasn't moved far),
+   # so the routes tool doesn't look it up again
+   previous_location = sessions.get(user_id).get('current_location')
+   location_data = location_updater.resolve(previous_location, lat, lng,
+                                            live=bool(getattr(message.location, 'live_period', None)))
+   sessions.set_field(user_id, 'current_location', location_data)
+   address = location_data.get('address') or f"({lat:.4f}, {lng:.4f})"
    
    # Remove keyboard
    markup = types.ReplyKeyboardRemove()
    
    # Check if this was a manual location request
-   if (user_id in user_data and 
-       'pending_direction_query' in user_data[user_id] and 
-       user_data[user_id]['pending_direction_query'] == "manual_location_request"):
+   pending_query = sessions.pop_field(user_id, 'pending_direction_query')
+   if pending_query == "manual_location_request":
        
        # Just confirm location was saved
        bot.send_message(
@@ -161,7 +192,6 @@ def handle_location(message):
            f"📍 Location saved: {address}\n\n✅ You can now ask for directions and I'll use this location!",
            reply_markup=markup
        )
-       del user_data[user_id]['pending_direction_query']
        return
    
    bot.send_message(
@@ -171,18 +201,23 @@ def handle_location(message):
    )
    
    # Process the pending query with location
-   if user_id in user_data and 'pending_direction_query' in user_data[user_id]:
-       original_query = user_data[user_id]['pending_direction_query']
-       del user_data[user_id]['pending_direction_query']
-       
+   if pending_query is not None:
        try:
            # Add location context to user data
-           context = user_data.get(user_id, {})
-           response = ask_agent(original_query, user_context=context)
-           
-           bot.send_message(message.chat.id, response)
+           context = sessions.get(user_id)
+           reply_with_agent(message, pending_query, context, reply=False)
        except Exception as e:
            bot.send_message(message.chat.id, f"Sorry, I encountered an error: {str(e)}")
+@bot.edited_message_handler(content_types=['location'])
+@traced
+def handle_live_location(message):
+    """Track live-location updates, debounced so they cost a bounded number of API calls"""
+    user_id = message.from_user.id
+    previous_location = sessions.get(user_id).get('current_location')
+    location_data = location_updater.live_update(previous_location, message.location.latitude,
+                                                 message.location.longitude)
+    if location_data:
+        sessions.set_field(user_id, 'current_location', location_data)
 @bot.message_handler(func=lambda message: message.text == "❌ Skip Location")
 def handle_skip_location(message):
     """Handle when user skips sharing location"""
@@ -200,17 +235,15 @@ def handle_skip_location(message):
     )
     
     # Process pending query without location
-    if user_id in user_data and 'pending_direction_query' in user_data[user_id]:
-        original_query = user_data[user_id]['pending_direction_query']
-        del user_data[user_id]['pending_direction_query']
-        
+    original_query = sessions.pop_field(user_id, 'pending_direction_query')
+    if original_query is not None:
         try:
-            response = ask_agent(original_query, user_context=user_data.get(user_id, {}))
-            bot.send_message(message.chat.id, response)
+            reply_with_agent(message, original_query, sessions.get(user_id), reply=False)
         except Exception as e:
             bot.send_message(message.chat.id, f"Sorry, I encountered an error: {str(e)}")
 
 @bot.message_handler(func=lambda message: True)
+@traced
 def handle_text(message):
     """Main message handler with location logic"""
     user_id = message.from_user.id
@@ -225,23 +258,44 @@ def handle_text(message):
     
     try:
         # Get user context (including location if available)
-        context = user_data.get(user_id, {})
-        response = ask_agent(user_message, user_context=context)
-    
-        bot.reply_to(message, response)
-        print("[user data]", user_data)
+        context = sessions.get(user_id)
+        reply_with_agent(message, user_message, context)
         
     except Exception as e:
         bot.reply_to(message, f"Sorry, I encountered an error: {str(e)}")
 
+def warm_agent():
+    """Build the agent while polling starts; a message arriving first waits for the build"""
+    try:
+        started = time.perf_counter()
+        warmup()
+        print(f"🧠 Agent ready in {time.perf_counter() - started:.1f}s")
+    except Exception as e:
+        print(f"❌ Error building agent: {e}")
+
+def purge_sessions():
+    """Remove idle sessions every SESSION_PURGE_INTERVAL s, so they don't pile up in a shared DB"""
+    while True:
+        time.sleep(config.SESSION_PURGE_INTERVAL)
+        try:
+            removed = sessions.purge_expired()
+            if removed:
+                print(f"🧹 Removed {removed} idle sessions")
+        except Exception as e:
+            print(f"Error purging sessions: {e}")
+
 def bot_startup():
     print("✅ Bot is successfully running and ready to receive messages!")
     print(f"Bot username: @{bot.get_me().username}")
     print("📍 Location features enabled!")
+    if dispatcher:
+        print(f"⚡ Concurrent dispatch: {dispatcher.workers} workers, queue limit {dispatcher.max_queue}")
     print("Press Ctrl+C to stop the bot")
 
 if __name__ == "__main__":
     print("🚀 Starting Telegram bot...")
+    threading.Thread(target=warm_agent, name="agent-warmup", daemon=True).start()
+    threading.Thread(target=purge_sessions, name="session-purge", daemon=True).start()
     try:
         bot_info = bot.get_me()
         print(f"Connected as: @{bot_info.username}")
@@ -256,9 +310,7 @@ def pin_message(chat_id: int, message_id: int) -> str:
     """Pin a message in a chat"""
     try:
         bot.pin_chat_message(chat_id, message_id)
-        if chat_id not in user_data:
-            user_data[chat_id] = {}
-        user_data[chat_id]['pinned_message_id'] = message_id
+        sessions.set_field(chat_id, 'pinned_message_id', message_id)
         return "✅ Your travel plan has been pinned!"
     except Exception as e:
         return f"Error pinning message: {str(e)}"
@@ -267,9 +319,7 @@ def unpin_message(message):
     """Unpin a message from the chat"""
     try:
         bot.unpin_chat_message(message.chat.id, message.message_id)
-        if message.chat.id not in user_data:
-            user_data[message.chat.id] = {}
-        user_data[message.chat.id]['pinned_message_id'] = None
+        sessions.set_field(message.chat.id, 'pinned_message_id', None)
         return "✅ Your travel plan has been unpinned!"
     except Exception as e:
         return f"Error unpinning message: {str(e)}"
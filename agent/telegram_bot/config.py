@@ -4,5 +4,32 @@ load_dotenv()
 API_KEY = os.getenv('TELEGRAM_BOT_API')
 
 TOKEN = API_KEY
+# Bot API endpoint template, e.g. "http://localhost:8081/bot{0}/{1}" for a local Bot API server; unset uses Telegram's
+API_URL = os.getenv('TELEGRAM_API_URL')
 TIMEZONE = "Australia/Perth"
-TIMEZONE_COMMON_NAME = 'Perth'
\ No newline at end of file
+TIMEZONE_COMMON_NAME = 'Perth'
+
+# "concurrent" handles chats in parallel (in order within a chat), "sequential" uses plain polling
+DISPATCH_MODE = os.getenv('BOT_DISPATCH_MODE', 'concurrent')
+WORKERS = int(os.getenv('BOT_WORKERS', '8'))
+MAX_QUEUE = int(os.getenv('BOT_MAX_QUEUE', '100'))
+
+# Stream partial answers by editing the reply; Telegram rate-limits edits, so keep the interval >= 1s
+STREAM_RESPONSES = os.getenv('BOT_STREAM_RESPONSES', '1') == '1'
+STREAM_EDIT_INTERVAL = float(os.getenv('BOT_STREAM_EDIT_INTERVAL', '1.0'))
+
+# "memory" keeps sessions in-process; "sqlite" persists them and shares them between bot processes
+SESSION_BACKEND = os.getenv('BOT_SESSION_BACKEND', 'memory')
+SESSION_DB = os.getenv('BOT_SESSION_DB', 'sessions.sqlite3')
+# Idle sessions are removed from the store every this many seconds
+SESSION_PURGE_INTERVAL = float(os.getenv('BOT_SESSION_PURGE_INTERVAL', '3600'))
+
+# A new location within this many meters of the last one reuses its address instead of reverse geocoding
+ADDRESS_REUSE_DISTANCE_M = float(os.getenv('BOT_ADDRESS_REUSE_DISTANCE_M', '50'))
+
+# Live locations: store at most every MIN_INTERVAL s once moved MIN_DISTANCE_M, refresh every REFRESH_INTERVAL s,
+# and reverse geocode at most once per GEOCODE_INTERVAL s per user
+LIVE_LOCATION_MIN_INTERVAL = float(os.getenv('BOT_LIVE_LOCATION_MIN_INTERVAL', '10'))
+LIVE_LOCATION_MIN_DISTANCE_M = float(os.getenv('BOT_LIVE_LOCATION_MIN_DISTANCE_M', '25'))
+LIVE_LOCATION_REFRESH_INTERVAL = float(os.getenv('BOT_LIVE_LOCATION_REFRESH_INTERVAL', '60'))
+LIVE_LOCATION_GEOCODE_INTERVAL = float(os.getenv('BOT_LIVE_LOCATION_GEOCODE_INTERVAL', '60'))
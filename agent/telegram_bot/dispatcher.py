@@ -0,0 +1,146 @@
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional
+import queue
+import threading
+import time
+import telebot
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class ChatDispatcher:
+    """
+    Runs tasks on a fixed pool of worker threads, in order within each key (chat)
+    and in parallel across keys.
+
+    At most `max_queue` tasks may be waiting at once; `submit` blocks (or raises
+    queue.Full once `timeout` expires) until there is room, which pushes back on
+    the polling loop instead of buffering without limit.
+    """
+
+    def __init__(self, workers: int = 8, max_queue: int = 100, wait_samples: int = 1000):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._pending: Dict[Hashable, Deque[tuple]] = {}
+        self._ready: "queue.Queue[Optional[Hashable]]" = queue.Queue()
+        self._slots = threading.BoundedSemaphore(max_queue)
+        self._lock = threading.Lock()
+        self._depth = 0
+        self._max_depth = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._wait_times: Deque[float] = deque(maxlen=wait_samples)
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"chat-worker-{i}", daemon=True) for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, key: Hashable, fn: Callable, *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> None:
+        """Queue `fn(*args, **kwargs)` to run after every earlier task with the same key"""
+        if not self._slots.acquire(timeout=timeout):
+            raise queue.Full(f"Dispatcher queue is full ({self.max_queue} waiting)")
+
+        with self._lock:
+            self._submitted += 1
+            self._depth += 1
+            self._max_depth = max(self._max_depth, self._depth)
+            tasks = self._pending.get(key)
+            if tasks is None:
+                # Nothing queued or running for this key: schedule it
+                self._pending[key] = deque([(fn, args, kwargs, time.monotonic())])
+                self._ready.put(key)
+            else:
+                tasks.append((fn, args, kwargs, time.monotonic()))
+
+    def _worker(self) -> None:
+        while True:
+            key = self._ready.get()
+            if key is None:
+                return
+
+            with self._lock:
+                fn, args, kwargs, queued_at = self._pending[key][0]
+                self._depth -= 1
+                self._wait_times.append(time.monotonic() - queued_at)
+            self._slots.release()
+
+            try:
+                fn(*args, **kwargs)
+                failed = False
+            except Exception as e:
+                print(f"Error handling update for chat {key}: {e}")
+                failed = True
+
+            with self._lock:
+                self._completed += 1
+                self._failed += failed
+                tasks = self._pending[key]
+                tasks.popleft()
+                if tasks:
+                    self._ready.put(key)
+                else:
+                    del self._pending[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, throughput counters and wait-time percentiles (ms)"""
+        with self._lock:
+            waits = [w * 1000 for w in self._wait_times]
+            return {
+                'workers': self.workers,
+                'queue_depth': self._depth,
+                'max_queue_depth': self._max_depth,
+                'active_chats': len(self._pending),
+                'submitted': self._submitted,
+                'completed': self._completed,
+                'failed': self._failed,
+                'wait_ms_p50': round(_percentile(waits, 50), 2),
+                'wait_ms_p95': round(_percentile(waits, 95), 2),
+                'wait_ms_max': round(max(waits), 2) if waits else 0.0,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        for _ in self._threads:
+            self._ready.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+
+def update_chat_id(update: telebot.types.Update) -> Hashable:
+    """Chat an update belongs to, used to keep each chat's updates in order"""
+    for field in ('message', 'edited_message', 'channel_post', 'edited_channel_post'):
+        message = getattr(update, field, None)
+        if message is not None:
+            return message.chat.id
+    callback_query = getattr(update, 'callback_query', None)
+    if callback_query is not None and callback_query.message is not None:
+        return callback_query.message.chat.id
+    # No chat to order against; run it on its own
+    return ('update', update.update_id)
+
+
+class ConcurrentTeleBot(telebot.TeleBot):
+    """
+    TeleBot that hands each update to a ChatDispatcher instead of running handlers
+    on the polling thread, so one slow chat doesn't hold up the others.
+    """
+
+    def __init__(self, token: str, dispatcher: ChatDispatcher, **kwargs: Any):
+        # Handlers run on the dispatcher's workers, not telebot's own unordered pool
+        kwargs['threaded'] = False
+        super().__init__(token, **kwargs)
+        self.dispatcher = dispatcher
+
+    def process_new_updates(self, updates: List[telebot.types.Update]) -> None:
+        for update in updates:
+            # Advance the offset now, otherwise the next poll fetches updates still being handled
+            if update.update_id > self.last_update_id:
+                self.last_update_id = update.update_id
+            self.dispatcher.submit(update_chat_id(update), super().process_new_updates, [update])
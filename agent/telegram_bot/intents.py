@@ -0,0 +1,118 @@
+from typing import Dict, Iterable, List, NamedTuple, Set
+import re
+
+# Keywords that indicate user wants directions
+DIRECTION_KEYWORDS = [
+    'directions', 'route', 'how to get', 'navigate', 'drive to', 'walk to',
+    'go to', 'travel to', 'trip to', 'way to', 'path to', 'find route',
+    'take me to', 'get me to', 'show me the way', 'best route', 'closest'
+]
+PLAN_MODIFICATION_KEYWORDS = [
+    'update', 'update my', 'update my plan', 'update my travel plan', 'update travel plan',
+    'add to plan', 'remove from plan', 'delete from plan', 'change plan',
+    'modify plan', 'edit plan', 'add restaurant', 'add hotel', 'add activity',
+    'remove restaurant', 'remove hotel', 'cancel booking', 'replace with',
+    'insert', 'include', 'exclude', 'swap', 'substitute'
+]
+
+
+class IntentMatch(NamedTuple):
+    intent: str
+    keyword: str
+    start: int
+    end: int
+
+
+def _normalize_keyword(keyword: str) -> str:
+    return " ".join(keyword.lower().split())
+
+
+def _inflections(keyword: str) -> List[str]:
+    """
+    The keyword plus plural and -ing forms of its last word ("routes", "updates",
+    "including"), which the old substring scan matched. Short last words ("to", "my")
+    aren't inflected, and -ed isn't added: "is breakfast included?" isn't a request.
+    """
+    last = keyword.rsplit(" ", 1)[-1]
+    if len(last) < 4 or not last.isalpha():
+        return [keyword]
+    stem = keyword[:-1] if keyword.endswith("e") else keyword
+    plural = keyword + ("es" if keyword.endswith(("s", "x", "ch", "sh")) else "s")
+    return [keyword, plural, stem + "ing"]
+
+
+def _trie_pattern(keywords: Iterable[str]) -> str:
+    """
+    Regex alternation for a set of keywords, factored into a trie so matching at
+    each position costs the depth of the trie rather than the number of keywords.
+    Longer keywords are preferred over their prefixes.
+    """
+    trie: Dict = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node: Dict) -> str:
+        end = '' in node
+        branches = []
+        for char in sorted(c for c in node if c):
+            # Whitespace inside a phrase matches any run of whitespace in the message
+            atom = r"\s+" if char == " " else re.escape(char)
+            branches.append(atom + build(node[char]))
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if end else body
+
+    return build(trie)
+
+
+class IntentClassifier:
+    """
+    Matches every intent's keywords in one pass over a message.
+
+    All keywords, with plural and -ing forms, are compiled into a single trie-shaped
+    regex with word boundaries, so "routes" and "including" fire but "closest" doesn't
+    fire inside "disclosest" and "include" doesn't fire inside "included". Matches
+    don't overlap; at each position the longest keyword wins.
+    """
+
+    def __init__(self, keywords_by_intent: Dict[str, Iterable[str]]):
+        self._intents_by_keyword: Dict[str, List[str]] = {}
+        # Every form matched, mapped back to the keyword it came from
+        self._keyword_by_form: Dict[str, str] = {}
+        for intent, keywords in keywords_by_intent.items():
+            for keyword in keywords:
+                keyword = _normalize_keyword(keyword)
+                intents = self._intents_by_keyword.setdefault(keyword, [])
+                if intent not in intents:
+                    intents.append(intent)
+                for form in _inflections(keyword):
+                    # A keyword listed in its own right keeps its own intents
+                    if form == keyword or form not in self._keyword_by_form:
+                        self._keyword_by_form[form] = keyword
+
+        pattern = _trie_pattern(self._keyword_by_form)
+        self._regex = re.compile(rf"(?<!\w)(?:{pattern})(?!\w)", re.IGNORECASE)
+
+    def find(self, text: str) -> List[IntentMatch]:
+        """Every keyword match in the text, with its intent and position"""
+        matches = []
+        for match in self._regex.finditer(text):
+            keyword = self._keyword_by_form.get(_normalize_keyword(match.group(0)), "")
+            for intent in self._intents_by_keyword.get(keyword, []):
+                matches.append(IntentMatch(intent, keyword, match.start(), match.end()))
+        return matches
+
+    def intents(self, text: str) -> Set[str]:
+        """Names of all intents found in the text"""
+        return {match.intent for match in self.find(text)}
+
+
+# Built once at import time
+intent_classifier = IntentClassifier({
+    'directions': DIRECTION_KEYWORDS,
+    'plan_modification': PLAN_MODIFICATION_KEYWORDS,
+})
@@ -0,0 +1,74 @@
+from agent.geocoding import haversine_m, reusable_address
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+
+class LocationUpdater:
+    """
+    Builds the `current_location` stored for a user from a shared position.
+
+    One-off shares always update the stored position. Live-location updates (a stream
+    of edited messages) are debounced: a new position is stored at most every
+    `min_interval` seconds and only once the user has moved `min_distance_m`, but at
+    least every `refresh_interval` seconds so the 30-minute freshness window stays
+    current. The address is reverse geocoded only when the user is more than
+    `reuse_distance_m` from where it was last resolved, and for live updates at most
+    once per `geocode_interval` seconds, so each user costs a bounded number of API
+    calls per minute however often the client sends updates.
+    """
+
+    def __init__(self, lookup_address: Callable[[float, float], Optional[str]], reuse_distance_m: float = 50,
+                 min_interval: float = 10, min_distance_m: float = 25, refresh_interval: float = 60,
+                 geocode_interval: float = 60):
+        self.lookup_address = lookup_address
+        self.reuse_distance_m = reuse_distance_m
+        self.min_interval = min_interval
+        self.min_distance_m = min_distance_m
+        self.refresh_interval = refresh_interval
+        self.geocode_interval = geocode_interval
+
+    def resolve(self, previous: Optional[Dict[str, Any]], lat: float, lng: float, live: bool = False,
+                now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Location data for a new position, reusing the previous address when possible"""
+        now = now or datetime.now()
+        location_data: Dict[str, Any] = {'latitude': lat, 'longitude': lng, 'timestamp': now}
+        if live:
+            location_data['live'] = True
+
+        address = reusable_address(previous, lat, lng, self.reuse_distance_m)
+        if address is None and live and previous and previous.get('address') and previous.get('address_resolved_at'):
+            # Moved, but the address was looked up recently; keep it until the interval passes
+            if (now - previous['address_resolved_at']).total_seconds() < self.geocode_interval:
+                address = previous['address']
+
+        if address is not None:
+            location_data.update({
+                'address': address,
+                'address_latitude': previous.get('address_latitude', previous['latitude']),
+                'address_longitude': previous.get('address_longitude', previous['longitude']),
+                'address_resolved_at': previous.get('address_resolved_at', previous['timestamp']),
+            })
+            return location_data
+
+        address = self.lookup_address(lat, lng)
+        if address:
+            location_data.update({
+                'address': address,
+                'address_latitude': lat,
+                'address_longitude': lng,
+                'address_resolved_at': now,
+            })
+        return location_data
+
+    def live_update(self, previous: Optional[Dict[str, Any]], lat: float, lng: float,
+                    now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """Location data to store for a live-location update, or None to drop it"""
+        now = now or datetime.now()
+        if previous and 'timestamp' in previous:
+            elapsed = (now - previous['timestamp']).total_seconds()
+            moved = haversine_m(previous['latitude'], previous['longitude'], lat, lng)
+            if elapsed < self.min_interval:
+                return None
+            if moved < self.min_distance_m and elapsed < self.refresh_interval:
+                return None
+        return self.resolve(previous, lat, lng, live=True, now=now)
@@ -0,0 +1,199 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Shared locations are only used for directions while they are this fresh
+LOCATION_MAX_AGE = timedelta(minutes=30)
+
+
+class SessionStore(ABC):
+    """
+    Per-user bot state: current_location, pending_direction_query, pinned_message_id.
+
+    Sessions are plain dicts. `get` returns a copy, so changes must be written back
+    with `set_field` / `pop_field`. Locations older than LOCATION_MAX_AGE are dropped.
+    """
+
+    @abstractmethod
+    def get(self, user_id: int) -> Dict[str, Any]:
+        ...
+
+    @abstractmethod
+    def set_field(self, user_id: int, key: str, value: Any) -> None:
+        ...
+
+    @abstractmethod
+    def pop_field(self, user_id: int, key: str, default: Any = None) -> Any:
+        ...
+
+    @abstractmethod
+    def purge_expired(self) -> int:
+        """Remove stale locations and idle sessions, returning how many sessions were removed"""
+
+    def has_valid_location(self, user_id: int) -> bool:
+        """Check if user has shared location recently (within 30 minutes)"""
+        location = self.get(user_id).get('current_location')
+        if not location or 'timestamp' not in location:
+            return False
+        return datetime.now() - location['timestamp'] < LOCATION_MAX_AGE
+
+    @staticmethod
+    def _drop_stale_location(session: Dict[str, Any]) -> Dict[str, Any]:
+        location = session.get('current_location')
+        if location and 'timestamp' in location and datetime.now() - location['timestamp'] >= LOCATION_MAX_AGE:
+            session = {k: v for k, v in session.items() if k != 'current_location'}
+        return session
+
+
+class MemorySessionStore(SessionStore):
+    """In-process sessions, bounded by an idle TTL and a maximum number of users (LRU)"""
+
+    def __init__(self, max_sessions: int = 10000, idle_ttl: float = 7 * 86400):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self._sessions: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load(self, user_id: int) -> Dict[str, Any]:
+        entry = self._sessions.get(user_id)
+        if entry is None:
+            return {}
+        session, last_seen = entry
+        if time.time() - last_seen > self.idle_ttl:
+            del self._sessions[user_id]
+            return {}
+        return self._drop_stale_location(session)
+
+    def _save(self, user_id: int, session: Dict[str, Any]) -> None:
+        self._sessions[user_id] = (session, time.time())
+        self._sessions.move_to_end(user_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    def get(self, user_id: int) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._load(user_id))
+
+    def set_field(self, user_id: int, key: str, value: Any) -> None:
+        with self._lock:
+            session = dict(self._load(user_id))
+            session[key] = value
+            self._save(user_id, session)
+
+    def pop_field(self, user_id: int, key: str, default: Any = None) -> Any:
+        with self._lock:
+            session = dict(self._load(user_id))
+            value = session.pop(key, default)
+            self._save(user_id, session)
+            return value
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            removed = 0
+            for user_id in list(self._sessions):
+                session = self._load(user_id)
+                if user_id not in self._sessions:
+                    removed += 1
+                else:
+                    self._sessions[user_id] = (session, self._sessions[user_id][1])
+            return removed
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    raise TypeError(f"Can't store {type(value).__name__} in a session")
+
+
+def _decode(obj: Dict[str, Any]) -> Any:
+    if '__datetime__' in obj:
+        return datetime.fromisoformat(obj['__datetime__'])
+    return obj
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Sessions in a SQLite file, so several bot worker processes share state and it
+    survives restarts. Each update is a read-modify-write inside one write transaction.
+    """
+
+    def __init__(self, path: str, idle_ttl: float = 7 * 86400):
+        self.path = path
+        self.idle_ttl = idle_ttl
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10, isolation_level=None)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "user_id INTEGER PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def _load(self, user_id: int) -> Dict[str, Any]:
+        row = self._conn.execute(
+            "SELECT data, updated_at FROM sessions WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        if row is None or time.time() - row[1] > self.idle_ttl:
+            return {}
+        return self._drop_stale_location(json.loads(row[0], object_hook=_decode))
+
+    def _save(self, user_id: int, session: Dict[str, Any]) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO sessions (user_id, data, updated_at) VALUES (?, ?, ?)",
+            (user_id, json.dumps(session, default=_encode), time.time()),
+        )
+
+    def _update(self, user_id: int, change) -> Any:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                session = self._load(user_id)
+                result = change(session)
+                self._save(user_id, session)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            return result
+
+    def get(self, user_id: int) -> Dict[str, Any]:
+        with self._lock:
+            return self._load(user_id)
+
+    def set_field(self, user_id: int, key: str, value: Any) -> None:
+        self._update(user_id, lambda session: session.__setitem__(key, value))
+
+    def pop_field(self, user_id: int, key: str, default: Any = None) -> Any:
+        return self._update(user_id, lambda session: session.pop(key, default))
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM sessions WHERE updated_at < ?", (time.time() - self.idle_ttl,)
+            )
+            return cursor.rowcount
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def create_session_store(backend: str = "memory", path: Optional[str] = None, **kwargs: Any) -> SessionStore:
+    """Build the session store named by `backend` ("memory" or "sqlite")"""
+    if backend == "sqlite":
+        return SQLiteSessionStore(path or "sessions.sqlite3", **kwargs)
+    if backend == "memory":
+        return MemorySessionStore(**kwargs)
+    raise ValueError(f"Unknown session backend: {backend}")
@@ -0,0 +1,143 @@
+from typing import Iterable, Optional
+import time
+
+TELEGRAM_MESSAGE_LIMIT = 4096
+# Longest Retry-After we wait out before giving up on editing the final answer
+MAX_RETRY_AFTER = 30
+
+TOOL_STATUS = {
+    'google_routes': "🗺️ Working out the route...",
+    'google_places': "📍 Looking up places...",
+    'tavily_search': "🔎 Searching the web...",
+}
+
+
+class StreamingReply:
+    """
+    Shows an agent answer as it is generated: sends a placeholder straight away,
+    then edits it with partial output at most once per `edit_interval` seconds
+    (Telegram rate-limits edits), keeping a typing indicator up while tools run.
+    """
+
+    def __init__(self, bot, chat_id: int, reply_to_message_id: Optional[int] = None,
+                 edit_interval: float = 1.0, typing_interval: float = 4.0):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.reply_to_message_id = reply_to_message_id
+        self.edit_interval = edit_interval
+        self.typing_interval = typing_interval
+        self.message_id: Optional[int] = None
+        self.buffer = ""
+        self.shown_text = ""
+        self.status = ""
+        self.last_edit = 0.0
+        self.last_typing = 0.0
+
+    def start(self) -> None:
+        self._typing(force=True)
+        placeholder = self.bot.send_message(self.chat_id, "💭 Thinking...",
+                                            reply_to_message_id=self.reply_to_message_id)
+        self.message_id = placeholder.message_id
+        self.shown_text = "💭 Thinking..."
+        self.last_edit = time.monotonic()
+
+    def _typing(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if force or now - self.last_typing >= self.typing_interval:
+            try:
+                self.bot.send_chat_action(self.chat_id, 'typing')
+            except Exception as e:
+                print(f"Error sending typing action: {e}")
+            self.last_typing = now
+
+    def _edit(self, text: str, force: bool = False) -> Optional[Exception]:
+        """Edit the message to `text`, returning the error if Telegram rejected it"""
+        text = text[:TELEGRAM_MESSAGE_LIMIT]
+        if not text or text == self.shown_text:
+            return None
+        now = time.monotonic()
+        if not force and now - self.last_edit < self.edit_interval:
+            return None
+        error = None
+        try:
+            self.bot.edit_message_text(text, self.chat_id, self.message_id)
+            self.shown_text = text
+        except Exception as e:
+            if "message is not modified" in str(e):
+                self.shown_text = text
+            else:
+                print(f"Error editing streamed message: {e}")
+                error = e
+        self.last_edit = now
+        return error
+
+    def _show_final(self, text: str) -> None:
+        """
+        Put the final text in the message. Unlike the throttled token edits this must
+        land: after a 429 it retries once Retry-After has passed, and if the edit still
+        fails the text is sent as a new message so the user isn't left with a partial one.
+        """
+        error = self._edit(text, force=True)
+        if error is None:
+            return
+        retry_after = _retry_after(error)
+        if retry_after is not None and retry_after <= MAX_RETRY_AFTER:
+            time.sleep(retry_after)
+            if self._edit(text, force=True) is None:
+                return
+        try:
+            self.bot.send_message(self.chat_id, text[:TELEGRAM_MESSAGE_LIMIT],
+                                  reply_to_message_id=self.reply_to_message_id)
+            self.shown_text = text[:TELEGRAM_MESSAGE_LIMIT]
+        except Exception as e:
+            print(f"Error sending final message: {e}")
+
+    def handle(self, event: dict) -> None:
+        if event["type"] == "token":
+            self.buffer += event["text"]
+            self.status = ""
+            self._edit(self.buffer + " ▌")
+        elif event["type"] == "tool_start":
+            # Text before a tool call is the model thinking aloud; the answer comes after
+            self.buffer = ""
+            self.status = TOOL_STATUS.get(event["name"], f"🔧 Running {event['name']}...")
+            self._edit(self.status, force=True)
+            self._typing(force=True)
+        elif event["type"] == "tool_end":
+            self._typing()
+
+    def finish(self, text: str) -> None:
+        chunks = [text[i:i + TELEGRAM_MESSAGE_LIMIT] for i in range(0, len(text), TELEGRAM_MESSAGE_LIMIT)] or [text]
+        self._show_final(chunks[0])
+        for chunk in chunks[1:]:
+            self.bot.send_message(self.chat_id, chunk)
+
+    def fail(self, error: Exception) -> None:
+        self._show_final(f"Sorry, I encountered an error: {str(error)}")
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Seconds Telegram asked us to wait, if `error` is a 429 (telebot's ApiTelegramException)"""
+    if getattr(error, 'error_code', None) != 429:
+        return None
+    parameters = (getattr(error, 'result_json', None) or {}).get('parameters') or {}
+    return float(parameters.get('retry_after', 1))
+
+
+def stream_reply(bot, message, events: Iterable[dict], reply: bool = True, edit_interval: float = 1.0) -> str:
+    """Stream agent events into a Telegram message, returning the final text"""
+    streaming = StreamingReply(bot, message.chat.id,
+                               reply_to_message_id=message.message_id if reply else None,
+                               edit_interval=edit_interval)
+    streaming.start()
+    try:
+        for event in events:
+            if event["type"] == "final":
+                streaming.finish(event["text"])
+                return event["text"]
+            streaming.handle(event)
+    except Exception as e:
+        print(f"Error during agent execution: {e}")
+        streaming.fail(e)
+        return ""
+    return ""
@@ -0,0 +1,207 @@
+"""
+Result cache for LangChain tools whose answers don't depend on who is asking
+(web search, place lookups), keyed on normalized tool input so near-identical
+queries from different users share one upstream call.
+"""
+from .cache import CacheStats, MemoryCache, SQLiteCache, TieredCache
+from .tool_runtime import parse_seconds
+from concurrent.futures import Future
+from langchain_core.callbacks import AsyncCallbackManagerForToolRun, CallbackManagerForToolRun
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import patch_config
+from langchain_core.tools import BaseTool
+from pydantic import ConfigDict, Field, PrivateAttr
+from typing import Any, Dict, Optional
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+
+# Filler words that don't change what a search or place lookup returns
+STOPWORDS = frozenset({
+    'a', 'an', 'the', 'in', 'on', 'at', 'of', 'for', 'to', 'near', 'nearby', 'around', 'me', 'my',
+    'please', 'some', 'any', 'is', 'are', 'what', 'whats', 'where', 'find', 'show', 'list', 'which',
+    'can', 'you', 'i',
+})
+
+# Seconds a result stays fresh, by tool name; TOOL_CACHE_TTLS overrides ("tavily_search=600,...")
+DEFAULT_TOOL_TTLS = {
+    'tavily_search': 3600,
+    'google_places': 86400,
+}
+DEFAULT_TOOL_TTL = 3600
+
+_TOKEN = re.compile(r"-?\d+\.\d+|\w+")
+
+
+def normalize_query(text: str, precision: int = 3) -> str:
+    """
+    Normalize free text for a cache key: lowercase, punctuation and extra whitespace
+    removed, stopwords dropped and decimal numbers (coordinates) rounded to `precision`
+    places, so "Best coffee in Perth CBD?" and "best coffee perth cbd" match.
+    """
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        if '.' in token:
+            token = f"{float(token):.{precision}f}"
+        tokens.append(token)
+    meaningful = [token for token in tokens if token not in STOPWORDS]
+    return " ".join(meaningful or tokens)
+
+
+def normalize_args(value: Any, precision: int = 3) -> Any:
+    """Normalize tool arguments (strings, numbers, lists, dicts) for a cache key"""
+    if isinstance(value, str):
+        return normalize_query(value, precision)
+    if isinstance(value, float):
+        return round(value, precision)
+    if isinstance(value, (list, tuple)):
+        return [normalize_args(item, precision) for item in value]
+    if isinstance(value, dict):
+        return {key: normalize_args(value[key], precision) for key in sorted(value)}
+    return value
+
+
+def create_tool_cache() -> TieredCache:
+    """
+    Shared cache for tool results: memory only, or backed by the SQLite file at
+    TOOL_CACHE_DB when that is set. TOOL_CACHE_SIZE bounds the in-memory tier.
+    """
+    memory = MemoryCache(max_entries=int(os.getenv("TOOL_CACHE_SIZE", "5000")), default_ttl=DEFAULT_TOOL_TTL)
+    path = os.getenv("TOOL_CACHE_DB", "")
+    disk = None
+    if path:
+        try:
+            disk = SQLiteCache(path, namespace="tools", default_ttl=DEFAULT_TOOL_TTL)
+        except Exception as e:
+            print(f"Tool disk cache unavailable ({path}): {e}")
+    return TieredCache(memory, disk)
+
+
+def tool_ttls_from_env() -> Dict[str, float]:
+    return {**DEFAULT_TOOL_TTLS, **parse_seconds(os.getenv("TOOL_CACHE_TTLS", ""))}
+
+
+class CachedTool(BaseTool):
+    """
+    Wraps a tool and caches its results under its normalized input.
+
+    Takes the wrapped tool's name, description and argument schema, so the model sees
+    the same tool. Only results that look successful are cached: strings not starting
+    with "❌" and dicts without an "error" key. Raised errors pass through uncached.
+    With `coalesce`, concurrent calls with the same key wait for the first one instead
+    of each calling the upstream API.
+    """
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    tool: BaseTool
+    cache: Any = Field(default_factory=create_tool_cache)
+    ttl: float = DEFAULT_TOOL_TTL
+    precision: int = 3
+    coalesce: bool = True
+
+    _stats: CacheStats = PrivateAttr(default_factory=CacheStats)
+    _coalesced: int = PrivateAttr(default=0)
+    _inflight: Dict[str, Future] = PrivateAttr(default_factory=dict)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    def __init__(self, tool: BaseTool, **kwargs: Any):
+        kwargs.setdefault('name', tool.name)
+        kwargs.setdefault('description', tool.description)
+        kwargs.setdefault('args_schema', tool.args_schema)
+        kwargs.setdefault('return_direct', tool.return_direct)
+        kwargs.setdefault('handle_tool_error', tool.handle_tool_error)
+        kwargs.setdefault('handle_validation_error', tool.handle_validation_error)
+        super().__init__(tool=tool, **kwargs)
+
+    def cache_key(self, tool_input: Dict[str, Any]) -> str:
+        normalized = json.dumps(normalize_args(tool_input, self.precision), sort_keys=True, ensure_ascii=False)
+        return f"tool:{self.name}:{hashlib.sha1(normalized.encode()).hexdigest()}"
+
+    @staticmethod
+    def _cacheable(result: Any) -> bool:
+        if isinstance(result, str):
+            return bool(result) and not result.startswith("❌")
+        if isinstance(result, dict):
+            return 'error' not in result
+        return isinstance(result, list)
+
+    def _lookup(self, key: str):
+        """
+        Return (cached result, None) on a hit, (None, future) if an identical call is
+        already in flight, or (None, None) if this call should go upstream
+        """
+        cached = self.cache.get(key)
+        if cached is not None:
+            self._stats.record(True)
+            return cached, None
+        self._stats.record(False)
+        if not self.coalesce:
+            return None, None
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self._coalesced += 1
+                return None, future
+            self._inflight[key] = Future()
+            return None, None
+
+    def _finish(self, key: str, result: Any = None, error: Optional[BaseException] = None) -> None:
+        if error is None and self._cacheable(result):
+            self.cache.set(key, result, ttl=self.ttl)
+        if not self.coalesce:
+            return
+        with self._lock:
+            future = self._inflight.pop(key, None)
+        if future is not None:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    @staticmethod
+    def _child_config(config: Optional[RunnableConfig], run_manager) -> Optional[RunnableConfig]:
+        # Nest the wrapped tool's run under this one in callbacks and traces
+        if run_manager is None:
+            return config
+        return patch_config(config, callbacks=run_manager.get_child())
+
+    def _run(self, config: RunnableConfig = None, run_manager: Optional[CallbackManagerForToolRun] = None,
+             **kwargs: Any) -> Any:
+        key = self.cache_key(kwargs)
+        cached, waiting_on = self._lookup(key)
+        if cached is not None:
+            return cached
+        if waiting_on is not None:
+            return waiting_on.result()
+
+        try:
+            result = self.tool.invoke(kwargs, config=self._child_config(config, run_manager))
+        except BaseException as e:
+            self._finish(key, error=e)
+            raise
+        self._finish(key, result)
+        return result
+
+    async def _arun(self, config: RunnableConfig = None,
+                    run_manager: Optional[AsyncCallbackManagerForToolRun] = None, **kwargs: Any) -> Any:
+        key = self.cache_key(kwargs)
+        cached, waiting_on = self._lookup(key)
+        if cached is not None:
+            return cached
+        if waiting_on is not None:
+            return await asyncio.wrap_future(waiting_on)
+
+        try:
+            result = await self.tool.ainvoke(kwargs, config=self._child_config(config, run_manager))
+        except BaseException as e:
+            self._finish(key, error=e)
+            raise
+        self._finish(key, result)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counts and hit rate for this tool, plus calls served by an in-flight request"""
+        return {**self._stats.as_dict(), 'coalesced': self._coalesced}
@@ -0,0 +1,203 @@
+"""
+Execution policy for the agent's tool node: how many of one step's tool calls run
+at once, how long each tool may take, and how long each call actually took.
+
+The ToolNode already fans a step's tool calls out (a thread pool when the graph runs
+sync, asyncio.gather when it runs async) and returns the results in the order the
+model asked for them, so the merge is deterministic. ToolPolicy plugs into its
+wrap_tool_call / awrap_tool_call hooks to add the bound, the timeouts and the timings.
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from .metrics import metrics
+from langchain_core.messages import ToolMessage
+from typing import Callable, Deque, Dict, Optional
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+import time
+import weakref
+
+logger = logging.getLogger(__name__)
+
+
+def parse_seconds(spec: str) -> Dict[str, float]:
+    """Parse "tavily_search=15,google_places=10" into {tool name: seconds}"""
+    seconds_by_name = {}
+    for item in spec.split(","):
+        name, _, seconds = item.partition("=")
+        if name.strip() and seconds.strip():
+            seconds_by_name[name.strip()] = float(seconds)
+    return seconds_by_name
+
+
+def _percentile(samples, fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class ToolLatencyStats:
+    """Call counts and recent latencies (ms) for one tool"""
+
+    def __init__(self, max_samples: int = 1000):
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.samples: Deque[float] = deque(maxlen=max_samples)
+
+    def as_dict(self) -> Dict[str, float]:
+        samples = list(self.samples)
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'timeouts': self.timeouts,
+            'p50_ms': round(_percentile(samples, 0.50), 1),
+            'p95_ms': round(_percentile(samples, 0.95), 1),
+            'max_ms': round(max(samples, default=0.0), 1),
+        }
+
+
+class ToolPolicy:
+    """
+    Bounds, timeouts and latency reporting for tool calls made by the ToolNode.
+
+    At most `max_concurrency` calls from one conversation thread run at once (the rest
+    wait their turn). A call running longer than its tool's timeout (`timeouts`, falling
+    back to `default_timeout`; 0 disables) is abandoned and answered with an error
+    message, so the model can carry on without it. Sync calls with a timeout run on a
+    pool of `timeout_workers` threads, and the timeout starts once the call is running;
+    an abandoned call keeps its worker until it returns, so if hung calls fill the pool,
+    a call that can't start within its timeout is reported as saturation rather than
+    silently timing out in the queue. Every call's latency is recorded
+    per tool and attached to its ToolMessage as response_metadata["latency_ms"].
+    """
+
+    def __init__(self, max_concurrency: int = 4, default_timeout: float = 30,
+                 timeouts: Optional[Dict[str, float]] = None, timeout_workers: int = 32):
+        self.max_concurrency = max(1, max_concurrency)
+        self.default_timeout = default_timeout
+        self.timeouts = dict(timeouts or {})
+        self._stats: Dict[str, ToolLatencyStats] = {}
+        self._lock = threading.Lock()
+        self._thread_semaphores: "weakref.WeakValueDictionary[str, threading.Semaphore]" = weakref.WeakValueDictionary()
+        self._async_semaphores: "weakref.WeakValueDictionary[str, asyncio.Semaphore]" = weakref.WeakValueDictionary()
+        # Sync calls with a timeout run here so the tool node's thread can stop waiting on them
+        self.timeout_workers = timeout_workers
+        self._executor = ThreadPoolExecutor(max_workers=timeout_workers, thread_name_prefix="tool-call")
+        # Timed-out calls still running on the pool
+        self.abandoned = 0
+
+    @classmethod
+    def from_env(cls) -> "ToolPolicy":
+        return cls(
+            max_concurrency=int(os.getenv("TOOL_MAX_CONCURRENCY", "4")),
+            default_timeout=float(os.getenv("TOOL_TIMEOUT", "30")),
+            timeouts=parse_seconds(os.getenv("TOOL_TIMEOUTS", "")),
+        )
+
+    def timeout_for(self, tool_name: str) -> Optional[float]:
+        timeout = self.timeouts.get(tool_name, self.default_timeout)
+        return timeout if timeout and timeout > 0 else None
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Latency summary per tool name"""
+        with self._lock:
+            return {name: stats.as_dict() for name, stats in self._stats.items()}
+
+    @staticmethod
+    def _thread_key(request) -> str:
+        config = getattr(request.runtime, 'config', None) or {}
+        return str(config.get("configurable", {}).get("thread_id", ""))
+
+    def _semaphore(self, registry, key: str, factory):
+        with self._lock:
+            semaphore = registry.get(key)
+            if semaphore is None:
+                semaphore = registry[key] = factory(self.max_concurrency)
+            return semaphore
+
+    def _record(self, request, result, started: float, timed_out: bool = False):
+        name = request.tool_call["name"]
+        latency_ms = (time.perf_counter() - started) * 1000
+        failed = timed_out or getattr(result, 'status', None) == "error"
+        with self._lock:
+            stats = self._stats.setdefault(name, ToolLatencyStats())
+            stats.calls += 1
+            stats.errors += failed
+            stats.timeouts += timed_out
+            stats.samples.append(latency_ms)
+        status = "timeout" if timed_out else "error" if failed else "ok"
+        metrics.record("tool", latency_ms / 1000, {'status': status}, tool=name)
+        if isinstance(result, ToolMessage):
+            result.response_metadata["latency_ms"] = round(latency_ms, 1)
+        logger.debug("tool %s took %.1f ms%s", name, latency_ms, " (timed out)" if timed_out else "")
+        return result
+
+    def _abandon(self, future) -> None:
+        with self._lock:
+            self.abandoned += 1
+
+        def finished(_) -> None:
+            with self._lock:
+                self.abandoned -= 1
+
+        future.add_done_callback(finished)
+
+    @staticmethod
+    def _timeout_message(request, timeout: float, reason: str = "timed out after") -> ToolMessage:
+        name = request.tool_call["name"]
+        return ToolMessage(
+            content=f"❌ {name} {reason} {timeout:g}s",
+            name=name,
+            tool_call_id=request.tool_call["id"],
+            status="error",
+        )
+
+    def wrap(self, request, execute: Callable):
+        """wrap_tool_call hook for the sync tool node"""
+        timeout = self.timeout_for(request.tool_call["name"])
+        semaphore = self._semaphore(self._thread_semaphores, self._thread_key(request), threading.Semaphore)
+        with semaphore:
+            started = time.perf_counter()
+            if timeout is None:
+                return self._record(request, execute(request), started)
+
+            # Copy the context so callbacks and stream writers still see this run
+            context = contextvars.copy_context()
+            running = threading.Event()
+
+            def run():
+                running.set()
+                return context.run(execute, request)
+
+            future = self._executor.submit(run)
+            # The timeout covers the call itself, not time queued behind other calls
+            if not running.wait(timeout) and future.cancel():
+                name = request.tool_call["name"]
+                logger.warning("tool %s couldn't start within %gs: all %d tool workers busy (%d abandoned calls "
+                               "still running)", name, timeout, self.timeout_workers, self.abandoned)
+                metrics.count("tool_pool_saturated", tool=name)
+                message = self._timeout_message(request, timeout, reason="couldn't start (tool workers busy) within")
+                return self._record(request, message, started, timed_out=True)
+            try:
+                result = future.result(timeout=timeout)
+            except FutureTimeoutError:
+                self._abandon(future)
+                return self._record(request, self._timeout_message(request, timeout), started, timed_out=True)
+            return self._record(request, result, started)
+
+    async def awrap(self, request, execute: Callable):
+        """awrap_tool_call hook for the async tool node"""
+        timeout = self.timeout_for(request.tool_call["name"])
+        semaphore = self._semaphore(self._async_semaphores, self._thread_key(request), asyncio.Semaphore)
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(execute(request), timeout=timeout)
+            except asyncio.TimeoutError:
+                return self._record(request, self._timeout_message(request, timeout), started, timed_out=True)
+            return self._record(request, result, started)
@@ -0,0 +1,66 @@
+import pytest
+
+from agent.fast_path import parse_route_request
+
+ACCEPTED = [
+    # message, origin, destination, waypoints, mode
+    ("directions from Kings Park to Elizabeth Quay", "Kings Park", "Elizabeth Quay", None, "driving"),
+    ("Directions from Perth to Fremantle?", "Perth", "Fremantle", None, "driving"),
+    ("walking directions from Perth Mint to Northbridge", "Perth Mint", "Northbridge", None, "walking"),
+    ("how do I get from Subiaco to Cottesloe Beach", "Subiaco", "Cottesloe Beach", None, "driving"),
+    ("directions to Perth Zoo from Kings Park", "Kings Park", "Perth Zoo", None, "driving"),
+    ("walk to Perth Mint", "", "Perth Mint", None, "walking"),
+    ("drive to Manly", "", "Manly", None, "driving"),
+    ("cycle from Claremont to Cottesloe", "Claremont", "Cottesloe", None, "bicycling"),
+    ("directions to Fremantle by bus", "", "Fremantle", None, "transit"),
+    ("directions to Fremantle on foot please", "", "Fremantle", None, "walking"),
+    ("navigate to 10 Downing Street", "", "10 Downing Street", None, "driving"),
+    ("directions to Art Gallery of WA", "", "Art Gallery of WA", None, "driving"),
+    ("walk from Kings Park to Northbridge via Perth Mint", "Kings Park", "Northbridge", ["Perth Mint"], "walking"),
+    ("drive from Perth to Albany via Bunbury and Margaret River", "Perth", "Albany",
+     ["Bunbury", "Margaret River"], "driving"),
+]
+
+REJECTED = [
+    # Context-dependent places
+    "directions from home to work",
+    "take me home",
+    "directions to my hotel",
+    "drive back to the hotel",
+    "directions from Perth to Fremantle and back",
+    # Several destinations, or a clause the patterns can't parse
+    "directions to Perth and Fremantle",
+    "directions to Perth for dinner",
+    "walk to Kings Park with the kids",
+    "directions to Fremantle by ferry",
+    "directions to Rottnest by plane",
+    # Constraints the routes tool can't take
+    "directions to Sydney avoiding tolls",
+    "directions to Sydney without tolls",
+    "directions to Sydney tomorrow at 9am",
+    "drive to Kings Park instead",
+    "how can I get from Perth to Sydney cheaply",
+    "drive to Perth in 2 hours",
+    # Needs a search or the conversation
+    "directions to the closest pharmacy",
+    "directions to the beach",
+    "directions to a good cafe",
+    "take me there",
+    "walk from Kings Park to Northbridge via somewhere nice",
+    # Not a route request
+    "what's on in Perth this weekend?",
+    "find cafes near Kings Park",
+]
+
+
+@pytest.mark.parametrize("message,origin,destination,waypoints,mode", ACCEPTED)
+def test_accepts_unambiguous_requests(message, origin, destination, waypoints, mode):
+    request = parse_route_request(message)
+    assert request is not None
+    assert (request.origin, request.destination, request.waypoints, request.mode) == \
+        (origin, destination, waypoints, mode)
+
+
+@pytest.mark.parametrize("message", REJECTED)
+def test_leaves_ambiguous_requests_to_the_agent(message):
+    assert parse_route_request(message) is None
@@ -0,0 +1,140 @@
+import math
+import socket
+from typing import Any, Dict, List
+
+import pytest
+import requests
+
+from agent.benchmarks.stubs import JSONHandler, StubServer
+from agent.http_client import CircuitBreaker, CircuitOpenError, HttpClient
+
+
+class FlakyHandler(JSONHandler):
+    def get(self, path: str, query: Dict[str, str]) -> None:
+        stub: FlakyServer = self.server_stub
+        status, retry_after = stub.responses.pop(0) if stub.responses else (200, None)
+        self.send_response(status)
+        if retry_after is not None:
+            self.send_header("Retry-After", retry_after)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+class FlakyServer(StubServer):
+    """Answers with the queued (status, Retry-After) pairs, then 200s"""
+    handler_class = FlakyHandler
+
+    def __init__(self):
+        super().__init__()
+        self.responses: List[tuple] = []
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def server():
+    stub = FlakyServer().start()
+    yield stub
+    stub.stop()
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def make_client(clock: Clock, **kwargs: Any) -> HttpClient:
+    breaker = CircuitBreaker(failure_threshold=kwargs.pop('threshold', 2), reset_timeout=30, clock=clock)
+    sleeps = []
+    client = HttpClient(breaker=breaker, sleep=sleeps.append, **kwargs)
+    client.sleeps = sleeps
+    return client
+
+
+def closed_port_url() -> str:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}/"
+
+
+def test_retries_5xx_then_succeeds(server, clock):
+    server.responses = [(503, None), (502, None)]
+    client = make_client(clock)
+    assert client.get(server.url + "/x").status_code == 200
+    assert server.counts["/x"] == 3
+    assert len(client.sleeps) == 2
+    assert client.breaker.state == "closed" and client.breaker.failures == 0
+
+
+def test_honours_retry_after_within_bounds(server, clock):
+    server.responses = [(429, "2"), (429, "-5"), (429, "nan"), (429, "1000")]
+    client = make_client(clock, max_retries=4, backoff_max=8)
+    client.get(server.url + "/x")
+    assert client.sleeps[0] == 2.0
+    assert client.sleeps[1] == 0.0
+    assert 0 <= client.sleeps[2] <= 8 and math.isfinite(client.sleeps[2])
+    assert client.sleeps[3] == 8
+
+
+def test_one_failure_per_request_after_retries(server, clock):
+    server.responses = [(500, None)] * 8
+    client = make_client(clock, threshold=3, max_retries=3)
+    assert client.get(server.url + "/x").status_code == 500
+    assert client.breaker.failures == 1
+    assert client.get(server.url + "/x").status_code == 500
+    assert client.breaker.state == "closed"
+
+
+def test_breaker_opens_and_rejects_without_calling(server, clock):
+    client = make_client(clock, max_retries=0)
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            client.get(closed_port_url())
+    assert client.breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        client.get(server.url + "/x")
+    assert server.counts["/x"] == 0
+
+
+def test_half_open_trial_success_closes(server, clock):
+    client = make_client(clock, max_retries=0)
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            client.get(closed_port_url())
+    clock.now += 31
+    assert client.breaker.state == "half-open"
+    assert client.get(server.url + "/x").status_code == 200
+    assert client.breaker.state == "closed"
+
+
+def test_half_open_trial_failure_reopens(server, clock):
+    client = make_client(clock, max_retries=0)
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            client.get(closed_port_url())
+    clock.now += 31
+    server.responses = [(503, None)]
+    assert client.get(server.url + "/x").status_code == 503
+    assert client.breaker.state == "open"
+
+
+def test_client_error_ends_trial_without_counting(server, clock):
+    client = make_client(clock, max_retries=0)
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            client.get(closed_port_url())
+    clock.now += 31
+    failures = client.breaker.failures
+    with pytest.raises(requests.exceptions.InvalidURL):
+        client.get("http://")
+    assert client.breaker.failures == failures
+    # The trial slot is free again, so the next call is let through
+    assert client.get(server.url + "/x").status_code == 200
+    assert client.breaker.state == "closed"
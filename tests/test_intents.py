@@ -0,0 +1,72 @@
+import pytest
+
+from agent.telegram_bot.intents import DIRECTION_KEYWORDS, PLAN_MODIFICATION_KEYWORDS, IntentClassifier
+
+KEYWORDS = {'directions': DIRECTION_KEYWORDS, 'plan_modification': PLAN_MODIFICATION_KEYWORDS}
+
+
+def legacy_intents(text):
+    """The substring scan the classifier replaced"""
+    message_lower = text.lower()
+    return {intent for intent, keywords in KEYWORDS.items() if any(keyword in message_lower for keyword in keywords)}
+
+
+classifier = IntentClassifier(KEYWORDS)
+
+# Where the old scan was right, including plurals and -ing forms, the classifier agrees
+SAME_AS_LEGACY = [
+    "any routes to Fremantle?",
+    "Give me directions to Kings Park please",
+    "how to get to the airport",
+    "Navigate to Cottesloe",
+    "what's the best route to Perth Zoo",
+    "where is the closest pharmacy",
+    "I want to go to the beach",
+    "take me to the hotel",
+    "updates to my plan please",
+    "update my travel plan",
+    "can you add restaurant Lalla Rookh",
+    "swap the museum for the zoo",
+    "what's the weather like?",
+    "tell me a joke",
+    "Routes around Perth with swaps included",
+]
+
+# Substrings inside other words, which the old scan wrongly took as keywords
+INTENTIONAL_DIFFERENCES = [
+    ("we rerouted the tour bus", set()),
+    ("is breakfast included?", set()),
+    ("shipping cargo to Perth", set()),
+]
+
+# -ing forms that drop the keyword's final "e", which the old scan missed
+INFLECTED = [
+    ("including a winery tour on Saturday", {'plan_modification'}),
+    ("routing via Subiaco", {'directions'}),
+    ("excluding the zoo", {'plan_modification'}),
+]
+
+
+@pytest.mark.parametrize("message", SAME_AS_LEGACY)
+def test_matches_legacy_scan(message):
+    assert classifier.intents(message) == legacy_intents(message)
+
+
+@pytest.mark.parametrize("message,expected", INTENTIONAL_DIFFERENCES)
+def test_ignores_keywords_inside_words(message, expected):
+    assert legacy_intents(message) != expected
+    assert classifier.intents(message) == expected
+
+
+@pytest.mark.parametrize("message,expected", INFLECTED)
+def test_matches_inflected_keywords(message, expected):
+    assert classifier.intents(message) == expected
+
+
+@pytest.mark.parametrize("keyword", DIRECTION_KEYWORDS + PLAN_MODIFICATION_KEYWORDS)
+def test_every_keyword_matches_itself(keyword):
+    assert classifier.intents(f"please {keyword} now") >= legacy_intents(keyword)
+
+
+def test_matches_report_the_listed_keyword():
+    assert [match.keyword for match in classifier.find("any routes or updates?")] == ["route", "update"]
@@ -0,0 +1,52 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from langchain_core.messages import ToolMessage
+
+from agent.tool_runtime import ToolPolicy
+
+
+def make_request(name: str, thread_id: str = "t"):
+    return SimpleNamespace(tool_call={"name": name, "id": f"call-{name}", "args": {}},
+                           runtime=SimpleNamespace(config={"configurable": {"thread_id": thread_id}}))
+
+
+def answer(request):
+    return ToolMessage(content="ok", name=request.tool_call["name"], tool_call_id=request.tool_call["id"])
+
+
+def test_timeout_starts_when_the_call_runs():
+    policy = ToolPolicy(max_concurrency=4, default_timeout=0.3, timeout_workers=1)
+    release = threading.Event()
+    blocker = threading.Thread(target=policy.wrap, args=(make_request("slow", "a"), lambda r: release.wait(0.2)))
+    blocker.start()
+    time.sleep(0.05)
+
+    def quick(request):
+        time.sleep(0.2)
+        return answer(request)
+
+    # Queued ~0.15 s behind the blocker, then runs 0.2 s: over 0.3 s end to end, but within its own timeout
+    result = policy.wrap(make_request("quick", "b"), quick)
+    blocker.join()
+    assert result.content == "ok"
+
+
+def test_saturated_pool_is_reported():
+    policy = ToolPolicy(max_concurrency=4, default_timeout=0.1, timeout_workers=1)
+    hang = threading.Event()
+    try:
+        hung = policy.wrap(make_request("hung", "a"), lambda r: hang.wait(5))
+        assert hung.status == "error" and "timed out" in hung.content
+        assert policy.abandoned == 1
+
+        called = []
+        result = policy.wrap(make_request("next", "b"), lambda r: called.append(r) or answer(r))
+        assert result.status == "error" and "workers busy" in result.content
+        assert not called
+        assert policy.stats()["next"]["timeouts"] == 1
+    finally:
+        hang.set()
+    time.sleep(0.05)
+    assert policy.abandoned == 0